@@ -3,11 +3,19 @@ from .ocr import router as ocr_router
 from .clean import router as clean_router
 from .summarize import router as summarize_router
 from .visits import router as visits_router
+from .jobs import router as jobs_router
+from .process import router as process_router
+from .admission import router as admission_router
+from .llm import router as llm_router
 
 __all__ = [
     "upload_router",
     "ocr_router",
     "clean_router",
     "summarize_router",
-    "visits_router"
+    "visits_router",
+    "jobs_router",
+    "process_router",
+    "admission_router",
+    "llm_router"
 ]
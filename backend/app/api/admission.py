@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+
+from ..services.admission_service import AdmissionService
+from .deps import get_admission_service
+
+router = APIRouter(prefix="/admission", tags=["Admission"])
+
+
+@router.get("/stats", response_model=dict)
+async def get_admission_stats(
+    admission_service: AdmissionService = Depends(get_admission_service)
+):
+    """
+    Get running and waiting requests per stage (ocr, clean, summarize, db_read)
+    """
+    return admission_service.stats()
@@ -0,0 +1,60 @@
+from typing import AsyncIterator, Callable
+
+from fastapi import Depends, Request
+
+from ..services.container import ServiceContainer
+from ..services.ocr_service import OCRService
+from ..services.llm_service import LLMService
+from ..services.admission_service import AdmissionService
+from ..services.pipeline_service import PipelineService
+from ..services.job_service import JobService
+from ..services.storage_service import StorageService
+from ..services.ingest_service import IngestService
+
+
+def get_services(request: Request) -> ServiceContainer:
+    """The app's service container (set up by the lifespan in main.py)"""
+    return request.app.state.services
+
+
+def get_ocr_service(services: ServiceContainer = Depends(get_services)) -> OCRService:
+    return services.ocr_service
+
+
+def get_llm_service(services: ServiceContainer = Depends(get_services)) -> LLMService:
+    return services.llm_service
+
+
+def get_admission_service(services: ServiceContainer = Depends(get_services)) -> AdmissionService:
+    return services.admission_service
+
+
+def get_pipeline_service(services: ServiceContainer = Depends(get_services)) -> PipelineService:
+    return services.pipeline_service
+
+
+def get_job_service(services: ServiceContainer = Depends(get_services)) -> JobService:
+    return services.job_service
+
+
+def get_storage_service(services: ServiceContainer = Depends(get_services)) -> StorageService:
+    return services.storage_service
+
+
+def get_ingest_service(services: ServiceContainer = Depends(get_services)) -> IngestService:
+    return services.ingest_service
+
+
+def admit(stage: str) -> Callable[..., AsyncIterator[None]]:
+    """
+    Dependency that holds a slot of the stage while the route runs
+
+    Raises StageOverloaded (answered with 429) when the stage is saturated.
+    """
+    async def dependency(
+        admission_service: AdmissionService = Depends(get_admission_service)
+    ) -> AsyncIterator[None]:
+        async with admission_service.slot(stage):
+            yield
+
+    return dependency
@@ -0,0 +1,108 @@
+import json
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from ..core.database import get_db, SessionLocal
+from ..services.job_service import JobService, JOB_STAGES
+from ..services.database_service import DatabaseService
+from ..schemas import JobResponse
+from .deps import get_job_service
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/stats", response_model=dict)
+def get_job_stats(
+    db: Session = Depends(get_db),
+    job_service: JobService = Depends(get_job_service)
+):
+    """
+    Get job counts by status and the number of workers in this process
+    """
+    return job_service.stats(db)
+
+
+@router.post("/{visit_id}", response_model=JobResponse, status_code=202)
+def create_job(
+    visit_id: str,
+    job_type: str = "pipeline",
+    db: Session = Depends(get_db),
+    job_service: JobService = Depends(get_job_service)
+):
+    """
+    Queue background processing for a visit
+
+    - job_type "pipeline" runs OCR, cleaning and summary; "ocr", "clean"
+      and "summarize" run a single stage
+    - Returns immediately with the job; poll GET /jobs/{job_id} or
+      subscribe to GET /jobs/{job_id}/events for progress
+    - If the same job is already queued or running, that job is returned
+    """
+    if job_type not in JOB_STAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown job type {job_type}. Allowed types: {list(JOB_STAGES)}"
+        )
+
+    visit = DatabaseService.get_visit(db, visit_id)
+    if not visit:
+        raise HTTPException(status_code=404, detail="Visit not found")
+
+    return job_service.enqueue(db, visit_id, job_type)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the status, current stage and per-stage results of a job
+    """
+    job = DatabaseService.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _job_snapshot(job_id: str) -> Optional[dict]:
+    """Read a job with a short-lived session"""
+    db = SessionLocal()
+    try:
+        job = DatabaseService.get_job(db, job_id)
+        return JobResponse.model_validate(job).model_dump(mode="json") if job else None
+    finally:
+        db.close()
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Stream job progress as server-sent events
+
+    - Sends the job whenever its status or stage changes
+    - Ends once the job has completed or failed
+    """
+    snapshot = await run_in_threadpool(_job_snapshot, job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        current = snapshot
+        last = None
+        while True:
+            state = (current["status"], current["stage"], current["attempts"])
+            if state != last:
+                last = state
+                yield f"event: job\ndata: {json.dumps(current)}\n\n"
+            if current["status"] in ("completed", "failed") or await request.is_disconnected():
+                return
+
+            await asyncio.sleep(0.5)
+            current = await run_in_threadpool(_job_snapshot, job_id) or current
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
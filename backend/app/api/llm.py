@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends
+
+from ..services.llm_service import LLMService
+from .deps import get_llm_service
+
+router = APIRouter(prefix="/llm", tags=["LLM"])
+
+
+@router.get("/cache/stats", response_model=dict)
+def get_llm_cache_stats(llm_service: LLMService = Depends(get_llm_service)):
+    """
+    Get LLM reply cache statistics (hit rates overall and per method, size)
+    """
+    return llm_service.cache_stats()
+
+
+@router.delete("/cache", response_model=dict)
+def clear_llm_cache(llm_service: LLMService = Depends(get_llm_service)):
+    """
+    Invalidate all cached LLM replies
+    
+    - Use after changing prompts, or to force fresh replies
+    """
+    removed = llm_service.invalidate_cache()
+    return {"message": "LLM cache cleared", "entries_removed": removed}
+
+
+@router.get("/tokens/stats", response_model=dict)
+def get_llm_token_stats(llm_service: LLMService = Depends(get_llm_service)):
+    """
+    Get prompt tokens sent, reply budgets and tokens saved per method
+    
+    - compaction_tokens_saved: removed from OCR text before sending
+    - max_tokens_saved: reply budget below the fixed per-method maximum
+    """
+    return llm_service.token_stats()
+
+
+@router.get("/rate/stats", response_model=dict)
+def get_llm_rate_stats(llm_service: LLMService = Depends(get_llm_service)):
+    """
+    Get rate limiter state and retry counts
+    
+    - delayed / waited_seconds: requests held back to stay within the limits
+    - retries: requests sent again after 429, 5xx or connection errors
+    - failures: requests that failed for good
+    """
+    return llm_service.rate_stats()
+
+
+@router.get("/clean/stats", response_model=dict)
+def get_llm_clean_stats(llm_service: LLMService = Depends(get_llm_service)):
+    """
+    Get local cleaning statistics
+    
+    - local: chunks cleaned by local rules only, with no LLM request
+    - llm_low_confidence / llm_noisy / llm_unknown_confidence: chunks
+      still sent to the LLM, by reason
+    """
+    return llm_service.clean_stats()
+
+
+@router.get("/extract/stats", response_model=dict)
+def get_llm_extract_stats(llm_service: LLMService = Depends(get_llm_service)):
+    """
+    Get local extraction statistics
+    
+    - local_fields: documents where each field was found by local patterns
+    - llm_fields: documents where the LLM filled a field local extraction missed
+    - llm_requests: extraction requests made for missing fields
+    """
+    return llm_service.extract_stats()
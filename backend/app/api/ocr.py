@@ -1,74 +1,62 @@
-import time
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from ..core.database import get_db
 from ..services.ocr_service import OCRService
-from ..services.database_service import DatabaseService
-from ..schemas import OCRResponse
+from ..services.pipeline_service import PipelineService, PipelineError
+from ..schemas import VisitOCRResponse
+from .deps import get_ocr_service, get_pipeline_service
 
 router = APIRouter(prefix="/ocr", tags=["OCR"])
 
-# Initialize OCR service
-ocr_service = OCRService()
+
+@router.get("/cache/stats", response_model=dict)
+def get_ocr_cache_stats(ocr_service: OCRService = Depends(get_ocr_service)):
+    """
+    Get OCR result cache statistics (hits, misses, size)
+    """
+    return ocr_service.cache_stats()
+
+
+@router.get("/batch/stats", response_model=dict)
+def get_ocr_batch_stats(ocr_service: OCRService = Depends(get_ocr_service)):
+    """
+    Get OCR micro-batching statistics (batches run, average batch size)
+    """
+    return ocr_service.batch_stats()
 
 
-@router.post("/{visit_id}", response_model=OCRResponse)
+@router.delete("/cache", response_model=dict)
+def clear_ocr_cache(ocr_service: OCRService = Depends(get_ocr_service)):
+    """
+    Invalidate all cached OCR results
+    
+    - Use after changing the preprocessing pipeline or OCR models
+    """
+    removed = ocr_service.invalidate_cache()
+    return {"message": "OCR cache cleared", "entries_removed": removed}
+
+
+@router.post("/{visit_id}", response_model=VisitOCRResponse)
 async def perform_ocr(
     visit_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    pipeline_service: PipelineService = Depends(get_pipeline_service)
 ):
     """
-    Perform OCR on uploaded document
+    Perform OCR on every document of a visit
+    
+    - Extracts text from PDFs and images, all documents at the same time
+    - Uses the PDF text layer where usable, OCR for the other pages
+    - Skips documents that already have OCR text
+    - Stores raw OCR text per document in database
+    - Returns the combined text, per-document results and page provenance
     
-    - Extracts text from PDF or image
-    - Stores raw OCR text in database
-    - Returns extracted text and confidence score
+    Runs in the thread pool; page OCR itself runs in the OCR worker
+    processes (OCR_POOL_SIZE). Use POST /jobs/{visit_id} to run it in
+    the background instead.
     """
     try:
-        # Get visit
-        visit = DatabaseService.get_visit(db, visit_id)
-        if not visit:
-            raise HTTPException(status_code=404, detail="Visit not found")
-        
-        # Get documents for this visit
-        documents = DatabaseService.get_documents_by_visit(db, visit_id)
-        if not documents:
-            raise HTTPException(status_code=404, detail="No documents found for this visit")
-        
-        # Use the first document
-        document = documents[0]
-        
-        # Update visit status
-        DatabaseService.update_visit_status(db, visit_id, "processing_ocr")
-        
-        # Perform OCR
-        start_time = time.time()
-        extracted_text, confidence = ocr_service.extract_text(
-            document.file_path,
-            document.file_type
-        )
-        processing_time = f"{time.time() - start_time:.2f}s"
-        
-        if not extracted_text:
-            raise HTTPException(status_code=500, detail="Could not extract text from document")
-        
-        # Save OCR result
-        ocr_result = DatabaseService.create_ocr_text(
-            db=db,
-            visit_id=visit_id,
-            raw_text=extracted_text,
-            confidence_score=f"{confidence:.2f}",
-            processing_time=processing_time
-        )
-        
-        # Update visit status
-        DatabaseService.update_visit_status(db, visit_id, "ocr_completed")
-        
-        return ocr_result
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        DatabaseService.update_visit_status(db, visit_id, "ocr_failed")
-        raise HTTPException(status_code=500, detail=f"Error performing OCR: {str(e)}")
+        return await pipeline_service.ocr(db, visit_id)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
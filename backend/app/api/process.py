@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from ..core.database import get_db
+from ..services.pipeline_service import PipelineService, PipelineError
+from ..schemas import PipelineResponse
+from .deps import get_pipeline_service
+
+router = APIRouter(prefix="/process", tags=["Process"])
+
+
+@router.post("/{visit_id}", response_model=PipelineResponse)
+async def process_visit(
+    visit_id: str,
+    db: Session = Depends(get_db),
+    pipeline_service: PipelineService = Depends(get_pipeline_service)
+):
+    """
+    Run the whole pipeline for a visit in one call
+    
+    - OCRs every document that has no OCR text yet
+    - Cleans the text and extracts structured data
+    - Generates the summary and key findings
+    - Hands each stage's output to the next in memory and stores the
+      cleaned text, summary and final status in one transaction
+    - Returns every stage's result and per-stage timings
+    
+    Use POST /jobs/{visit_id} to run the same pipeline in the background.
+    """
+    try:
+        return await pipeline_service.process(db, visit_id)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
@@ -1,22 +1,24 @@
-import time
+import json
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 
 from ..core.database import get_db
-from ..services.llm_service import LLMService
+from ..services.ocr_service import OCRService
+from ..services.pipeline_service import PipelineService, PipelineError
 from ..services.database_service import DatabaseService
 from ..schemas import SummaryResponse
+from .deps import get_pipeline_service, admit
 
 router = APIRouter(prefix="/summarize", tags=["Summarize"])
 
-# Initialize LLM service
-llm_service = LLMService()
-
 
 @router.post("/{visit_id}", response_model=SummaryResponse)
 async def generate_summary(
     visit_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    pipeline_service: PipelineService = Depends(get_pipeline_service)
 ):
     """
     Generate medical summary using LLM
@@ -25,56 +27,60 @@ async def generate_summary(
     - Generates concise medical summary
     - Extracts key findings
     - Stores summary
+    
+    Use POST /jobs/{visit_id} to run it in the background instead.
     """
     try:
-        # Get visit
-        visit = DatabaseService.get_visit(db, visit_id)
-        if not visit:
-            raise HTTPException(status_code=404, detail="Visit not found")
-        
-        # Get cleaned text
-        cleaned_text = DatabaseService.get_cleaned_text_by_visit(db, visit_id)
-        if not cleaned_text:
-            raise HTTPException(
-                status_code=404,
-                detail="No cleaned text found. Please run cleaning first."
-            )
-        
-        # Update visit status
-        DatabaseService.update_visit_status(db, visit_id, "processing_summary")
-        
-        # Generate summary using LLM
-        start_time = time.time()
-        summary_text = llm_service.generate_medical_summary(cleaned_text.cleaned_text)
-        
-        # Extract key findings
-        key_findings = llm_service.extract_key_findings(summary_text)
-        
-        processing_time = f"{time.time() - start_time:.2f}s"
-        
-        # Save summary
-        summary_result = DatabaseService.create_summary(
-            db=db,
-            visit_id=visit_id,
-            summary_text=summary_text,
-            key_findings=key_findings,
-            processing_time=processing_time
-        )
-        
-        # Update visit status
-        DatabaseService.update_visit_status(db, visit_id, "completed")
-        
-        return summary_result
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        DatabaseService.update_visit_status(db, visit_id, "summary_failed")
-        raise HTTPException(status_code=500, detail=f"Error generating summary: {str(e)}")
+        return await pipeline_service.summarize(db, visit_id)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@router.post("/{visit_id}/stream")
+async def stream_summary(
+    visit_id: str,
+    db: Session = Depends(get_db),
+    pipeline_service: PipelineService = Depends(get_pipeline_service)
+):
+    """
+    Generate the medical summary, streaming it as server-sent events
+    
+    - "token" events carry pieces of the summary as the LLM writes them
+    - A final "summary" event carries the stored summary with key findings
+    - An "error" event is sent if generation fails
+    - If the client disconnects, generation stops and nothing is stored
+    
+    Errors found before streaming starts (visit or cleaned text missing,
+    stage busy) are answered with the usual status codes. Read the stream
+    with fetch(); EventSource only supports GET.
+    """
+    try:
+        stream = await pipeline_service.summarize_stream(db, visit_id)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    async def events():
+        try:
+            async for kind, data in stream:
+                if kind == "token":
+                    yield f"event: token\ndata: {json.dumps({'text': data})}\n\n"
+                else:
+                    yield f"event: summary\ndata: {data.model_dump_json()}\n\n"
+        except PipelineError as e:
+            yield f"event: error\ndata: {json.dumps({'detail': e.detail})}\n\n"
+
+    # Runs once the response is over, whether it finished, failed or the
+    # client disconnected, and also if events() never got to run
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(stream.close)
+    )
 
 
-@router.get("/{visit_id}", response_model=dict)
-async def get_summary(
+@router.get("/{visit_id}", response_model=dict, dependencies=[Depends(admit("db_read"))])
+def get_summary(
     visit_id: str,
     db: Session = Depends(get_db)
 ):
@@ -93,15 +99,16 @@ async def get_summary(
             raise HTTPException(status_code=404, detail="Visit not found")
         
         # Get all data
-        ocr_text = DatabaseService.get_ocr_text_by_visit(db, visit_id)
+        document_texts = DatabaseService.get_document_ocr_texts(db, visit_id)
+        ocr_text, ocr_confidence = OCRService.combine_stored_texts(document_texts)
         cleaned_text = DatabaseService.get_cleaned_text_by_visit(db, visit_id)
         summary = DatabaseService.get_summary_by_visit(db, visit_id)
         
         return {
             "visit_id": visit_id,
             "status": visit.status,
-            "ocr_text": ocr_text.raw_text if ocr_text else None,
-            "ocr_confidence": ocr_text.confidence_score if ocr_text else None,
+            "ocr_text": ocr_text if document_texts else None,
+            "ocr_confidence": f"{ocr_confidence:.2f}" if document_texts else None,
             "cleaned_text": cleaned_text.cleaned_text if cleaned_text else None,
             "extracted_data": cleaned_text.extracted_data if cleaned_text else None,
             "summary": summary.summary_text if summary else None,
@@ -1,90 +1,244 @@
 import os
-import shutil
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 
 from ..core.database import get_db
 from ..core.config import settings
 from ..services.database_service import DatabaseService
+from ..services.ingest_service import IngestService
+from ..services.storage_service import (
+    StorageService, StagedForm, StagedPart, FileTooLargeError, UnsupportedFileTypeError, MalformedUploadError
+)
+from ..services.job_service import JobService, JOB_STAGES
 from ..schemas import PatientCreate, VisitResponse
+from .deps import get_storage_service, get_ingest_service, get_job_service
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
 
-@router.post("/", response_model=dict)
+# The route reads the body itself; this documents it for the OpenAPI schema
+UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "patient_name": {"type": "string"},
+                        "patient_age": {"type": "string"},
+                        "patient_gender": {"type": "string"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+BULK_UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+@router.post("/", response_model=dict, openapi_extra=UPLOAD_FORM)
 async def upload_medical_document(
-    file: UploadFile = File(...),
+    request: Request,
     patient_name: Optional[str] = None,
     patient_age: Optional[str] = None,
     patient_gender: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    storage_service: StorageService = Depends(get_storage_service)
 ):
     """
     Upload medical document (PDF or image)
     
+    - Rejects a request whose Content-Length exceeds MAX_FILE_SIZE with 413
+      before reading it
+    - Parses the multipart body as it arrives and streams the file to
+      storage, stopping with 413 once it exceeds MAX_FILE_SIZE
+    - Patient details may be form fields or query parameters
     - Creates patient if needed
     - Creates visit
     - Saves document
     - Returns patient_id and visit_id
     """
+    form = None
     try:
+        # Stream the file to a temporary location, checking size and content
+        try:
+            storage_service.check_content_length(request.headers.get("content-length"))
+            form = await storage_service.stage_form(request.headers.get("content-type", ""), request.stream())
+        except FileTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UnsupportedFileTypeError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except MalformedUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         # Validate file type
-        file_ext = os.path.splitext(file.filename)[1].lower()
+        file_ext = os.path.splitext(form.filename)[1].lower()
         if file_ext not in settings.ALLOWED_EXTENSIONS:
             raise HTTPException(
                 status_code=400,
                 detail=f"File type {file_ext} not allowed. Allowed types: {settings.ALLOWED_EXTENSIONS}"
             )
         
-        # Create patient
         patient_data = PatientCreate(
-            name=patient_name,
-            age=patient_age,
-            gender=patient_gender
+            name=form.fields.get("patient_name", patient_name),
+            age=form.fields.get("patient_age", patient_age),
+            gender=form.fields.get("patient_gender", patient_gender)
         )
-        patient = DatabaseService.create_patient(db, patient_data)
+        return await run_in_threadpool(_save_upload, db, storage_service, form, patient_data)
         
-        # Create visit
-        from ..schemas import VisitCreate
-        visit_data = VisitCreate(
-            patient_id=patient.patient_id,
-            visit_type="consultation"
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+    finally:
+        # Removes the temporary file if the upload did not get stored
+        if form is not None:
+            storage_service.discard(form.staged)
+
+
+def _save_upload(db: Session, storage_service: StorageService, form: StagedForm, patient_data: PatientCreate) -> dict:
+    """Create the patient, visit and document of a staged upload and move the file into place"""
+    staged = form.staged
+    
+    # Create patient
+    patient = DatabaseService.create_patient(db, patient_data)
+    
+    # Create visit
+    from ..schemas import VisitCreate
+    visit_data = VisitCreate(
+        patient_id=patient.patient_id,
+        visit_type="consultation"
+    )
+    visit = DatabaseService.create_visit(db, visit_data)
+    
+    # Save file
+    filename = os.path.basename(form.filename)
+    file_path = storage_service.store(staged, visit.visit_id, filename)
+    
+    # Create document record
+    document = DatabaseService.create_document(
+        db=db,
+        visit_id=visit.visit_id,
+        filename=filename,
+        file_path=file_path,
+        file_type=staged.file_type,
+        file_size=staged.size,
+        content_hash=staged.content_hash
+    )
+    
+    # Update visit status
+    DatabaseService.update_visit_status(db, visit.visit_id, "uploaded")
+    
+    return {
+        "message": "File uploaded successfully",
+        "patient_id": patient.patient_id,
+        "visit_id": visit.visit_id,
+        "document_id": document.document_id,
+        "filename": filename,
+        "file_size": staged.size,
+        "content_hash": staged.content_hash
+    }
+
+
+@router.post("/bulk", response_model=dict, openapi_extra=BULK_UPLOAD_FORM)
+async def upload_bulk(
+    request: Request,
+    single_visit: bool = False,
+    visit_type: str = "consultation",
+    job_type: Optional[str] = None,
+    db: Session = Depends(get_db),
+    storage_service: StorageService = Depends(get_storage_service),
+    ingest_service: IngestService = Depends(get_ingest_service),
+    job_service: JobService = Depends(get_job_service)
+):
+    """
+    Upload many medical documents, or zip archives of them, in one request
+    
+    - By default every document gets its own patient and visit; with
+      single_visit=true all documents go into one new visit
+    - The body is parsed as it arrives and each file streamed to storage;
+      a request larger than BULK_UPLOAD_MAX_SIZE is rejected with 413
+      (before reading it if its Content-Length says so)
+    - Zip archives are expanded; unsupported or oversized documents and
+      entries are listed under "skipped" instead of failing the upload
+    - Records are inserted in batches of BULK_UPLOAD_BATCH_SIZE documents
+    - With job_type (e.g. "pipeline") each visit is queued for processing
+      as soon as its batch is committed
+    - A request can carry at most 1000 files; send larger sets as zip archives
+    - Returns a manifest of the created patient, visit, document and job IDs;
+      documents of a batch that could not be saved, and visits whose job
+      could not be queued, are listed under "errors" while the other
+      batches are kept
+    """
+    if job_type is not None and job_type not in JOB_STAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown job type {job_type}. Allowed types: {list(JOB_STAGES)}"
         )
-        visit = DatabaseService.create_visit(db, visit_data)
-        
-        # Save file
-        upload_dir = os.path.join(settings.UPLOAD_DIR, visit.visit_id)
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        file_path = os.path.join(upload_dir, file.filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        file_size = os.path.getsize(file_path)
+    
+    on_batch = partial(_enqueue_visits, job_service, job_type) if job_type is not None else None
+    
+    parts: List[StagedPart] = []
+    try:
+        try:
+            storage_service.check_content_length(
+                request.headers.get("content-length"), storage_service.max_request_size
+            )
+            parts = await storage_service.stage_files(request.headers.get("content-type", ""), request.stream())
+        except FileTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except MalformedUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not parts:
+            raise HTTPException(status_code=400, detail="The form has no files field")
         
-        # Create document record
-        document = DatabaseService.create_document(
-            db=db,
-            visit_id=visit.visit_id,
-            filename=file.filename,
-            file_path=file_path,
-            file_type=file_ext[1:],  # Remove the dot
-            file_size=file_size
+        return await run_in_threadpool(
+            ingest_service.ingest,
+            db,
+            parts,
+            single_visit=single_visit,
+            visit_type=visit_type,
+            on_batch=on_batch
         )
-        
-        # Update visit status
-        DatabaseService.update_visit_status(db, visit.visit_id, "uploaded")
-        
-        return {
-            "message": "File uploaded successfully",
-            "patient_id": patient.patient_id,
-            "visit_id": visit.visit_id,
-            "document_id": document.document_id,
-            "filename": file.filename,
-            "file_size": file_size
-        }
-        
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error uploading files: {str(e)}")
+    finally:
+        # Removes the archives and any documents that did not get stored
+        if parts:
+            await run_in_threadpool(_discard_parts, storage_service, parts)
+
+
+def _enqueue_visits(job_service: JobService, job_type: str, db: Session, visit_ids: List[str]) -> dict:
+    """Queue a job for each visit of a committed bulk upload batch; returns the job ID per visit"""
+    return dict(zip(visit_ids, job_service.enqueue_many(db, visit_ids, job_type)))
+
+
+def _discard_parts(storage_service: StorageService, parts: List[StagedPart]) -> None:
+    """Delete the staged files of a bulk upload left after ingestion"""
+    for part in parts:
+        if part.staged is not None:
+            storage_service.discard(part.staged)
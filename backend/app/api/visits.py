@@ -5,12 +5,13 @@ from typing import List
 from ..core.database import get_db
 from ..services.database_service import DatabaseService
 from ..schemas import VisitResponse
+from .deps import admit
 
 router = APIRouter(prefix="/visits", tags=["Visits"])
 
 
-@router.get("/", response_model=List[dict])
-async def get_all_visits(
+@router.get("/", response_model=List[dict], dependencies=[Depends(admit("db_read"))])
+def get_all_visits(
     limit: int = 50,
     db: Session = Depends(get_db)
 ):
@@ -36,8 +37,8 @@ async def get_all_visits(
         raise HTTPException(status_code=500, detail=f"Error retrieving visits: {str(e)}")
 
 
-@router.get("/{visit_id}", response_model=dict)
-async def get_visit_details(
+@router.get("/{visit_id}", response_model=dict, dependencies=[Depends(admit("db_read"))])
+def get_visit_details(
     visit_id: str,
     db: Session = Depends(get_db)
 ):
@@ -18,11 +18,75 @@ class Settings(BaseSettings):
     # Groq API
     GROQ_API_KEY: str = ""
     GROQ_MODEL: str = "llama-3.3-70b-versatile"
+    GROQ_BASE_URL: str = ""  # e.g. http://localhost:8100 for benchmarks/groq_stub_server.py; empty for Groq
+    LLM_MAX_CONNECTIONS: int = 20  # pooled connections to the Groq API per process
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10  # idle connections kept open for reuse
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_FUSED_MODE: bool = False  # /process and pipeline jobs make one JSON request instead of four
+    LLM_CACHE_ENABLED: bool = True  # answer repeated LLM requests from a cache
+    LLM_CACHE_PATH: str = "cache/llm_cache.sqlite3"
+    LLM_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 64MB
+    LLM_CACHE_MEMORY_ENTRIES: int = 512  # replies also kept in process memory
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600  # replies older than this are requested again
+    LLM_CHUNK_MAX_CHARS: int = 6000  # longer texts are cleaned and summarised in chunks (~1500 tokens each)
+    LLM_CHUNK_CONCURRENCY: int = 4  # chunks of one text sent to the LLM at the same time
+    LLM_CONTEXT_TOKENS: int = 131072  # model context window; longer prompts are rejected
+    LLM_REQUESTS_PER_MINUTE: int = 30  # Groq free tier limits for the model; 0 disables
+    LLM_TOKENS_PER_MINUTE: int = 12000
+    LLM_MAX_RETRIES: int = 3  # retries of a request after 429, 5xx or connection errors
+    LLM_RETRY_BASE_SECONDS: float = 0.5  # first backoff window, doubled on each retry
+    LLM_RETRY_MAX_SECONDS: float = 20.0  # longest wait before a retry, Retry-After included
+    LOCAL_CLEAN_ENABLED: bool = True  # clean OCR text with local rules before deciding on the LLM
+    LOCAL_CLEAN_MIN_CONFIDENCE: float = 0.95  # lower OCR confidence still goes to the LLM (text layers are 1.0)
+    LOCAL_CLEAN_MAX_NOISE: float = 0.02  # share of garbled tokens above which the LLM cleans anyway
+    LOCAL_EXTRACT_ENABLED: bool = True  # extract vitals, medications, labs and labelled fields with local patterns
+    LOCAL_EXTRACT_LLM_GAPS: bool = True  # ask the LLM for the fields local extraction missed
     
     # File Upload
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # bytes read and written at a time when storing uploads
     ALLOWED_EXTENSIONS: set = {".pdf", ".jpg", ".jpeg", ".png"}
+    BULK_UPLOAD_BATCH_SIZE: int = 500  # documents inserted per commit by /upload/bulk
+    BULK_UPLOAD_MAX_SIZE: int = 512 * 1024 * 1024  # largest /upload/bulk request body, zip archives included
+    
+    # OCR
+    OCR_POOL_SIZE: Optional[int] = None  # warm OCR worker processes (default: OCR_MAX_CONCURRENT_DOCUMENTS, at most the CPU count); 0 runs OCR in the API process
+    OCR_WARMUP: bool = True  # load OCR models in the background at startup
+    OCR_MAX_CONCURRENT_DOCUMENTS: int = 4  # documents of one visit extracted at the same time
+    OCR_BATCH_ENABLED: bool = True  # batch recognition across concurrent requests, in-process or per pool worker
+    OCR_BATCH_MAX_SIZE: int = 8  # most images OCRed together in one batch
+    OCR_BATCH_MAX_WAIT_MS: int = 10  # longest an image waits for a batch to fill
+    PDF_TEXT_LAYER_MIN_CHARS: int = 50  # below this a PDF page is OCRed
+    OCR_RENDER_DPI: int = 144  # render resolution for scanned PDF pages (2x zoom)
+    OCR_MAX_PAGE_PIXELS: int = 8_000_000  # larger pages are rendered at a lower DPI
+    OCR_PREPROCESS_PROFILE: str = "auto"  # none, fast, full or auto
+    OCR_AUTO_MIN_CONFIDENCE: float = 0.85  # auto escalates to a heavier profile below this
+    OCR_AUTO_MAX_NOISE_NONE: float = 1.5  # noise sigma up to which auto skips preprocessing
+    OCR_AUTO_MIN_CONTRAST: float = 40.0  # ...provided the image has at least this contrast
+    OCR_AUTO_MAX_NOISE_FAST: float = 6.0  # noise sigma up to which auto uses the fast profile
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_PATH: str = "cache/ocr_cache.sqlite3"
+    OCR_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # 256MB
+    
+    # Admission control: requests a stage runs at once, and how many may wait
+    # for a slot before further ones get 429
+    OCR_STAGE_CONCURRENCY: int = 2
+    OCR_STAGE_QUEUE: int = 8
+    CLEAN_STAGE_CONCURRENCY: int = 4
+    CLEAN_STAGE_QUEUE: int = 16
+    SUMMARY_STAGE_CONCURRENCY: int = 4
+    SUMMARY_STAGE_QUEUE: int = 16
+    DB_READ_CONCURRENCY: int = 8
+    DB_READ_QUEUE: int = 64
+    ADMISSION_MAX_WAIT_SECONDS: float = 30  # a queued request gives up with 429 after this
+    
+    # Background jobs
+    JOB_WORKERS: int = 2  # worker tasks per API process running queued jobs
+    JOB_LEASE_SECONDS: int = 120  # a running job whose worker stops renewing this is reclaimed
+    JOB_MAX_ATTEMPTS: int = 3  # claims before a job is marked failed
+    JOB_POLL_INTERVAL_MS: int = 1000  # how often idle workers look for new jobs
+    JOB_RETRY_SECONDS: float = 30  # wait before retrying a job after an LLM rate limit or outage, doubled per attempt
     
     # CORS
     CORS_ORIGINS: list = ["http://localhost:3000", "http://localhost:5173"]
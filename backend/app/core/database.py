@@ -32,5 +32,5 @@ def init_db():
     """
     Initialize database tables
     """
-    from ..models import Patient, Visit, RawDocument, OCRText, CleanedText, Summary
+    from ..models import Patient, Visit, RawDocument, OCRText, CleanedText, Summary, Job
     Base.metadata.create_all(bind=engine)
@@ -4,6 +4,7 @@ from .document import RawDocument
 from .ocr_text import OCRText
 from .cleaned_text import CleanedText
 from .summary import Summary
+from .job import Job
 
 __all__ = [
     "Patient",
@@ -11,5 +12,6 @@ __all__ = [
     "RawDocument",
     "OCRText",
     "CleanedText",
-    "Summary"
+    "Summary",
+    "Job"
 ]
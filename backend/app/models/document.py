@@ -16,6 +16,7 @@ class RawDocument(Base):
     file_path = Column(String(500), nullable=False)
     file_type = Column(String(50), nullable=False)  # pdf, jpg, png, etc.
     file_size = Column(Integer, nullable=True)  # size in bytes
+    content_hash = Column(String(64), nullable=True)  # sha256 of the file
     upload_date = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON, Integer
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from ..core.database import Base
+
+
+class Job(Base):
+    """
+    Job model for queued background processing of a visit
+    """
+    __tablename__ = "jobs"
+
+    job_id = Column(String(50), primary_key=True, index=True)
+    visit_id = Column(String(50), ForeignKey("visits.visit_id"), nullable=False)
+    job_type = Column(String(20), nullable=False)  # pipeline, ocr, clean, summarize
+    status = Column(String(20), default="queued")  # queued, running, completed, failed
+    stage = Column(String(20), nullable=True)  # stage currently running
+    attempts = Column(Integer, default=0)
+    result = Column(JSON, nullable=True)  # per-stage outcome (ids, timings)
+    error = Column(Text, nullable=True)
+    worker_id = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)  # running jobs past this are reclaimed; queued ones wait for it
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    visit = relationship("Visit", back_populates="jobs")
+
+    def __repr__(self):
+        return f"<Job {self.job_id} - {self.job_type} {self.status}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..core.database import Base
@@ -12,14 +12,17 @@ class OCRText(Base):
 
     ocr_id = Column(String(50), primary_key=True, index=True)
     visit_id = Column(String(50), ForeignKey("visits.visit_id"), nullable=False)
+    document_id = Column(String(50), ForeignKey("raw_documents.document_id"), nullable=True)  # source document
     raw_text = Column(Text, nullable=False)
     confidence_score = Column(String(10), nullable=True)
     processing_time = Column(String(20), nullable=True)  # time taken for OCR
+    page_details = Column(JSON, nullable=True)  # per-page source (text_layer/ocr) and confidence
     extracted_at = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     visit = relationship("Visit", back_populates="ocr_texts")
+    document = relationship("RawDocument")
 
     def __repr__(self):
         return f"<OCRText {self.ocr_id} - Visit {self.visit_id}>"
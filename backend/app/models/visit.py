@@ -25,6 +25,7 @@ class Visit(Base):
     ocr_texts = relationship("OCRText", back_populates="visit", cascade="all, delete-orphan")
     cleaned_texts = relationship("CleanedText", back_populates="visit", cascade="all, delete-orphan")
     summaries = relationship("Summary", back_populates="visit", cascade="all, delete-orphan")
+    jobs = relationship("Job", back_populates="visit", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Visit {self.visit_id} - Patient {self.patient_id}>"
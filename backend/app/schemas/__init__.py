@@ -1,9 +1,11 @@
 from .patient import PatientCreate, PatientResponse
 from .visit import VisitCreate, VisitResponse
 from .document import DocumentResponse
-from .ocr import OCRResponse
+from .ocr import OCRResponse, VisitOCRResponse
 from .cleaned import CleanedTextResponse
 from .summary import SummaryResponse
+from .job import JobResponse
+from .pipeline import PipelineResponse
 
 __all__ = [
     "PatientCreate",
@@ -12,6 +14,9 @@ __all__ = [
     "VisitResponse",
     "DocumentResponse",
     "OCRResponse",
+    "VisitOCRResponse",
     "CleanedTextResponse",
-    "SummaryResponse"
+    "SummaryResponse",
+    "JobResponse",
+    "PipelineResponse"
 ]
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Optional
 from datetime import datetime
 
 
@@ -10,6 +11,7 @@ class DocumentResponse(BaseModel):
     file_path: str
     file_type: str
     file_size: int
+    content_hash: Optional[str] = None
     upload_date: datetime
 
     class Config:
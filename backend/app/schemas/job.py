@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+
+class JobResponse(BaseModel):
+    """Schema for background job response"""
+    job_id: str
+    visit_id: str
+    job_type: str
+    status: str
+    stage: Optional[str] = None
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
@@ -7,10 +7,22 @@ class OCRResponse(BaseModel):
     """Schema for OCR response"""
     ocr_id: str
     visit_id: str
+    document_id: Optional[str] = None
     raw_text: str
     confidence_score: Optional[str] = None
     processing_time: Optional[str] = None
+    page_details: Optional[List[Dict[str, Any]]] = None
     extracted_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class VisitOCRResponse(BaseModel):
+    """Schema for OCR over all documents of a visit"""
+    visit_id: str
+    raw_text: str  # text of every document, in upload order
+    confidence_score: Optional[str] = None
+    processing_time: Optional[str] = None
+    documents: List[OCRResponse]
+    skipped_documents: List[str] = []  # already OCRed, not processed again
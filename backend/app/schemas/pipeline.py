@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Dict
+
+from .ocr import VisitOCRResponse
+from .cleaned import CleanedTextResponse
+from .summary import SummaryResponse
+
+
+class PipelineResponse(BaseModel):
+    """Schema for the combined processing pipeline response"""
+    visit_id: str
+    status: str
+    ocr: VisitOCRResponse
+    cleaned: CleanedTextResponse
+    summary: SummaryResponse
+    timings: Dict[str, float]  # seconds per stage, plus save and total
@@ -0,0 +1,159 @@
+import math
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StageOverloaded(Exception):
+    """
+    A stage's wait queue is full, or a request waited too long for a slot
+
+    The API answers with 429 and a Retry-After header.
+    """
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"Too many {stage} requests in progress. Retry in {retry_after}s.")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """
+    Concurrency limit with a bounded wait queue for one stage
+    """
+
+    def __init__(self, stage: str, max_concurrent: int, max_queue: int, max_wait: float):
+        """
+        Args:
+            stage: Stage name, used in errors and stats
+            max_concurrent: Requests that run at once
+            max_queue: Requests that may wait for a slot; more are turned away
+            max_wait: Seconds a request waits for a slot before it is turned away
+        """
+        self.stage = stage
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.avg_seconds = 1.0  # moving average of time spent holding a slot
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    @asynccontextmanager
+    async def slot(self, background: bool = False) -> AsyncIterator[None]:
+        """
+        Hold one of the stage's slots for the duration of the block
+
+        Args:
+            background: Wait for a slot however long it takes, ignoring the
+                queue bound (used by job workers, whose number is already fixed)
+
+        Raises:
+            StageOverloaded: The queue is full or the wait timed out
+        """
+        if not self._semaphore.locked():
+            # A slot is free; acquiring it does not wait
+            await self._semaphore.acquire()
+        else:
+            if not background and self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise StageOverloaded(self.stage, self.retry_after())
+
+            self.waiting += 1
+            try:
+                if background:
+                    await self._semaphore.acquire()
+                else:
+                    await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise StageOverloaded(self.stage, self.retry_after())
+            finally:
+                self.waiting -= 1
+
+        self.running += 1
+        self.admitted += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * (time.perf_counter() - start)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained"""
+        backlog = (self.waiting + 1) / self.max_concurrent
+        return max(1, math.ceil(backlog * self.avg_seconds))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_seconds": round(self.avg_seconds, 3)
+        }
+
+
+class AdmissionService:
+    """
+    Per-stage admission control for OCR, LLM cleaning, LLM summarization
+    and database-heavy reads
+
+    Each stage runs a limited number of requests at once and lets a limited
+    number wait for a slot. Requests beyond that are turned away straight
+    away with StageOverloaded instead of piling up until they time out, so
+    latency under overload stays bounded by the queue length.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        max_wait_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            limits: (max_concurrent, max_queue) by stage (defaults to the
+                *_CONCURRENCY and *_QUEUE settings)
+            max_wait_seconds: Longest wait for a slot
+                (defaults to settings.ADMISSION_MAX_WAIT_SECONDS)
+        """
+        if limits is None:
+            limits = {
+                "ocr": (settings.OCR_STAGE_CONCURRENCY, settings.OCR_STAGE_QUEUE),
+                "clean": (settings.CLEAN_STAGE_CONCURRENCY, settings.CLEAN_STAGE_QUEUE),
+                "summarize": (settings.SUMMARY_STAGE_CONCURRENCY, settings.SUMMARY_STAGE_QUEUE),
+                "db_read": (settings.DB_READ_CONCURRENCY, settings.DB_READ_QUEUE),
+            }
+        max_wait = max_wait_seconds or settings.ADMISSION_MAX_WAIT_SECONDS
+        self.limiters = {
+            stage: StageLimiter(stage, max_concurrent, max_queue, max_wait)
+            for stage, (max_concurrent, max_queue) in limits.items()
+        }
+
+    def slot(self, stage: str, background: bool = False):
+        """
+        Async context manager holding a slot of the given stage
+
+        Args:
+            stage: ocr, clean, summarize or db_read
+            background: Wait without the queue bound or timeout
+        """
+        return self.limiters[stage].slot(background)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Running and waiting requests and admission counters by stage
+        """
+        return {stage: limiter.stats() for stage, limiter in self.limiters.items()}
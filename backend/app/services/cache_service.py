@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CacheService:
+    """
+    Persistent key/value cache stored in a local SQLite file
+
+    Values are stored as JSON. When the total stored size goes over
+    max_bytes, the least recently used entries are evicted. The file can be
+    shared by several processes; hit/miss counters are per process.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: Optional[int] = None):
+        """
+        Open (or create) the cache file
+
+        Args:
+            path: SQLite file path
+            max_bytes: Upper bound on the total size of stored values
+            ttl_seconds: Entries older than this are treated as misses
+                (None keeps entries until they are evicted)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed_at ON cache_entries(accessed_at)"
+        )
+        logger.info(f"Cache opened at {path} (max {max_bytes} bytes)")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (self.ttl_seconds is not None and now - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value, evicting old entries if the cache is over its size
+
+        Args:
+            key: Cache key
+            value: JSON-serialisable value
+        """
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {key}: {size} bytes exceeds cache size")
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now)
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """
+        Remove least recently used entries until the cache fits max_bytes
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM cache_entries ORDER BY accessed_at ASC"
+        ).fetchall()
+
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM cache_entries WHERE key = ?", stale)
+        self.evictions += len(stale)
+        logger.info(f"Evicted {len(stale)} cache entries from {self.path}")
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self) -> int:
+        """
+        Remove every entry
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM cache_entries").rowcount
+        logger.info(f"Cleared {removed} entries from {self.path}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and current size
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+    def close(self) -> None:
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+from ..core.config import settings
+from .ocr_service import OCRService
+from .llm_service import LLMService
+from .admission_service import AdmissionService
+from .pipeline_service import PipelineService
+from .job_service import JobService
+from .storage_service import StorageService
+from .ingest_service import IngestService
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    The services the API shares, created and shut down with the app
+
+    Nothing is built at import time: start() creates the services when the
+    app starts up (OCR models still load only on first use, or in the
+    background with OCR_WARMUP) and stop() releases them on shutdown. Routes
+    get them through the dependencies in app.api.deps.
+
+    Any service can be passed in to replace the default one, e.g. a local
+    LLM stand-in for tests and benchmarks.
+    """
+
+    def __init__(
+        self,
+        ocr_service: Optional[OCRService] = None,
+        llm_service: Optional[LLMService] = None,
+        admission_service: Optional[AdmissionService] = None,
+        storage_service: Optional[StorageService] = None,
+        job_workers: Optional[int] = None
+    ):
+        """
+        Args:
+            ocr_service: OCR service to use instead of the default
+            llm_service: LLM service to use instead of the default
+            admission_service: Admission control to use instead of the default
+            storage_service: Upload storage to use instead of the default
+            job_workers: Number of job workers (defaults to settings.JOB_WORKERS)
+        """
+        self.ocr_service = ocr_service
+        self.llm_service = llm_service
+        self.admission_service = admission_service
+        self.storage_service = storage_service
+        self.job_workers = job_workers
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.pipeline_service: Optional[PipelineService] = None
+        self.job_service: Optional[JobService] = None
+        self.ingest_service: Optional[IngestService] = None
+        self._owns_ocr = ocr_service is None
+        self._owns_llm = llm_service is None
+
+    async def start(self) -> None:
+        """
+        Create the services and start the background job workers
+        """
+        if self.ocr_service is None:
+            self.ocr_service = OCRService()
+        if self.llm_service is None:
+            # One connection pool for every LLM call in this process
+            self.http_client = httpx.AsyncClient(
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+            self.llm_service = LLMService(http_client=self.http_client)
+        if self.admission_service is None:
+            self.admission_service = AdmissionService()
+        if self.storage_service is None:
+            self.storage_service = StorageService()
+
+        self.pipeline_service = PipelineService(
+            ocr_service=self.ocr_service,
+            llm_service=self.llm_service,
+            admission_service=self.admission_service
+        )
+        self.job_service = JobService(self.pipeline_service, workers=self.job_workers)
+        self.ingest_service = IngestService(self.storage_service)
+
+        if settings.OCR_WARMUP:
+            # Load OCR models in the background so startup does not wait for them
+            asyncio.get_running_loop().run_in_executor(None, self.ocr_service.warm_up)
+
+        await self.job_service.start()
+
+    async def stop(self) -> None:
+        """
+        Stop the job workers, OCR worker processes and LLM connections
+        """
+        if self.job_service is not None:
+            await self.job_service.stop()
+        # Services passed in are left to whoever created them
+        if self._owns_ocr and self.ocr_service is not None:
+            self.ocr_service.close()
+            self.ocr_service = None
+        if self._owns_llm and self.llm_service is not None:
+            await self.llm_service.aclose()
+            self.llm_service = None
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
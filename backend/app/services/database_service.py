@@ -1,10 +1,11 @@
 import uuid
 import logging
-from typing import Optional, List
+from typing import Optional, List, Tuple, Dict
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from ..models import Patient, Visit, RawDocument, OCRText, CleanedText, Summary
+from ..models import Patient, Visit, RawDocument, OCRText, CleanedText, Summary, Job
 from ..schemas import (
     PatientCreate, PatientResponse,
     VisitCreate, VisitResponse,
@@ -117,15 +118,17 @@ class DatabaseService:
         return db.query(Visit).filter(Visit.visit_id == visit_id).first()
     
     @staticmethod
-    def update_visit_status(db: Session, visit_id: str, status: str) -> None:
-        """Update visit status"""
+    def update_visit_status(db: Session, visit_id: str, status: str, commit: bool = True) -> None:
+        """Update visit status (commit=False leaves it, and any rollback, to the caller's transaction)"""
         try:
             visit = db.query(Visit).filter(Visit.visit_id == visit_id).first()
             if visit:
                 visit.status = status
-                db.commit()
+                if commit:
+                    db.commit()
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             logger.error(f"Error updating visit status: {str(e)}")
             raise
     
@@ -137,7 +140,8 @@ class DatabaseService:
         filename: str,
         file_path: str,
         file_type: str,
-        file_size: int
+        file_size: int,
+        content_hash: Optional[str] = None
     ) -> RawDocument:
         """
         Create a new document record
@@ -149,6 +153,7 @@ class DatabaseService:
             file_path: Saved file path
             file_type: File type
             file_size: File size in bytes
+            content_hash: SHA-256 of the file content
             
         Returns:
             Created document object
@@ -162,7 +167,8 @@ class DatabaseService:
                 filename=filename,
                 file_path=file_path,
                 file_type=file_type,
-                file_size=file_size
+                file_size=file_size,
+                content_hash=content_hash
             )
             
             db.add(document)
@@ -177,10 +183,51 @@ class DatabaseService:
             logger.error(f"Error creating document: {str(e)}")
             raise
     
+    @staticmethod
+    def create_records(
+        db: Session,
+        patients: List[Dict],
+        visits: List[Dict],
+        documents: List[Dict]
+    ) -> None:
+        """
+        Insert a batch of patients, visits and documents in one transaction
+        
+        Used by bulk ingestion: rows are inserted with multi-row statements
+        instead of a round trip and commit per record. IDs are assigned by
+        the caller (see generate_id).
+        
+        Args:
+            db: Database session
+            patients: Patient column values
+            visits: Visit column values
+            documents: Document column values
+        """
+        try:
+            db.add_all([Patient(**values) for values in patients])
+            db.add_all([Visit(**values) for values in visits])
+            db.add_all([RawDocument(**values) for values in documents])
+            db.commit()
+            
+            logger.info(
+                f"Created {len(patients)} patients, {len(visits)} visits "
+                f"and {len(documents)} documents"
+            )
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error creating records: {str(e)}")
+            raise
+    
     @staticmethod
     def get_documents_by_visit(db: Session, visit_id: str) -> List[RawDocument]:
-        """Get all documents for a visit"""
-        return db.query(RawDocument).filter(RawDocument.visit_id == visit_id).all()
+        """Get all documents for a visit in upload order"""
+        return (
+            db.query(RawDocument)
+            .filter(RawDocument.visit_id == visit_id)
+            .order_by(RawDocument.upload_date, RawDocument.document_id)
+            .all()
+        )
     
     # OCR Text operations
     @staticmethod
@@ -189,7 +236,10 @@ class DatabaseService:
         visit_id: str,
         raw_text: str,
         confidence_score: str,
-        processing_time: str
+        processing_time: str,
+        page_details: Optional[list] = None,
+        document_id: Optional[str] = None,
+        commit: bool = True
     ) -> OCRText:
         """
         Create OCR text record
@@ -200,6 +250,10 @@ class DatabaseService:
             raw_text: Extracted OCR text
             confidence_score: OCR confidence score
             processing_time: Time taken for OCR
+            page_details: Per-page text source and confidence
+            document_id: Document the text was extracted from
+            commit: Commit now, or only flush into the caller's transaction
+                (which is then also left to roll back on errors)
             
         Returns:
             Created OCR text object
@@ -210,20 +264,26 @@ class DatabaseService:
             ocr_text = OCRText(
                 ocr_id=ocr_id,
                 visit_id=visit_id,
+                document_id=document_id,
                 raw_text=raw_text,
                 confidence_score=confidence_score,
-                processing_time=processing_time
+                processing_time=processing_time,
+                page_details=page_details
             )
             
             db.add(ocr_text)
-            db.commit()
-            db.refresh(ocr_text)
+            if commit:
+                db.commit()
+                db.refresh(ocr_text)
+            else:
+                db.flush()
             
             logger.info(f"Created OCR text: {ocr_id}")
             return ocr_text
             
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             logger.error(f"Error creating OCR text: {str(e)}")
             raise
     
@@ -232,6 +292,39 @@ class DatabaseService:
         """Get latest OCR text for a visit"""
         return db.query(OCRText).filter(OCRText.visit_id == visit_id).order_by(OCRText.created_at.desc()).first()
     
+    @staticmethod
+    def get_document_ocr_texts(db: Session, visit_id: str) -> List[Tuple[RawDocument, OCRText]]:
+        """
+        Get the latest OCR text of each document of a visit
+        
+        OCR texts stored before they were linked to a document are taken
+        to belong to the visit's first document, the only one OCRed then.
+        
+        Args:
+            db: Database session
+            visit_id: Visit ID
+            
+        Returns:
+            (document, ocr_text) pairs in upload order, for documents
+            that have been OCRed
+        """
+        documents = DatabaseService.get_documents_by_visit(db, visit_id)
+        ocr_texts = db.query(OCRText).filter(OCRText.visit_id == visit_id).order_by(OCRText.created_at).all()
+        
+        # Later rows overwrite earlier ones, leaving the latest per document
+        latest = {}
+        for ocr_text in ocr_texts:
+            latest[ocr_text.document_id] = ocr_text
+        
+        if documents and None in latest:
+            latest.setdefault(documents[0].document_id, latest[None])
+        
+        return [
+            (document, latest[document.document_id])
+            for document in documents
+            if document.document_id in latest
+        ]
+    
     # Cleaned Text operations
     @staticmethod
     def create_cleaned_text(
@@ -239,7 +332,8 @@ class DatabaseService:
         visit_id: str,
         cleaned_text: str,
         extracted_data: dict,
-        processing_time: str
+        processing_time: str,
+        commit: bool = True
     ) -> CleanedText:
         """
         Create cleaned text record
@@ -250,6 +344,8 @@ class DatabaseService:
             cleaned_text: LLM-cleaned text
             extracted_data: Structured data extraction
             processing_time: Time taken for cleaning
+            commit: Commit now, or only flush into the caller's transaction
+                (which is then also left to roll back on errors)
             
         Returns:
             Created cleaned text object
@@ -266,14 +362,18 @@ class DatabaseService:
             )
             
             db.add(cleaned)
-            db.commit()
-            db.refresh(cleaned)
+            if commit:
+                db.commit()
+                db.refresh(cleaned)
+            else:
+                db.flush()
             
             logger.info(f"Created cleaned text: {cleaned_id}")
             return cleaned
             
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             logger.error(f"Error creating cleaned text: {str(e)}")
             raise
     
@@ -289,7 +389,8 @@ class DatabaseService:
         visit_id: str,
         summary_text: str,
         key_findings: str,
-        processing_time: str
+        processing_time: str,
+        commit: bool = True
     ) -> Summary:
         """
         Create summary record
@@ -300,6 +401,8 @@ class DatabaseService:
             summary_text: Generated summary
             key_findings: Key findings
             processing_time: Time taken for summarization
+            commit: Commit now, or only flush into the caller's transaction
+                (which is then also left to roll back on errors)
             
         Returns:
             Created summary object
@@ -316,14 +419,18 @@ class DatabaseService:
             )
             
             db.add(summary)
-            db.commit()
-            db.refresh(summary)
+            if commit:
+                db.commit()
+                db.refresh(summary)
+            else:
+                db.flush()
             
             logger.info(f"Created summary: {summary_id}")
             return summary
             
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             logger.error(f"Error creating summary: {str(e)}")
             raise
     
@@ -336,3 +443,98 @@ class DatabaseService:
     def get_all_visits(db: Session, limit: int = 50) -> List[Visit]:
         """Get all visits"""
         return db.query(Visit).order_by(Visit.created_at.desc()).limit(limit).all()
+    
+    # Job operations
+    @staticmethod
+    def create_job(db: Session, visit_id: str, job_type: str) -> Job:
+        """
+        Create a queued background job
+        
+        Args:
+            db: Database session
+            visit_id: Visit ID
+            job_type: Stages to run (pipeline, ocr, clean or summarize)
+            
+        Returns:
+            Created job object
+        """
+        try:
+            job_id = DatabaseService.generate_id("JOB")
+            
+            job = Job(
+                job_id=job_id,
+                visit_id=visit_id,
+                job_type=job_type,
+                status="queued",
+                attempts=0
+            )
+            
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            
+            logger.info(f"Created job: {job_id} ({job_type})")
+            return job
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error creating job: {str(e)}")
+            raise
+    
+    @staticmethod
+    def create_jobs(db: Session, visit_ids: List[str], job_type: str) -> List[str]:
+        """
+        Create queued jobs for several visits with a single commit
+        
+        Args:
+            db: Database session
+            visit_ids: Visit IDs
+            job_type: Stages to run (pipeline, ocr, clean or summarize)
+            
+        Returns:
+            Created job IDs, in the order of visit_ids
+        """
+        try:
+            jobs = [
+                Job(
+                    job_id=DatabaseService.generate_id("JOB"),
+                    visit_id=visit_id,
+                    job_type=job_type,
+                    status="queued",
+                    attempts=0
+                )
+                for visit_id in visit_ids
+            ]
+            
+            job_ids = [job.job_id for job in jobs]
+            
+            db.add_all(jobs)
+            db.commit()
+            
+            logger.info(f"Created {len(jobs)} jobs ({job_type})")
+            return job_ids
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error creating jobs: {str(e)}")
+            raise
+    
+    @staticmethod
+    def get_job(db: Session, job_id: str) -> Optional[Job]:
+        """Get job by ID"""
+        return db.query(Job).filter(Job.job_id == job_id).first()
+    
+    @staticmethod
+    def get_active_job(db: Session, visit_id: str, job_type: str) -> Optional[Job]:
+        """Get a queued or running job of this type for a visit"""
+        return (
+            db.query(Job)
+            .filter(Job.visit_id == visit_id, Job.job_type == job_type, Job.status.in_(["queued", "running"]))
+            .order_by(Job.created_at.desc())
+            .first()
+        )
+    
+    @staticmethod
+    def get_job_counts(db: Session) -> Dict[str, int]:
+        """Get the number of jobs in each status"""
+        return dict(db.query(Job.status, func.count(Job.job_id)).group_by(Job.status).all())
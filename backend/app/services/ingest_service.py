@@ -0,0 +1,283 @@
+import os
+import logging
+import zipfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from .database_service import DatabaseService
+from .storage_service import StorageService, StagedFile, StagedPart, FileTooLargeError, UnsupportedFileTypeError
+
+logger = logging.getLogger(__name__)
+
+
+class IngestService:
+    """
+    Bulk ingestion of many documents in one request
+
+    Takes the files staged by StorageService.stage_files: documents are
+    moved into place as they are, and zip archives are expanded one entry
+    at a time (never fully in memory), each entry streamed to storage.
+    Meanwhile the patient, visit and document rows are collected and
+    inserted in batches with one commit each.
+
+    A batch that cannot be inserted is rolled back on its own: its files
+    are deleted, its documents are listed under "errors" and ingestion
+    carries on, so the manifest always accounts for the batches that were
+    committed.
+    """
+
+    def __init__(self, storage_service: Optional[StorageService] = None, batch_size: Optional[int] = None):
+        """
+        Args:
+            storage_service: Writes the documents to disk
+            batch_size: Documents inserted per commit
+                (defaults to settings.BULK_UPLOAD_BATCH_SIZE)
+        """
+        self.storage_service = storage_service or StorageService()
+        self.batch_size = batch_size or settings.BULK_UPLOAD_BATCH_SIZE
+
+    def ingest(
+        self,
+        db: Session,
+        uploads: List[StagedPart],
+        single_visit: bool = False,
+        visit_type: str = "consultation",
+        on_batch: Optional[Callable[[Session, List[str]], Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Store every document and create its records
+
+        Args:
+            db: Database session
+            uploads: Staged upload parts; .zip files are expanded. The
+                caller discards their staged files afterwards (those
+                stored are no longer there)
+            single_visit: Put all documents in one new visit instead of
+                creating a patient and visit per document
+            visit_type: Type of the created visits
+            on_batch: Called with the IDs of visits that are complete after
+                each commit; returns a job ID per visit to record in the
+                manifest
+
+        Returns:
+            Manifest with the created records, the skipped entries and the
+            errors (documents that could not be saved, visits whose job
+            could not be queued)
+        """
+        documents: List[Dict[str, Any]] = []
+        skipped: List[Dict[str, str]] = []
+        errors: List[Dict[str, str]] = []
+        pending = {"patients": [], "visits": [], "documents": []}
+        jobs: Dict[str, str] = {}
+        visit_ids: List[str] = []
+
+        def new_visit() -> Tuple[str, str]:
+            patient_id = DatabaseService.generate_id("PAT")
+            visit_id = DatabaseService.generate_id("VIS")
+            pending["patients"].append({"patient_id": patient_id})
+            pending["visits"].append({
+                "visit_id": visit_id,
+                "patient_id": patient_id,
+                "visit_type": visit_type,
+                "status": "uploaded"
+            })
+            visit_ids.append(visit_id)
+            return patient_id, visit_id
+
+        def flush(completed: List[str]) -> None:
+            try:
+                DatabaseService.create_records(db, pending["patients"], pending["visits"], pending["documents"])
+            except Exception as e:
+                logger.error(f"Bulk upload batch of {len(pending['documents'])} documents not saved: {str(e)}")
+                # The batch was rolled back; do not leave its files on disk
+                failed = set()
+                for document in pending["documents"]:
+                    self.storage_service.delete(document["file_path"])
+                    failed.add(document["document_id"])
+                    errors.append({"filename": document["filename"], "reason": f"Could not save: {str(e)}"})
+                documents[:] = [document for document in documents if document["document_id"] not in failed]
+                pending["documents"] = []
+                # A shared visit that is not saved yet stays pending for the next batch
+                if shared is None:
+                    lost = {visit["visit_id"] for visit in pending["visits"]}
+                    visit_ids[:] = [visit_id for visit_id in visit_ids if visit_id not in lost]
+                    pending["patients"], pending["visits"] = [], []
+                return
+
+            for key in pending:
+                pending[key] = []
+            if on_batch is not None and completed:
+                try:
+                    jobs.update(on_batch(db, completed))
+                except Exception as e:
+                    logger.error(f"Could not queue jobs for {len(completed)} bulk uploaded visits: {str(e)}")
+                    errors.extend(
+                        {"visit_id": visit_id, "reason": f"Could not queue job: {str(e)}"} for visit_id in completed
+                    )
+
+        shared = new_visit() if single_visit else None
+        used_names = set()
+        batch_visits: List[str] = []
+
+        for name, stage_entry in self._entries(uploads, skipped):
+            file_ext = os.path.splitext(name)[1].lower()
+            if file_ext not in settings.ALLOWED_EXTENSIONS:
+                skipped.append({"filename": name, "reason": f"File type {file_ext or '(none)'} not allowed"})
+                continue
+
+            if shared is not None:
+                patient_id, visit_id = shared
+                name = self._unique_name(name, used_names)
+            else:
+                patient_id, visit_id = new_visit()
+                batch_visits.append(visit_id)
+
+            try:
+                staged = stage_entry()
+                file_path = self.storage_service.store(staged, visit_id, name)
+            except Exception as e:
+                if isinstance(e, (FileTooLargeError, UnsupportedFileTypeError)):
+                    reason = str(e)
+                else:
+                    logger.warning(f"Could not store {name}: {str(e)}")
+                    reason = f"Could not read file: {str(e)}"
+                if shared is None:
+                    # Drop the records of the visit created for this document
+                    pending["patients"].pop()
+                    pending["visits"].pop()
+                    visit_ids.pop()
+                    batch_visits.pop()
+                skipped.append({"filename": name, "reason": reason})
+                continue
+
+            document = {
+                "document_id": DatabaseService.generate_id("DOC"),
+                "visit_id": visit_id,
+                "filename": name,
+                "file_path": file_path,
+                "file_type": staged.file_type,
+                "file_size": staged.size,
+                "content_hash": staged.content_hash,
+                "upload_date": datetime.utcnow()
+            }
+            pending["documents"].append(document)
+            documents.append({
+                "patient_id": patient_id,
+                "visit_id": visit_id,
+                "document_id": document["document_id"],
+                "filename": name,
+                "file_size": staged.size,
+                "content_hash": staged.content_hash
+            })
+
+            if len(pending["documents"]) >= self.batch_size:
+                flush(batch_visits)
+                batch_visits = []
+
+        if single_visit:
+            # The shared visit is complete only once every document is in
+            batch_visits = visit_ids if documents else []
+            if not documents:
+                # Nothing was stored, so do not leave an empty visit behind
+                pending["patients"], pending["visits"] = [], []
+                visit_ids = []
+        flush(batch_visits)
+        if shared is not None and pending["visits"]:
+            # The shared visit was in every batch that failed
+            pending["patients"], pending["visits"] = [], []
+            visit_ids = []
+
+        for document in documents:
+            if document["visit_id"] in jobs:
+                document["job_id"] = jobs[document["visit_id"]]
+
+        logger.info(
+            f"Bulk upload stored {len(documents)} documents, skipped {len(skipped)}, errors {len(errors)}"
+        )
+        return {
+            "message": f"Uploaded {len(documents)} documents" + (f", {len(errors)} errors" if errors else ""),
+            "visits_created": len(visit_ids),
+            "documents_created": len(documents),
+            "jobs_queued": len(jobs),
+            "documents": documents,
+            "skipped": skipped,
+            "errors": errors
+        }
+
+    def _entries(
+        self,
+        uploads: List[StagedPart],
+        skipped: List[Dict[str, str]]
+    ) -> Iterator[Tuple[str, Callable[[], StagedFile]]]:
+        """
+        Yield (filename, stage) for every document in the uploads
+
+        stage returns the document's staged file, or raises the error it
+        was rejected with. Zip archives are expanded; their folders, macOS
+        metadata and entries declared larger than the size limit are
+        skipped. Filenames are reduced to their base name so entries cannot
+        escape the visit folder.
+        """
+        for upload in uploads:
+            filename = self._safe_name(upload.filename)
+            if not filename:
+                skipped.append({"filename": upload.filename, "reason": "Missing filename"})
+                continue
+
+            if upload.staged is None or upload.staged.file_type != "zip":
+                yield filename, lambda upload=upload: self._staged(upload)
+                continue
+
+            try:
+                archive = zipfile.ZipFile(upload.staged.temp_path)
+            except zipfile.BadZipFile:
+                skipped.append({"filename": filename, "reason": "Not a valid zip archive"})
+                continue
+
+            with archive:
+                for info in archive.infolist():
+                    if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                        continue
+                    name = self._safe_name(info.filename)
+                    if not name or name.startswith("."):
+                        continue
+                    if info.file_size > self.storage_service.max_size:
+                        # Declared size; the actual size is enforced while streaming
+                        skipped.append({
+                            "filename": f"{filename}/{info.filename}",
+                            "reason": str(FileTooLargeError(self.storage_service.max_size))
+                        })
+                        continue
+                    yield name, lambda info=info: self._stage_member(archive, info)
+
+    @staticmethod
+    def _staged(upload: StagedPart) -> StagedFile:
+        """The staged file of a document part, or the error it was rejected with"""
+        if upload.error is not None:
+            raise upload.error
+        return upload.staged
+
+    def _stage_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> StagedFile:
+        """Stream a zip archive entry to a temporary file"""
+        with archive.open(info) as source:
+            return self.storage_service.stage(source)
+
+    @staticmethod
+    def _safe_name(filename: str) -> str:
+        """Base name of an uploaded or archived path"""
+        return os.path.basename(filename.replace("\\", "/")).strip()
+
+    @staticmethod
+    def _unique_name(name: str, used: set) -> str:
+        """Suffix a filename that is already taken in the visit folder"""
+        stem, ext = os.path.splitext(name)
+        candidate, counter = name, 1
+        while candidate.lower() in used:
+            candidate = f"{stem}_{counter}{ext}"
+            counter += 1
+        used.add(candidate.lower())
+        return candidate
+
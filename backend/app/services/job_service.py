@@ -0,0 +1,400 @@
+import os
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models import Job
+from .database_service import DatabaseService
+from .pipeline_service import PipelineService, PipelineError
+from .llm_service import LLMRateLimitError, LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# PipelineService steps each job type runs, in order
+JOB_STAGES = {
+    "pipeline": ("process",),
+    "ocr": ("ocr",),
+    "clean": ("clean",),
+    "summarize": ("summarize",),
+}
+
+
+class JobLeaseLost(Exception):
+    """The job was reclaimed by another worker while this one ran it"""
+
+
+class JobService:
+    """
+    Persistent job queue for the processing stages, with a pool of workers
+
+    Jobs live in the jobs table, so they survive restarts and are shared by
+    every API process. Workers are asyncio tasks: they claim the oldest
+    queued job, run its stages through PipelineService and record progress
+    on the job row. A running job holds a lease that its worker renews; if
+    the worker dies, the lease runs out and another worker picks the job up
+    again. Stages that had finished and documents that were already OCRed
+    are not redone. Workers wait for admission slots rather than being
+    turned away when a stage is busy.
+
+    A job that fails on a transient LLM error (rate limit, timeout,
+    provider unavailable) goes back in the queue until it has used
+    max_attempts, waiting retry_seconds (doubled per attempt, at least the
+    provider's Retry-After) before it can be claimed again. Queued jobs use
+    lease_expires_at for that time.
+    """
+
+    def __init__(
+        self,
+        pipeline_service: PipelineService,
+        workers: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        poll_interval_ms: Optional[int] = None,
+        retry_seconds: Optional[float] = None,
+        session_factory=SessionLocal
+    ):
+        """
+        Args:
+            pipeline_service: Service that runs the stages
+            workers: Number of worker tasks (defaults to settings.JOB_WORKERS)
+            lease_seconds: How long a claimed job stays reserved without a
+                heartbeat (defaults to settings.JOB_LEASE_SECONDS)
+            max_attempts: Claims before a job is given up on
+                (defaults to settings.JOB_MAX_ATTEMPTS)
+            poll_interval_ms: How often idle workers check for new jobs
+                (defaults to settings.JOB_POLL_INTERVAL_MS)
+            retry_seconds: Wait before the first retry of a job that hit a
+                transient LLM error (defaults to settings.JOB_RETRY_SECONDS)
+            session_factory: Creates database sessions for the workers
+        """
+        self.pipeline_service = pipeline_service
+        self.workers = workers if workers is not None else settings.JOB_WORKERS
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.poll_interval = (poll_interval_ms or settings.JOB_POLL_INTERVAL_MS) / 1000
+        self.retry_seconds = settings.JOB_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self.session_factory = session_factory
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # Queue
+    def enqueue(self, db: Session, visit_id: str, job_type: str) -> Job:
+        """
+        Queue a job, or return the one already queued or running
+
+        Args:
+            db: Database session
+            visit_id: Visit ID
+            job_type: One of JOB_STAGES
+
+        Returns:
+            The job object
+        """
+        if job_type not in JOB_STAGES:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job = DatabaseService.get_active_job(db, visit_id, job_type)
+        if job is None:
+            job = DatabaseService.create_job(db, visit_id, job_type)
+            self._notify()
+        return job
+
+    def enqueue_many(self, db: Session, visit_ids: List[str], job_type: str) -> List[str]:
+        """
+        Queue jobs for newly created visits with a single commit
+
+        Unlike enqueue, this does not look for jobs that are already active,
+        so it is meant for visits that cannot have any yet.
+
+        Args:
+            db: Database session
+            visit_ids: Visit IDs
+            job_type: One of JOB_STAGES
+
+        Returns:
+            Job IDs, in the order of visit_ids
+        """
+        if job_type not in JOB_STAGES:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if not visit_ids:
+            return []
+
+        job_ids = DatabaseService.create_jobs(db, visit_ids, job_type)
+        self._notify()
+        return job_ids
+
+    def stats(self, db: Session) -> Dict[str, Any]:
+        """
+        Job counts by status and the local worker pool size
+        """
+        counts = DatabaseService.get_job_counts(db)
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "completed": counts.get("completed", 0),
+            "failed": counts.get("failed", 0),
+            "workers": len(self._tasks)
+        }
+
+    def _notify(self) -> None:
+        """Wake an idle worker in this process (callable from any thread)"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # Workers
+    async def start(self) -> None:
+        """
+        Start the worker tasks on the running event loop
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self.worker_prefix}:{i}"), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self) -> None:
+        """
+        Stop the workers and put their unfinished jobs back in the queue
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        released = await run_in_threadpool(self._release, self.worker_prefix)
+        if released:
+            logger.info(f"Requeued {released} unfinished jobs")
+
+    async def _worker(self, worker_id: str) -> None:
+        while True:
+            try:
+                claimed = await run_in_threadpool(self._claim, worker_id)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} could not claim a job: {str(e)}")
+                claimed = None
+
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(worker_id, *claimed)
+            except Exception:
+                # Never let a job take the worker down; an unrecorded job is
+                # reclaimed once its lease runs out
+                logger.exception(f"Job worker {worker_id} failed while running job {claimed[0]}")
+
+    def _claim(self, worker_id: str) -> Optional[Tuple[str, str, str, Dict[str, Any], int]]:
+        """
+        Take the oldest queued job that is not waiting to be retried, or a
+        running job whose lease ran out
+
+        Returns:
+            (job_id, visit_id, job_type, result so far, attempts), or None
+            if there is nothing to do
+        """
+        db = self.session_factory()
+        try:
+            while True:
+                now = datetime.utcnow()
+                job = (
+                    db.query(Job)
+                    .filter(or_(
+                        and_(Job.status == "queued", or_(Job.lease_expires_at.is_(None), Job.lease_expires_at <= now)),
+                        and_(Job.status == "running", Job.lease_expires_at < now)
+                    ))
+                    .order_by(Job.created_at)
+                    .with_for_update(skip_locked=True)
+                    .first()
+                )
+                if job is None:
+                    db.commit()
+                    return None
+
+                if job.status == "running":
+                    logger.warning(f"Reclaiming job {job.job_id} from {job.worker_id}: lease expired")
+
+                if job.attempts >= self.max_attempts:
+                    job.status = "failed"
+                    job.error = job.error or f"Gave up after {job.attempts} attempts"
+                    job.finished_at = now
+                    job.lease_expires_at = None
+                    db.commit()
+                    continue
+
+                job.status = "running"
+                job.attempts += 1
+                job.worker_id = worker_id
+                job.lease_expires_at = now + timedelta(seconds=self.lease_seconds)
+                job.started_at = job.started_at or now
+                db.commit()
+
+                logger.info(f"Job {job.job_id} claimed by {worker_id} (attempt {job.attempts})")
+                return job.job_id, job.visit_id, job.job_type, dict(job.result or {}), job.attempts
+        finally:
+            db.close()
+
+    async def _run(
+        self,
+        worker_id: str,
+        job_id: str,
+        visit_id: str,
+        job_type: str,
+        result: Dict[str, Any],
+        attempts: int
+    ) -> None:
+        """
+        Run the stages of a claimed job, recording progress on the job row
+        """
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id))
+        db = self.session_factory()
+        try:
+            for stage in JOB_STAGES[job_type]:
+                # Stages finished before a crash are not run again
+                if stage in result:
+                    continue
+
+                if stage == "process":
+                    # The combined pipeline reports each of its stages as it starts
+                    async def progress(name: str) -> None:
+                        await run_in_threadpool(self._update, job_id, worker_id, stage=name)
+
+                    response = await self.pipeline_service.process(
+                        db, visit_id, on_stage=progress, background=True
+                    )
+                else:
+                    await run_in_threadpool(self._update, job_id, worker_id, stage=stage)
+                    response = await getattr(self.pipeline_service, stage)(db, visit_id, background=True)
+                result[stage] = self._stage_result(response)
+                await run_in_threadpool(self._update, job_id, worker_id, result=dict(result))
+
+            await run_in_threadpool(
+                self._update, job_id, worker_id,
+                status="completed", stage=None, error=None, finished_at=datetime.utcnow(), lease_expires_at=None
+            )
+            logger.info(f"Job {job_id} completed")
+
+        except JobLeaseLost:
+            logger.warning(f"Job {job_id} was reclaimed from {worker_id}, dropping it")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            detail = e.detail if isinstance(e, PipelineError) else str(e)
+            if isinstance(e, (LLMRateLimitError, LLMUnavailableError)) and attempts < self.max_attempts:
+                delay = max(self.retry_seconds * 2 ** (attempts - 1), e.retry_after or 0)
+                logger.warning(f"Job {job_id} hit a transient LLM error, retrying in {delay:.1f}s: {detail}")
+                fields = dict(
+                    status="queued", stage=None, error=detail, worker_id=None,
+                    lease_expires_at=datetime.utcnow() + timedelta(seconds=delay)
+                )
+            else:
+                logger.error(f"Job {job_id} failed: {detail}")
+                fields = dict(status="failed", error=detail, finished_at=datetime.utcnow(), lease_expires_at=None)
+            try:
+                await run_in_threadpool(self._update, job_id, worker_id, **fields)
+            except JobLeaseLost:
+                pass
+            except Exception as update_error:
+                # The lease runs out and the job is claimed again
+                logger.error(f"Could not record the outcome of job {job_id}: {str(update_error)}")
+        finally:
+            heartbeat.cancel()
+            db.close()
+
+    async def _heartbeat(self, job_id: str, worker_id: str) -> None:
+        """Keep extending the lease of a job while it runs"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await run_in_threadpool(
+                    self._update, job_id, worker_id,
+                    lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+                )
+            except JobLeaseLost:
+                return
+            except Exception as e:
+                logger.error(f"Could not renew lease of job {job_id}: {str(e)}")
+
+    def _update(self, job_id: str, owner: str, **fields) -> None:
+        """
+        Update a running job, provided this worker still owns it
+
+        fields may include worker_id, to hand the job back to the queue.
+
+        Raises:
+            JobLeaseLost: The job is no longer running under owner
+        """
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.job_id == job_id).with_for_update().first()
+            if job is None or job.status != "running" or job.worker_id != owner:
+                db.rollback()
+                raise JobLeaseLost(job_id)
+
+            for name, value in fields.items():
+                setattr(job, name, value)
+            db.commit()
+        finally:
+            db.close()
+
+    def _release(self, worker_prefix: str) -> int:
+        """
+        Put running jobs of this process back in the queue
+
+        The attempt each job was claimed with is given back, since the job
+        did not fail; otherwise a job in flight across a few restarts would
+        run out of attempts.
+
+        Returns:
+            Number of jobs requeued
+        """
+        db = self.session_factory()
+        try:
+            released = (
+                db.query(Job)
+                .filter(Job.status == "running", Job.worker_id.like(f"{worker_prefix}:%"))
+                .update(
+                    {
+                        Job.status: "queued",
+                        Job.worker_id: None,
+                        Job.lease_expires_at: None,
+                        Job.stage: None,
+                        Job.attempts: Job.attempts - 1
+                    },
+                    synchronize_session=False
+                )
+            )
+            db.commit()
+            return released
+        finally:
+            db.close()
+
+    @staticmethod
+    def _stage_result(response: BaseModel) -> Dict[str, Any]:
+        """
+        Keep the ids and timings of a stage's response for the job record
+        """
+        data = response.model_dump(mode="json")
+        return {
+            key: value
+            for key, value in data.items()
+            if (key.endswith("_id") and key != "visit_id")
+            or key in ("processing_time", "confidence_score", "timings")
+        }
@@ -0,0 +1,205 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM replies keyed by a fingerprint of the request
+
+    The key covers everything that determines the reply: model, messages,
+    temperature and max_tokens. Lookups go to a small in-process LRU first,
+    then to a persistent CacheService shared with other processes and kept
+    across restarts; a persistent hit is copied into the LRU. Entries older
+    than ttl_seconds count as misses in both tiers.
+
+    Counters are kept per method (clean, extract, summary, findings, fused)
+    so hit rates can be compared between operations.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: Optional[int] = None,
+        persistent: Optional[CacheService] = None
+    ):
+        """
+        Args:
+            max_entries: Replies kept in the in-process LRU
+            ttl_seconds: Age after which a reply is no longer served
+                (None keeps replies until they are evicted)
+            persistent: Second tier behind the LRU (None for memory only)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, request: Dict[str, Any]) -> str:
+        """
+        Fingerprint of a chat completion request
+
+        Args:
+            model: Model name
+            request: messages, temperature and max_tokens
+
+        Returns:
+            Hex SHA-256 of the canonical JSON of the request
+        """
+        fingerprint = json.dumps(
+            {
+                "model": model,
+                "messages": request["messages"],
+                "temperature": request.get("temperature"),
+                "max_tokens": request.get("max_tokens")
+            },
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def get_memory(self, method: str, key: str) -> Optional[str]:
+        """
+        Look a reply up in the in-process tier only
+
+        Never blocks on I/O, so it is safe to call on the event loop. A miss
+        here is not counted; follow it with get_persistent.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            reply, created_at = entry
+            if self._expired(created_at):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._count(method, "memory_hits")
+        return reply
+
+    def get_persistent(self, method: str, key: str) -> Optional[str]:
+        """
+        Look a reply up in the persistent tier, counting a miss if absent
+        """
+        cached = self.persistent.get(f"llm:{key}") if self.persistent is not None else None
+        if cached is None or self._expired(cached["created_at"]):
+            with self._lock:
+                self._count(method, "misses")
+            return None
+
+        with self._lock:
+            self._remember(key, cached["reply"], cached["created_at"])
+            self._count(method, "persistent_hits")
+        return cached["reply"]
+
+    def get(self, method: str, key: str) -> Optional[str]:
+        """
+        Look a reply up in both tiers
+
+        Args:
+            method: Operation the request belongs to, for the counters
+            key: Request fingerprint (see key)
+
+        Returns:
+            The cached reply, or None on a miss
+        """
+        reply = self.get_memory(method, key)
+        if reply is None:
+            reply = self.get_persistent(method, key)
+        return reply
+
+    def set(self, key: str, reply: str) -> None:
+        """
+        Store a reply in both tiers
+
+        Args:
+            key: Request fingerprint (see key)
+            reply: Reply text
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, reply, now)
+        if self.persistent is not None:
+            self.persistent.set(f"llm:{key}", {"reply": reply, "created_at": now})
+
+    def delete(self, key: str) -> None:
+        """Forget a reply, e.g. one that turned out to be unusable"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.persistent is not None:
+            self.persistent.delete(f"llm:{key}")
+
+    def clear(self) -> int:
+        """
+        Remove every reply from both tiers
+
+        Returns:
+            Number of persistent entries removed (in-process ones when there
+            is no persistent tier)
+        """
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+        if self.persistent is not None:
+            removed = self.persistent.clear()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit rates overall and by method, and the size of each tier
+        """
+        with self._lock:
+            methods = {method: self._rates(counters) for method, counters in self._counters.items()}
+            entries = len(self._entries)
+
+        total = {
+            name: sum(counters[name] for counters in methods.values())
+            for name in ("memory_hits", "persistent_hits", "misses")
+        }
+        return {
+            **self._rates(total),
+            "memory_entries": entries,
+            "max_memory_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self.persistent.stats() if self.persistent is not None else None,
+            "methods": methods
+        }
+
+    def close(self) -> None:
+        """Close the persistent tier"""
+        if self.persistent is not None:
+            self.persistent.close()
+
+    def _remember(self, key: str, reply: str, created_at: float) -> None:
+        """Put a reply in the LRU, evicting the least recently used (lock held)"""
+        self._entries[key] = (reply, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _count(self, method: str, name: str) -> None:
+        counters = self._counters.setdefault(method, {"memory_hits": 0, "persistent_hits": 0, "misses": 0})
+        counters[name] += 1
+
+    @staticmethod
+    def _rates(counters: Dict[str, int]) -> Dict[str, Any]:
+        hits = counters["memory_hits"] + counters["persistent_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
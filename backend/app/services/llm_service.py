@@ -1,45 +1,441 @@
 import os
 import json
+import time
+import random
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from groq import Groq
+import functools
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Tuple
+import httpx
+from groq import AsyncGroq, APIConnectionError, APIStatusError
+from pydantic import BaseModel, Field, ValidationError
 from ..core.config import settings
+from .cache_service import CacheService
+from .llm_cache import LLMResponseCache
+from .text_chunker import TextChunker
+from .token_budget import PromptTooLong, TokenBudget
+from .rate_limiter import RateLimiter
+from .text_cleaner import LocalCleaner
+from .local_extractor import LocalExtractor
 
 logger = logging.getLogger(__name__)
 
+# Fields of the extraction reply and how the prompt describes them
+EXTRACT_FIELDS = {
+    "patient_name": '"string or null"',
+    "age": '"string or null"',
+    "gender": '"string or null"',
+    "symptoms": '["list of symptoms"]',
+    "diagnosis": '"string or null"',
+    "medications": '["list of medications with dosage"]',
+    "test_results": '["list of test results"]',
+    "vital_signs": "{}",
+    "doctor_notes": '"string or null"',
+    "date_of_visit": '"string or null"',
+}
+
+
+class LLMError(Exception):
+    """
+    An LLM request failed, after retries where retrying made sense
+
+    status_code is what the API answers with.
+    """
+    status_code = 502
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMRateLimitError(LLMError):
+    """The provider kept answering 429 (rate or quota limit)"""
+    status_code = 429
+
+
+class LLMUnavailableError(LLMError):
+    """The provider could not be reached, timed out or kept failing with 5xx"""
+    status_code = 503
+
+
+class LLMRequestError(LLMError):
+    """The provider rejected the request (4xx other than 429); not retried"""
+    status_code = 502
+
+
+class FusedResult(BaseModel):
+    """
+    Reply to the fused request: every artifact of a document at once
+    """
+    cleaned_text: str = Field(min_length=1)
+    structured_data: Dict[str, Any]
+    summary: str = Field(min_length=1)
+    key_findings: List[str] = Field(min_length=1)
+
+    @property
+    def key_findings_text(self) -> str:
+        """Key findings as dash bullet points, as extract_key_findings returns them"""
+        return "\n".join(
+            finding if finding.startswith("-") else f"- {finding}"
+            for finding in (finding.strip() for finding in self.key_findings)
+            if finding
+        )
+
 
 class LLMService:
     """
     Service for LLM-based text processing using Groq API
+    
+    Every operation is a coroutine (aclean_ocr_text, ...) awaited by the
+    route handlers, the pipeline and the job workers.
+    
+    aprocess_document does all four operations with one
+    request (fused mode), so the document is sent once instead of three
+    times.
+    
+    Replies are cached by a fingerprint of the request, so repeating a
+    request (re-running a stage, or a re-uploaded document with the same
+    text) is answered without calling Groq.
+    
+    Texts longer than LLM_CHUNK_MAX_CHARS are split at page, paragraph and
+    sentence boundaries. The chunks are cleaned in parallel and joined back
+    in order, and summaries are built map-reduce style, so no reply has to
+    hold more than one chunk's worth of text and late pages are not cut off.
+    
+    Before cleaning, OCR text is compacted locally (whitespace, OCR junk
+    lines, repeated headers and footers). Every request's max_tokens is
+    sized to its input and checked against the context window; token counts
+    and savings are kept per method.
+    
+    With LOCAL_CLEAN_ENABLED, OCR text is first cleaned by local rules
+    (LocalCleaner) and a chunk only goes to the LLM when the OCR confidence
+    is below LOCAL_CLEAN_MIN_CONFIDENCE or its noise score is above
+    LOCAL_CLEAN_MAX_NOISE, so digital documents skip the cleaning request.
+    With LOCAL_EXTRACT_ENABLED, vital signs, medications, lab values and
+    labelled fields are extracted by local patterns (LocalExtractor) and
+    the extraction request only asks for the fields they missed.
+    
+    Requests go through a shared requests/tokens per minute limiter and are
+    retried with jittered exponential backoff on 429, 5xx and connection
+    errors, honouring Retry-After. Requests that still fail raise an
+    LLMError subclass rather than returning placeholder text.
     """
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None, use_cache: Optional[bool] = None):
         """
-        Initialize Groq client
+        Initialize the Groq client
+        
+        Args:
+            http_client: Connection pool for the async client, shared with
+                the rest of the app (Groq creates its own if omitted)
+            use_cache: Whether to cache replies
+                (defaults to settings.LLM_CACHE_ENABLED)
         """
         try:
             if not settings.GROQ_API_KEY:
                 raise ValueError("GROQ_API_KEY not found in environment variables")
             
-            self.client = Groq(api_key=settings.GROQ_API_KEY)
-            self.model = settings.GROQ_MODEL
+            # Retries are done here, under the rate limiter, not by the SDK
+            self.async_client = AsyncGroq(
+                api_key=settings.GROQ_API_KEY,
+                base_url=settings.GROQ_BASE_URL or None,
+                http_client=http_client,
+                max_retries=0
+            )
+            self._configure(use_cache)
             logger.info(f"Groq LLM client initialized with model: {self.model}")
         except Exception as e:
             logger.error(f"Error initializing Groq client: {str(e)}")
             raise
     
-    def clean_ocr_text(self, ocr_text: str) -> str:
+    def _configure(self, use_cache: Optional[bool] = None) -> None:
         """
-        Clean OCR-extracted text using LLM
+        Set up everything apart from the Groq client (model, reply cache,
+        chunking, token budget, rate limiting, local cleaning and extraction)
+        """
+        self.model = settings.GROQ_MODEL
+        self.cache = self.create_cache() if (settings.LLM_CACHE_ENABLED if use_cache is None else use_cache) else None
+        self.chunker = TextChunker(settings.LLM_CHUNK_MAX_CHARS)
+        self.chunk_concurrency = settings.LLM_CHUNK_CONCURRENCY
+        self.budget = TokenBudget(settings.LLM_CONTEXT_TOKENS)
+        self.local_cleaner = (
+            LocalCleaner(settings.LOCAL_CLEAN_MIN_CONFIDENCE, settings.LOCAL_CLEAN_MAX_NOISE)
+            if settings.LOCAL_CLEAN_ENABLED else None
+        )
+        self.local_extractor = LocalExtractor() if settings.LOCAL_EXTRACT_ENABLED else None
+        self.extract_llm_gaps = settings.LOCAL_EXTRACT_LLM_GAPS
+        self.rate_limiter = RateLimiter(settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE)
+        self.max_retries = settings.LLM_MAX_RETRIES
+        self.retries = 0
+        self.failures = 0
+    
+    @staticmethod
+    def create_cache() -> LLMResponseCache:
+        """
+        Build the reply cache from the LLM_CACHE_* settings
+        """
+        return LLMResponseCache(
+            max_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+            persistent=CacheService(
+                settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_BYTES, settings.LLM_CACHE_TTL_SECONDS
+            )
+        )
+    
+    async def aclose(self) -> None:
+        """
+        Close the Groq client, its connections and the reply cache
+        """
+        await self.async_client.close()
+        if self.cache is not None:
+            self.cache.close()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Hit rates of the reply cache, overall and by method
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def clean_stats(self) -> Dict[str, Any]:
+        """
+        Local cleaning statistics: how often the LLM cleaning request was skipped
+        """
+        if self.local_cleaner is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.local_cleaner.stats()}
+    
+    def extract_stats(self) -> Dict[str, Any]:
+        """
+        Local extraction statistics: fields found locally and fields left to the LLM
+        """
+        if self.local_extractor is None:
+            return {"enabled": False}
+        return {"enabled": True, "llm_gaps": self.extract_llm_gaps, **self.local_extractor.stats()}
+    
+    def token_stats(self) -> Dict[str, Any]:
+        """
+        Prompt tokens, reply budgets and tokens saved, overall and by method
+        """
+        return self.budget.stats()
+    
+    def rate_stats(self) -> Dict[str, Any]:
+        """
+        Rate limiter state, retries and requests that failed for good
+        """
+        return {
+            **self.rate_limiter.stats(),
+            "max_retries": self.max_retries,
+            "retries": self.retries,
+            "failures": self.failures
+        }
+    
+    def invalidate_cache(self) -> int:
+        """
+        Drop all cached replies, e.g. after changing a prompt's wording
+        
+        Returns:
+            Number of entries removed
+        """
+        if self.cache is None:
+            return 0
+        return self.cache.clear()
+    
+    @staticmethod
+    def _as_llm_error(error: Exception) -> LLMError:
+        """Translate a Groq client exception into an LLMError"""
+        if isinstance(error, LLMError):
+            return error
+        if isinstance(error, APIStatusError):
+            retry_after = LLMService._retry_after(error.response)
+            message = f"Groq API request failed: {error.message}"
+            if error.status_code == 429:
+                return LLMRateLimitError(message, retry_after)
+            if error.status_code >= 500:
+                return LLMUnavailableError(message, retry_after)
+            return LLMRequestError(message)
+        if isinstance(error, APIConnectionError):  # includes timeouts
+            return LLMUnavailableError(f"Could not reach the Groq API: {str(error)}")
+        return LLMError(f"LLM request failed: {str(error)}")
+    
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        """Seconds from a Retry-After header (delay or HTTP date), if any"""
+        value = response.headers.get("retry-after") if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    
+    def _retry_delay(self, error: LLMError, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before retrying, or None if the request should fail
+        
+        Full jitter over an exponentially growing window; Retry-After, when
+        given, is the minimum.
+        """
+        if isinstance(error, LLMRequestError) or type(error) is LLMError or attempt >= self.max_retries:
+            self.failures += 1
+            return None
+        self.retries += 1
+        window = min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+        delay = random.uniform(0, window)
+        if error.retry_after is not None:
+            delay = max(delay, min(error.retry_after, settings.LLM_RETRY_MAX_SECONDS))
+        logger.warning(f"{error} (retry {attempt + 1}/{self.max_retries} in {delay:.2f}s)")
+        return delay
+    
+    def _request_tokens(self, request: Dict[str, Any]) -> int:
+        """Tokens a request counts against the limit: prompt plus max_tokens"""
+        return self.budget.count_messages(request["messages"]) + request["max_tokens"]
+    
+    async def _asend(self, request: Dict[str, Any]) -> str:
+        """
+        Send a chat completion request to Groq and return the reply text
+        
+        Raises:
+            LLMError: The request failed, after retries where they apply
+        """
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(self._request_tokens(request))
+            try:
+                response = await self.async_client.chat.completions.create(model=self.model, **request)
+                return response.choices[0].message.content.strip()
+            except Exception as e:
+                error = self._as_llm_error(e)
+                delay = self._retry_delay(error, attempt)
+                if delay is None:
+                    raise error from e
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    async def _asend_stream(self, request: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Send a chat completion request to Groq and yield the reply as it arrives
+        
+        Starting the request is retried like _asend; once the reply has
+        started, a failure is raised as is. Closing the generator early
+        closes the upstream response.
+        """
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(self._request_tokens(request))
+            try:
+                stream = await self.async_client.chat.completions.create(model=self.model, stream=True, **request)
+                break
+            except Exception as e:
+                error = self._as_llm_error(e)
+                delay = self._retry_delay(error, attempt)
+                if delay is None:
+                    raise error from e
+            await asyncio.sleep(delay)
+            attempt += 1
+        
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            self.failures += 1
+            raise self._as_llm_error(e) from e
+        finally:
+            await stream.response.aclose()
+    
+    async def _acomplete(self, method: str, request: Dict[str, Any], text: Optional[str] = None) -> str:
+        """
+        Answer a chat completion request from the cache or from Groq
+        
+        The persistent cache tier is read and written in a worker thread.
         
         Args:
-            ocr_text: Raw OCR extracted text
+            method: Operation the request belongs to (cache hit rates and
+                token counts are reported per method)
+            request: messages, temperature and the largest max_tokens
+            text: The text the request is about; max_tokens is sized to it
             
         Returns:
-            Cleaned and corrected text
+            Stripped content of the first choice
+            
+        Raises:
+            PromptTooLong: The request does not fit the context window
         """
-        try:
-            prompt = f"""You are a medical language expert.
+        request = self.budget.fit(method, request, text)
+        if self.cache is None:
+            return await self._asend(request)
+        
+        key = self.cache.key(self.model, request)
+        reply = self.cache.get_memory(method, key)
+        if reply is None:
+            reply = await asyncio.to_thread(self.cache.get_persistent, method, key)
+        if reply is None:
+            reply = await self._asend(request)
+            await asyncio.to_thread(self.cache.set, key, reply)
+        return reply
+    
+    async def _amap(self, function: Callable[[str], Awaitable[Any]], chunks: List[str]) -> List[Any]:
+        """Await a function on every chunk, chunk_concurrency at a time, in order"""
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+        
+        async def run(chunk: str) -> Any:
+            async with semaphore:
+                return await function(chunk)
+        
+        return await asyncio.gather(*(run(chunk) for chunk in chunks))
+    
+    async def _astream(self, method: str, request: Dict[str, Any], text: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Streaming version of _acomplete
+        
+        A cached reply is yielded in one piece. A streamed reply is cached
+        once it has arrived in full; one cut short is not.
+        
+        Args:
+            method: Operation the request belongs to
+            request: messages, temperature and the largest max_tokens
+            text: The text the request is about; max_tokens is sized to it
+            
+        Yields:
+            Pieces of the reply text
+        """
+        request = self.budget.fit(method, request, text)
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.model, request)
+            reply = self.cache.get_memory(method, key)
+            if reply is None:
+                reply = await asyncio.to_thread(self.cache.get_persistent, method, key)
+            if reply is not None:
+                yield reply
+                return
+        
+        pieces = []
+        async for piece in self._asend_stream(request):
+            pieces.append(piece)
+            yield piece
+        
+        if key is not None:
+            await asyncio.to_thread(self.cache.set, key, "".join(pieces).strip())
+    
+    def _forget(self, method: str, request: Dict[str, Any], text: Optional[str] = None) -> None:
+        """Drop a cached reply that turned out to be unusable"""
+        if self.cache is not None:
+            sized, _ = self.budget.size(method, request, text)
+            self.cache.delete(self.cache.key(self.model, sized))
+    
+    # Request builders
+    @staticmethod
+    def _clean_request(ocr_text: str) -> Dict[str, Any]:
+        """Build the OCR text cleaning request"""
+        prompt = f"""You are a medical language expert.
 
 Clean the following OCR-extracted medical text:
 - Fix spelling and grammar errors
@@ -55,55 +451,35 @@ OCR Text:
 
 Provide ONLY the cleaned text without any explanations or additional comments."""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a medical text processing expert. Clean and correct OCR text while preserving original medical information."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=2048
-            )
-            
-            cleaned_text = response.choices[0].message.content.strip()
-            return cleaned_text
-            
-        except Exception as e:
-            logger.error(f"Error cleaning OCR text: {str(e)}")
-            return ocr_text  # Return original text if cleaning fails
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a medical text processing expert. Clean and correct OCR text while preserving original medical information."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "max_tokens": 2048
+        }
     
-    def extract_structured_data(self, cleaned_text: str) -> Dict[str, Any]:
-        """
-        Extract structured medical data from cleaned text
-        
-        Args:
-            cleaned_text: Cleaned medical text
-            
-        Returns:
-            Dictionary containing structured medical information
-        """
-        try:
-            prompt = f"""You are a medical data extraction expert.
+    @staticmethod
+    def _extract_request(cleaned_text: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build the structured data extraction request, for all fields or only the given ones"""
+        template = ",\n".join(
+            f'    "{field}": {placeholder}'
+            for field, placeholder in EXTRACT_FIELDS.items()
+            if fields is None or field in fields
+        )
+        prompt = f"""You are a medical data extraction expert.
 
 Extract the following information from the medical text below.
 Return ONLY a valid JSON object with these fields (use null if information is not available):
 {{
-    "patient_name": "string or null",
-    "age": "string or null",
-    "gender": "string or null",
-    "symptoms": ["list of symptoms"],
-    "diagnosis": "string or null",
-    "medications": ["list of medications with dosage"],
-    "test_results": ["list of test results"],
-    "vital_signs": {{}},
-    "doctor_notes": "string or null",
-    "date_of_visit": "string or null"
+{template}
 }}
 
 Medical Text:
@@ -111,66 +487,25 @@ Medical Text:
 
 Return ONLY the JSON object, no additional text."""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a medical data extraction expert. Extract structured information from medical text and return valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.2,
-                max_tokens=1024
-            )
-            
-            json_text = response.choices[0].message.content.strip()
-            
-            # Try to parse JSON
-            try:
-                # Remove markdown code blocks if present
-                if json_text.startswith("```"):
-                    json_text = json_text.split("```")[1]
-                    if json_text.startswith("json"):
-                        json_text = json_text[4:]
-                    json_text = json_text.strip()
-                
-                structured_data = json.loads(json_text)
-                return structured_data
-            except json.JSONDecodeError:
-                logger.warning("Could not parse JSON response, returning empty structure")
-                return {
-                    "patient_name": None,
-                    "age": None,
-                    "gender": None,
-                    "symptoms": [],
-                    "diagnosis": None,
-                    "medications": [],
-                    "test_results": [],
-                    "vital_signs": {},
-                    "doctor_notes": None,
-                    "date_of_visit": None
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a medical data extraction expert. Extract structured information from medical text and return valid JSON."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
                 }
-            
-        except Exception as e:
-            logger.error(f"Error extracting structured data: {str(e)}")
-            return {}
+            ],
+            "temperature": 0.2,
+            "max_tokens": 1024
+        }
     
-    def generate_medical_summary(self, cleaned_text: str) -> str:
-        """
-        Generate concise medical summary from cleaned text
-        
-        Args:
-            cleaned_text: Cleaned medical text
-            
-        Returns:
-            Generated medical summary
-        """
-        try:
-            prompt = f"""You are an assistant helping doctors review medical records.
+    @staticmethod
+    def _summary_request(cleaned_text: str) -> Dict[str, Any]:
+        """Build the medical summary request"""
+        prompt = f"""You are an assistant helping doctors review medical records.
 
 Generate a concise medical summary from the following clinical text.
 
@@ -195,30 +530,365 @@ Clinical Text:
 
 Provide a well-structured medical summary."""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a medical summarization expert. Generate concise, accurate clinical summaries for healthcare professionals."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=1024
-            )
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a medical summarization expert. Generate concise, accurate clinical summaries for healthcare professionals."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "max_tokens": 1024
+        }
+    
+    @staticmethod
+    def _summary_part_request(part_text: str) -> Dict[str, Any]:
+        """Build the request summarising one part of a long clinical text"""
+        prompt = f"""You are an assistant helping doctors review medical records.
+
+The following is one part of a longer clinical record. Summarize this part
+so that it can later be combined with the summaries of the other parts.
+
+Keep:
+- Symptoms, complaints, diagnoses and observations
+- Medications with their dosage
+- Test results and vital signs with their values
+- Dates and follow-up recommendations
+
+Guidelines:
+- Be concise; use bullet points
+- Do NOT make assumptions or new diagnoses
+- Do NOT add information not present in the text
+
+Clinical Text (part):
+{part_text}
+
+Provide ONLY the summary of this part."""
+
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a medical summarization expert. Summarize parts of clinical records accurately for later combination."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "max_tokens": 512
+        }
+    
+    @staticmethod
+    def _summary_merge_request(part_summaries: str) -> Dict[str, Any]:
+        """Build the request combining part summaries into one medical summary"""
+        prompt = f"""You are an assistant helping doctors review medical records.
+
+The following are summaries of consecutive parts of one clinical record, in
+order. Combine them into a single concise medical summary of the whole record.
+
+Focus on:
+- Key symptoms and complaints
+- Diagnosis (if mentioned)
+- Medications prescribed
+- Important test results and vital signs
+- Critical observations
+- Follow-up recommendations
+
+Guidelines:
+- Be concise and doctor-friendly
+- Merge repeated information; keep later values where they differ
+- Do NOT make assumptions or new diagnoses
+- Do NOT add information not present in the part summaries
+- Structure the summary clearly
+
+Part Summaries:
+{part_summaries}
+
+Provide a well-structured medical summary."""
+
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a medical summarization expert. Generate concise, accurate clinical summaries for healthcare professionals."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "max_tokens": 1024
+        }
+    
+    @staticmethod
+    def _join_parts(part_summaries: List[str]) -> str:
+        """Label part summaries in order for the merge request"""
+        return "\n\n".join(
+            f"Part {index}:\n{summary}" for index, summary in enumerate(part_summaries, start=1)
+        )
+    
+    @staticmethod
+    def _findings_request(summary_text: str) -> Dict[str, Any]:
+        """Build the key findings request"""
+        prompt = f"""Extract 3-5 key medical findings from this summary as bullet points.
+
+Summary:
+{summary_text}
+
+Provide ONLY the bullet points, one per line, starting with a dash (-)."""
+
+        return {
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "max_tokens": 256
+        }
+    
+    @staticmethod
+    def _fused_request(ocr_text: str) -> Dict[str, Any]:
+        """Build the request that cleans, extracts, summarizes and lists findings at once"""
+        prompt = f"""You are a medical language expert helping doctors review medical records.
+
+Process the following OCR-extracted medical text in four steps.
+
+1. cleaned_text: Clean the OCR text. Fix spelling, grammar and medical
+   terminology, remove OCR artifacts and noise and fix formatting. Do NOT
+   add new information or make assumptions; preserve clinical meaning exactly.
+2. structured_data: From the cleaned text, extract these fields (use null
+   if information is not available):
+   {{
+       "patient_name": "string or null",
+       "age": "string or null",
+       "gender": "string or null",
+       "symptoms": ["list of symptoms"],
+       "diagnosis": "string or null",
+       "medications": ["list of medications with dosage"],
+       "test_results": ["list of test results"],
+       "vital_signs": {{}},
+       "doctor_notes": "string or null",
+       "date_of_visit": "string or null"
+   }}
+3. summary: A concise, well-structured, doctor-friendly medical summary of
+   the cleaned text covering key symptoms, diagnosis, medications, important
+   test results and vital signs, critical observations and follow-up
+   recommendations. Do NOT make new diagnoses or add information not present
+   in the text.
+4. key_findings: 3-5 key medical findings from the summary.
+
+OCR Text:
+{ocr_text}
+
+Return ONLY a valid JSON object of this form, no additional text:
+{{
+    "cleaned_text": "string",
+    "structured_data": {{...}},
+    "summary": "string",
+    "key_findings": ["string", ...]
+}}"""
+
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a medical text processing expert. Clean OCR text, extract structured information and summarize it for healthcare professionals, returning valid JSON."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.2,
+            # Room for the cleaned text plus the other three replies
+            "max_tokens": 4096
+        }
+    
+    @staticmethod
+    def _strip_code_fence(json_text: str) -> str:
+        """Remove a markdown code block around a JSON reply, if present"""
+        if json_text.startswith("```"):
+            json_text = json_text.split("```")[1]
+            if json_text.startswith("json"):
+                json_text = json_text[4:]
+            json_text = json_text.strip()
+        return json_text
+    
+    @classmethod
+    def _parse_fused(cls, json_text: str) -> Optional[FusedResult]:
+        """
+        Validate the fused reply, or return None if it is not usable
+        """
+        try:
+            return FusedResult.model_validate_json(cls._strip_code_fence(json_text))
+        except ValidationError as e:
+            logger.warning(f"Fused reply failed validation: {e.error_count()} errors")
+            return None
+    
+    @classmethod
+    def _parse_structured_data(cls, json_text: str) -> Dict[str, Any]:
+        """
+        Parse the extraction reply, falling back to an empty structure
+        """
+        try:
+            structured_data = json.loads(cls._strip_code_fence(json_text))
+            return structured_data
+        except json.JSONDecodeError:
+            logger.warning("Could not parse JSON response, returning empty structure")
+            return {
+                "patient_name": None,
+                "age": None,
+                "gender": None,
+                "symptoms": [],
+                "diagnosis": None,
+                "medications": [],
+                "test_results": [],
+                "vital_signs": {},
+                "doctor_notes": None,
+                "date_of_visit": None
+            }
+    
+    async def aclean_ocr_text(self, ocr_text: str, confidence: Optional[float] = None) -> str:
+        """
+        Clean OCR-extracted text using LLM
+        
+        Args:
+            ocr_text: Raw OCR extracted text
+            confidence: OCR confidence of the text; with local cleaning,
+                chunks that are confident and not noisy skip the LLM
+                (None always uses the LLM)
             
-            summary = response.choices[0].message.content.strip()
-            return summary
+        Returns:
+            Cleaned and corrected text
             
-        except Exception as e:
-            logger.error(f"Error generating medical summary: {str(e)}")
-            return "Error generating summary. Please try again."
+        Raises:
+            LLMError: A request failed
+        """
+        ocr_text = self._clean_locally(ocr_text)
+        chunks = self.chunker.split(ocr_text)
+        if len(chunks) <= 1:
+            return await self._aclean_chunk(ocr_text, confidence)
+        return "\n\n".join(await self._amap(functools.partial(self._aclean_chunk, confidence=confidence), chunks))
+    
+    def _clean_locally(self, ocr_text: str) -> str:
+        """Compact OCR text, then apply the local cleaning rules if enabled"""
+        ocr_text = self.budget.compact("clean", ocr_text)
+        if self.local_cleaner is not None:
+            ocr_text = self.local_cleaner.clean(ocr_text)
+        return ocr_text
+    
+    async def _aclean_chunk(self, ocr_text: str, confidence: Optional[float] = None) -> str:
+        if self.local_cleaner is not None and not self.local_cleaner.needs_llm(ocr_text, confidence):
+            return ocr_text
+        return await self._acomplete("clean", self._clean_request(ocr_text), ocr_text)
+    
+    async def aextract_structured_data(self, cleaned_text: str) -> Dict[str, Any]:
+        """
+        Extract structured medical data from cleaned text
+        
+        With local extraction, fields are first read from the text by
+        LocalExtractor and the LLM is only asked for the fields it left
+        empty (none at all without LOCAL_EXTRACT_LLM_GAPS). The result then
+        also has "sources" (where each local value was read) and
+        "llm_fields" (the fields the LLM filled).
+        
+        Args:
+            cleaned_text: Cleaned medical text
+            
+        Returns:
+            Dictionary containing structured medical information
+            
+        Raises:
+            LLMError: The request failed
+        """
+        if self.local_extractor is None:
+            return self._parse_structured_data(await self._acomplete("extract", self._extract_request(cleaned_text), cleaned_text))
+        data, gaps = self._extract_locally(cleaned_text)
+        if not gaps:
+            return data
+        reply = await self._acomplete("extract", self._extract_request(cleaned_text, gaps), cleaned_text)
+        return self.local_extractor.fill(data, gaps, self._parse_structured_data(reply))
+    
+    def _extract_locally(self, cleaned_text: str) -> Tuple[Dict[str, Any], List[str]]:
+        """Run the local extractor; returns its result and the fields still to ask the LLM for"""
+        data = self.local_extractor.extract(cleaned_text)
+        data["llm_fields"] = []
+        gaps = self.local_extractor.missing(data) if self.extract_llm_gaps else []
+        return data, gaps
+    
+    async def agenerate_medical_summary(self, cleaned_text: str) -> str:
+        """
+        Generate concise medical summary from cleaned text
+        
+        Args:
+            cleaned_text: Cleaned medical text
+            
+        Returns:
+            Generated medical summary
+            
+        Raises:
+            LLMError: A request failed
+        """
+        method, request, text = await self._asummary_request(cleaned_text)
+        return await self._acomplete(method, request, text)
+    
+    async def astream_medical_summary(self, cleaned_text: str) -> AsyncIterator[str]:
+        """
+        Generate the medical summary, yielding it piece by piece as it arrives
+        
+        For texts longer than a chunk, the part summaries are made first
+        and only the final merge is streamed.
+        
+        Args:
+            cleaned_text: Cleaned medical text
+            
+        Yields:
+            Pieces of the summary text
+            
+        Raises:
+            LLMError: A request failed
+        """
+        method, request, text = await self._asummary_request(cleaned_text)
+        async for piece in self._astream(method, request, text):
+            yield piece
     
-    def extract_key_findings(self, summary_text: str) -> str:
+    async def _asummary_request(self, cleaned_text: str) -> Tuple[str, Dict[str, Any], str]:
+        """
+        The request that produces the final summary of a text
+        
+        Short texts are summarised directly. For longer ones, each chunk is
+        summarised, groups of part summaries are summarised again while they
+        are still too long, and the request merges what remains.
+        
+        Returns:
+            (method, request, text the request is about)
+        """
+        chunks = self.chunker.split(cleaned_text)
+        if len(chunks) <= 1:
+            return "summary", self._summary_request(cleaned_text), cleaned_text
+        
+        async def summarize_part(text: str) -> str:
+            return await self._acomplete("summary_part", self._summary_part_request(text), text)
+        
+        parts = await self._amap(summarize_part, chunks)
+        while len(parts) > 1:
+            groups = self.chunker.split(self._join_parts(parts))
+            if len(groups) <= 1 or len(groups) >= len(parts):
+                break
+            parts = await self._amap(summarize_part, groups)
+        merged = self._join_parts(parts)
+        return "summary_merge", self._summary_merge_request(merged), merged
+    
+    async def aextract_key_findings(self, summary_text: str) -> str:
         """
         Extract bullet points of key findings from summary
         
@@ -227,30 +897,37 @@ Provide a well-structured medical summary."""
             
         Returns:
             Key findings as bullet points
+            
+        Raises:
+            LLMError: The request failed
         """
-        try:
-            prompt = f"""Extract 3-5 key medical findings from this summary as bullet points.
-
-Summary:
-{summary_text}
-
-Provide ONLY the bullet points, one per line, starting with a dash (-)."""
-
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=256
-            )
+        return await self._acomplete("findings", self._findings_request(summary_text), summary_text)
+    
+    async def aprocess_document(self, ocr_text: str) -> Optional[FusedResult]:
+        """
+        Clean, extract, summarize and list key findings with one request
+        
+        Args:
+            ocr_text: Raw OCR extracted text
             
-            key_findings = response.choices[0].message.content.strip()
-            return key_findings
+        Returns:
+            All four artifacts, or None if the reply did not validate or the
+            text is too long for one request (callers fall back to the
+            separate methods)
             
-        except Exception as e:
-            logger.error(f"Error extracting key findings: {str(e)}")
-            return ""
+        Raises:
+            LLMError: The request failed; falling back would fail the same way
+        """
+        ocr_text = self.budget.compact("fused", ocr_text)
+        if len(ocr_text) > self.chunker.max_chars:
+            logger.info("Text too long for a single fused request")
+            return None
+        try:
+            request = self._fused_request(ocr_text)
+            fused = self._parse_fused(await self._acomplete("fused", request, ocr_text))
+            if fused is None:
+                await asyncio.to_thread(self._forget, "fused", request, ocr_text)
+            return fused
+        except PromptTooLong as e:
+            logger.info(f"Fused request does not fit: {str(e)}")
+            return None
@@ -0,0 +1,328 @@
+import re
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .medical_terms import DOSAGE_FORMS, DRUG_NAMES, FREQUENCIES
+
+logger = logging.getLogger(__name__)
+
+# Fields of extracted_data, in the order the extraction prompt lists them
+FIELDS = (
+    "patient_name", "age", "gender", "symptoms", "diagnosis", "medications",
+    "test_results", "vital_signs", "doctor_notes", "date_of_visit",
+)
+LIST_FIELDS = ("symptoms", "medications", "test_results")
+
+
+def _alternation(words: Iterable[str]) -> str:
+    """Regex alternation of literal words, longest first so "tablet" beats "tab" """
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+NUMBER = r"\d+(?:\.\d+)?"
+DURATION = r"(?:[x×]|for)\s*\d+\s*(?:days?|weeks?|wks?|months?)"
+DOSE = rf"{NUMBER}\s*(?:mg|mcg|g|ml|iu|units?|%)(?:\s*/\s*{NUMBER}\s*(?:mg|ml))?(?![/A-Za-z])"
+
+# (key in vital_signs, pattern, unit when none is written)
+VITAL_PATTERNS = (
+    ("blood_pressure", re.compile(
+        r"\b(?:BP|B\.P\.?|Blood\s+Pressure)\s*[:=\-]?\s*(?P<value>\d{2,3}\s*/\s*\d{2,3})\s*(?P<unit>mm\s?Hg)?", re.I), "mmHg"),
+    ("pulse", re.compile(
+        r"\b(?:Pulse(?:\s+Rate)?|PR|HR|Heart\s+Rate)\s*[:=\-]?\s*(?P<value>\d{2,3})\s*(?P<unit>/\s?min|bpm|beats/min)?", re.I), "/min"),
+    ("temperature", re.compile(
+        r"\bTemp(?:erature)?\.?\s*[:=\-]?\s*(?P<value>\d{2,3}(?:\.\d)?)\s*°?\s*(?P<unit>[FC])\b", re.I), None),
+    ("spo2", re.compile(
+        r"\b(?:SpO2|SaO2|O2\s+Sat(?:uration)?)\s*[:=\-]?\s*(?P<value>\d{2,3})\s*(?P<unit>%)", re.I), "%"),
+    ("respiratory_rate", re.compile(
+        r"\b(?:RR|Resp(?:iratory)?\s+Rate)\s*[:=\-]?\s*(?P<value>\d{1,2})\s*(?P<unit>/\s?min|breaths/min)?", re.I), "/min"),
+    ("weight", re.compile(
+        r"\b(?:Wt|Weight)\.?\s*[:=\-]?\s*(?P<value>\d{1,3}(?:\.\d+)?)\s*(?P<unit>kg|lbs?)\b", re.I), None),
+    ("height", re.compile(
+        r"\b(?:Ht|Height)\.?\s*[:=\-]?\s*(?P<value>\d{2,3}(?:\.\d+)?)\s*(?P<unit>cm)\b", re.I), None),
+    ("bmi", re.compile(r"\bBMI\s*[:=\-]?\s*(?P<value>\d{1,2}(?:\.\d+)?)(?:\s*(?P<unit>kg/m2))?", re.I), "kg/m2"),
+)
+
+LAB_RESULT = re.compile(
+    r"\b(?P<name>HbA1c|Hb|Ha?emoglobin|(?:Fasting|Random|Post[- ]?prandial)\s+(?:blood\s+)?(?:glucose|sugar)"
+    r"|FBS|PPBS|RBS|(?:Serum\s+)?Creatinine|(?:Blood\s+)?Urea|BUN|(?:Serum\s+)?(?:Sodium|Potassium|Calcium)"
+    r"|TSH|T3|T4|WBC|TLC|Platelets?(?:\s+count)?|ESR|CRP|(?:Total\s+)?Cholesterol|LDL|HDL|Triglycerides"
+    r"|SGOT|SGPT|AST|ALT|(?:Total\s+)?Bilirubin|Albumin|INR|Uric\s+acid|Troponin(?:\s+[IT])?|eGFR)\b"
+    r"\s*[:=\-]?\s*(?P<value>[<>]?\s*\d+(?:\.\d+)?)"
+    r"(?:\s*(?P<unit>%|mg/dL|g/dL|mmol/L|mEq/L|m?IU/m?L|µIU/mL|U/L|ng/mL|pg/mL|mm/hr|(?:lakhs|cells)?/cumm"
+    r"|mL/min(?:/1\.73\s?m2)?)(?![A-Za-z]))?",
+    re.I
+)
+IMAGING_RESULT = re.compile(
+    r"^(?P<name>(?:Chest\s+)?X-?ray|CXR|CT(?:\s+scan)?|MRI|USG|Ultrasound|ECG|EKG|Echo(?:cardiogram)?)\b"
+    r"[^:\n]{0,40}:\s*(?P<value>[^\n]+)$",
+    re.I | re.M
+)
+# A dosage form and the word after it ("Tab Amoxicillin", "Cap Vitamin D3")
+FORM_AND_NAME = re.compile(r"(?P<form>[A-Za-z]+)\.?\s+(?P<name>[A-Za-z][A-Za-z0-9\-]+(?:\s+[A-Z]\d{1,2})?)\b")
+# Dose, frequency and duration after a drug name, in any order
+MEDICATION_DETAILS = re.compile(
+    rf"(?:\s*(?:{DOSE}|\b(?:{_alternation(FREQUENCIES)})\b|{DURATION}))*", re.I
+)
+NAME_WORD = r"[A-Z][A-Za-z.'\-]*"
+NOT_A_LABEL = r"(?!(?:Age|Sex|Gender|DOB|Date|Dept|MRN|UHID|ID)\b)"
+LABELED_FIELDS = {
+    "patient_name": re.compile(
+        rf"\b(?:Patient(?:'s)?\s+Name|Name\s+of\s+(?:the\s+)?Patient|Name)\s*[:\-]\s*"
+        rf"(?P<value>{NOT_A_LABEL}{NAME_WORD}(?:\s+{NOT_A_LABEL}{NAME_WORD}){{0,3}})"
+    ),
+    "age": re.compile(r"\bAge\s*[:\-]?\s*(?P<value>\d{1,3}(?:\s*(?:years?|yrs?|y)\b)?)", re.I),
+    "gender": re.compile(r"\b(?:Gender|Sex)\s*[:\-]?\s*(?P<value>Male|Female|Other|M|F)\b", re.I),
+    "date_of_visit": re.compile(
+        r"\b(?:Date\s+of\s+(?:Visit|Consultation|Admission)|Visit\s+Date|Date)\s*[:\-]?\s*"
+        r"(?P<value>\d{1,2}[/.\-]\d{1,2}[/.\-]\d{2,4}|\d{4}-\d{2}-\d{2}|\d{1,2}\s+[A-Z][a-z]{2,8}\s+\d{4})",
+        re.I
+    ),
+    "diagnosis": re.compile(
+        r"\b(?:(?:Provisional|Final)\s+Diagnosis|Diagnosis|Dx|Impression)\s*[:\-]\s*(?P<value>[^\n]+)", re.I
+    ),
+    "doctor_notes": re.compile(
+        r"\b(?:(?:Advice|Notes?|Plan|Remarks|Instructions)\s*[:\-]|Advised\b\s*[:\-]?)\s*(?P<value>[^\n]+)", re.I
+    ),
+}
+SYMPTOMS = re.compile(
+    r"\b(?:(?:Chief|Presenting)\s+Complaints?|Complaints?|C/O)\s*[:\-]\s*(?P<value>[^\n]+)", re.I
+)
+SYMPTOM_SEPARATOR = re.compile(r"\s*(?:,|;|\band\b)\s*", re.I)
+GENDERS = {"m": "Male", "f": "Female"}
+
+# Lower-case first words of each kind of value. Text is scanned word by word
+# and patterns are only tried where a value can start, which is much faster
+# than searching the whole text with every pattern.
+VITAL_WORDS = {
+    "blood_pressure": ("bp", "b", "blood"), "pulse": ("pulse", "pr", "hr", "heart"),
+    "temperature": ("temp", "temperature"), "spo2": ("spo2", "sao2", "o2"),
+    "respiratory_rate": ("rr", "resp", "respiratory"), "weight": ("wt", "weight"),
+    "height": ("ht", "height"), "bmi": ("bmi",),
+}
+LAB_WORDS = (
+    "hba1c", "hb", "haemoglobin", "hemoglobin", "fasting", "random", "post", "postprandial", "fbs", "ppbs",
+    "rbs", "serum", "creatinine", "blood", "urea", "bun", "sodium", "potassium", "calcium", "tsh", "t3", "t4",
+    "wbc", "tlc", "platelet", "platelets", "esr", "crp", "total", "cholesterol", "ldl", "hdl", "triglycerides",
+    "sgot", "sgpt", "ast", "alt", "bilirubin", "albumin", "inr", "uric", "troponin", "egfr",
+)
+FIELD_WORDS = {
+    "patient_name": ("patient", "name"), "age": ("age",), "gender": ("gender", "sex"),
+    "date_of_visit": ("date", "visit"), "diagnosis": ("provisional", "final", "diagnosis", "dx", "impression"),
+    "doctor_notes": ("advice", "advised", "note", "notes", "plan", "remarks", "instructions"),
+    "symptoms": ("chief", "presenting", "complaint", "complaints", "c"),
+}
+WORD = re.compile(r"\b[A-Za-z][A-Za-z0-9]*")
+
+
+def _triggers() -> Dict[str, List[Tuple[str, Any]]]:
+    """Map each first word to the (kind, what to try) pairs, vitals and labs first"""
+    triggers: Dict[str, List[Tuple[str, Any]]] = {}
+    for key, pattern, default_unit in VITAL_PATTERNS:
+        for word in VITAL_WORDS[key]:
+            triggers.setdefault(word, []).append(("vital", (key, pattern, default_unit)))
+    for word in LAB_WORDS:
+        triggers.setdefault(word, []).append(("lab", LAB_RESULT))
+    for field, words in FIELD_WORDS.items():
+        pattern = SYMPTOMS if field == "symptoms" else LABELED_FIELDS[field]
+        for word in words:
+            triggers.setdefault(word, []).append(("field", (field, pattern)))
+    for word in DOSAGE_FORMS:
+        triggers.setdefault(word, []).append(("form", FORM_AND_NAME))
+    for word in DRUG_NAMES:
+        triggers.setdefault(word, []).append(("drug", None))
+    return triggers
+
+
+TRIGGERS = _triggers()
+
+
+class LocalExtractor:
+    """
+    Extracts structured data from cleaned medical text with compiled
+    regexes and the medical lexicon, without an LLM
+
+    Covers what is written in regular patterns: vital signs ("BP 120/80",
+    "Pulse 92/min", "SpO2 96%"), medications ("Tab Metformin 500 mg BD x 30
+    days"), lab values ("HbA1c 7.2%", "Creatinine 1.1 mg/dL"), imaging
+    findings ("Chest X-ray: ...") and labelled fields such as "Patient Name:",
+    "Age:", "Diagnosis:" or "Chief Complaint:".
+
+    A label must be followed by ":" or "-" ("Advised ..." is the one label
+    that may also run straight into the value), so a diagnosis or advice
+    given in a sentence ("Findings are consistent with ...", "The patient
+    was told to ...") is left to the LLM.
+
+    extract() returns the same fields as the LLM extraction plus "sources",
+    the span of cleaned text each value was read from. Fields it cannot fill
+    are left empty for the LLM (see missing).
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Any] = {
+            "documents": 0,
+            "seconds": 0.0,
+            "llm_requests": 0,
+            "local_fields": {field: 0 for field in FIELDS},
+            "llm_fields": {field: 0 for field in FIELDS}
+        }
+        self._lock = threading.Lock()
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        """
+        Extract every field the patterns can find
+
+        Args:
+            text: Cleaned medical text
+
+        Returns:
+            The fields of extracted_data (None or empty where nothing was
+            found) and "sources": {"field", "key" (vital signs only),
+            "text", "start", "end"} for each value, offsets into text
+        """
+        started = time.perf_counter()
+        data: Dict[str, Any] = {field: [] if field in LIST_FIELDS else None for field in FIELDS}
+        data["vital_signs"] = {}
+        sources: List[Dict[str, Any]] = []
+
+        def found(field: str, start: int, end: int, key: Optional[str] = None) -> None:
+            source = {"field": field, "text": text[start:end], "start": start, "end": end}
+            if key is not None:
+                source["key"] = key
+            sources.append(source)
+
+        consumed = 0  # end of the last list value; words before it are part of that value
+        for word in WORD.finditer(text):
+            position = word.start()
+            if position < consumed:
+                continue
+            for kind, pattern in TRIGGERS.get(word.group(0).lower(), ()):
+                if kind == "vital":
+                    key, pattern, default_unit = pattern
+                    match = None if key in data["vital_signs"] else pattern.match(text, position)
+                    if match:
+                        value = re.sub(r"\s+", "", match.group("value"))
+                        unit = match.group("unit") or default_unit
+                        data["vital_signs"][key] = value + self._unit_suffix(unit and self._unit(unit))
+                        found("vital_signs", match.start(), match.end(), key)
+                        consumed = match.end()
+                        break
+                elif kind == "lab":
+                    match = pattern.match(text, position)
+                    if match:
+                        name = " ".join(match.group("name").split())
+                        value = re.sub(r"\s+", "", match.group("value"))
+                        data["test_results"].append(f"{name} {value}{self._unit_suffix(match.group('unit'))}")
+                        found("test_results", match.start(), match.end())
+                        consumed = match.end()
+                        break
+                elif kind == "field":
+                    field, pattern = pattern
+                    match = None if data[field] else pattern.match(text, position)
+                    if match:
+                        self._labeled(data, field, match, found)
+                        break
+                else:
+                    end = word.end()
+                    if kind == "form":
+                        match = pattern.match(text, position)
+                        if not match:
+                            continue
+                        end = match.end()
+                    details = MEDICATION_DETAILS.match(text, end)
+                    if details.group(0).strip():
+                        end = details.start() + len(details.group(0).rstrip())
+                    elif kind == "drug" or not match.group("name")[0].isupper():
+                        continue  # a drug name on its own ("allergic to penicillin"), or "drops in BP"
+                    data["medications"].append(" ".join(text[position:end].split()))
+                    found("medications", position, end)
+                    consumed = end
+                    break
+
+        for match in IMAGING_RESULT.finditer(text):
+            data["test_results"].append(" ".join(match.group(0).split()))
+            found("test_results", match.start(), match.end())
+
+        data["sources"] = sources
+        with self._lock:
+            self._counters["documents"] += 1
+            self._counters["seconds"] += time.perf_counter() - started
+            for field in FIELDS:
+                if data[field]:
+                    self._counters["local_fields"][field] += 1
+        return data
+
+    @staticmethod
+    def _labeled(data: Dict[str, Any], field: str, match: "re.Match", found) -> None:
+        """Store the value of a labelled field ("Age: 54", "C/O: fever, cough")"""
+        raw = match.group("value").rstrip()
+        if field == "symptoms":
+            data[field] = [
+                symptom.strip().rstrip(".")
+                for symptom in SYMPTOM_SEPARATOR.split(raw)
+                if symptom.strip().rstrip(".")
+            ]
+        else:
+            value = raw.strip().rstrip(".,;")
+            data[field] = GENDERS.get(value.lower(), value.capitalize()) if field == "gender" else value
+        found(field, match.start("value"), match.start("value") + len(raw))
+
+    @staticmethod
+    def _unit(unit: str) -> str:
+        """Normalise how a unit is written"""
+        unit = re.sub(r"\s+", "", unit)
+        return {"mmhg": "mmHg", "bpm": "/min", "beats/min": "/min"}.get(unit.lower(), unit)
+
+    @staticmethod
+    def _unit_suffix(unit: Optional[str]) -> str:
+        """A unit as written after its value: "96%", "92/min", "7.2 mg/dL" """
+        if not unit:
+            return ""
+        return unit if unit[0] in "%/" else f" {unit}"
+
+    @staticmethod
+    def missing(data: Dict[str, Any]) -> List[str]:
+        """Fields extract() left empty"""
+        return [field for field in FIELDS if not data.get(field)]
+
+    def fill(self, data: Dict[str, Any], fields: List[str], llm_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fill fields left empty with values from an LLM extraction
+
+        Args:
+            data: Result of extract()
+            fields: Fields the LLM was asked for
+            llm_data: Parsed LLM extraction
+
+        Returns:
+            data, with "llm_fields" listing the fields the LLM filled
+        """
+        filled = []
+        for field in fields:
+            value = llm_data.get(field)
+            if value:
+                data[field] = value
+                filled.append(field)
+        data["llm_fields"] = filled
+
+        with self._lock:
+            self._counters["llm_requests"] += 1
+            for field in filled:
+                self._counters["llm_fields"][field] += 1
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Documents processed, how often each field was found locally or by
+        the LLM, and the local extraction time
+        """
+        with self._lock:
+            documents = self._counters["documents"]
+            return {
+                "documents": documents,
+                "llm_requests": self._counters["llm_requests"],
+                "local_fields": dict(self._counters["local_fields"]),
+                "llm_fields": dict(self._counters["llm_fields"]),
+                "average_microseconds": round(self._counters["seconds"] * 1e6 / documents, 1) if documents else 0.0
+            }
@@ -0,0 +1,99 @@
+"""
+Medical vocabulary used by the local (non-LLM) text processing
+
+Words are lower case. The lists cover what is common on outpatient notes,
+prescriptions and lab reports; words missing here are simply left alone.
+"""
+
+DRUG_NAMES = frozenset({
+    "acetaminophen", "aceclofenac", "acyclovir", "albendazole", "allopurinol",
+    "alprazolam", "ambroxol", "amikacin", "amiodarone", "amitriptyline",
+    "amlodipine", "amoxicillin", "amoxyclav", "ampicillin", "aspirin",
+    "atenolol", "atorvastatin", "azithromycin", "betamethasone", "bisoprolol",
+    "budesonide", "calcium", "captopril", "carvedilol", "cefixime",
+    "cefpodoxime", "ceftriaxone", "cefuroxime", "cephalexin", "cetirizine",
+    "chlorpheniramine", "ciprofloxacin", "clarithromycin", "clindamycin",
+    "clonazepam", "clopidogrel", "clotrimazole", "dapagliflozin",
+    "dexamethasone", "diazepam", "diclofenac", "digoxin", "diltiazem",
+    "domperidone", "doxycycline", "empagliflozin", "enalapril", "enoxaparin",
+    "escitalopram", "esomeprazole", "famotidine", "fluconazole", "fluoxetine",
+    "folic", "furosemide", "gabapentin", "gliclazide", "glimepiride",
+    "glipizide", "heparin", "hydrochlorothiazide", "hydrocortisone",
+    "hydroxychloroquine", "ibuprofen", "insulin", "ipratropium", "iron",
+    "isosorbide", "ivermectin", "labetalol", "lansoprazole", "levetiracetam",
+    "levocetirizine", "levofloxacin", "levothyroxine", "linagliptin",
+    "lisinopril", "loratadine", "losartan", "mefenamic", "meropenem",
+    "metformin", "methotrexate", "methylprednisolone", "metoclopramide",
+    "metoprolol", "metronidazole", "montelukast", "morphine", "naproxen",
+    "nifedipine", "nitrofurantoin", "nitroglycerin", "norfloxacin",
+    "ofloxacin", "olmesartan", "omeprazole", "ondansetron", "oseltamivir",
+    "pantoprazole", "paracetamol", "phenytoin", "pioglitazone",
+    "piperacillin", "prednisolone", "prednisone", "pregabalin",
+    "promethazine", "propranolol", "rabeprazole", "ramipril", "ranitidine",
+    "rifampicin", "rosuvastatin", "salbutamol", "sertraline", "sitagliptin",
+    "sodium", "spironolactone", "sucralfate", "tamsulosin", "telmisartan",
+    "terbinafine", "thiamine", "tramadol", "valproate", "vancomycin",
+    "vildagliptin", "vitamin", "voglibose", "warfarin",
+})
+
+LAB_TESTS = frozenset({
+    "albumin", "alkaline", "alt", "amylase", "ast", "bilirubin", "bun",
+    "calcium", "chloride", "cholesterol", "creatinine", "crp", "esr",
+    "ferritin", "glucose", "haematocrit", "haemoglobin", "hba1c", "hdl",
+    "hematocrit", "hemoglobin", "inr", "ldl", "lipase", "lymphocytes",
+    "magnesium", "neutrophils", "phosphorus", "platelets", "potassium",
+    "protein", "sgot", "sgpt", "sodium", "tsh", "triglycerides", "troponin",
+    "urea", "uric", "wbc", "rbc",
+})
+
+CLINICAL_TERMS = frozenset({
+    "abdomen", "abdominal", "acute", "admission", "advice", "advised",
+    "allergy", "allergies", "anaemia", "anemia", "angina", "antibiotic",
+    "anxiety", "appendicitis", "arrhythmia", "arthritis", "asthma",
+    "bilateral", "blood", "bradycardia", "breathlessness", "bronchitis",
+    "cardiac", "chest", "chronic", "clinical", "complaint", "complaints",
+    "consolidation", "constipation", "cough", "diabetes", "diabetic",
+    "diagnosis", "diarrhoea", "diarrhea", "discharge", "dizziness",
+    "dyspnoea", "dyspnea", "dysuria", "examination", "fatigue", "fever",
+    "follow", "fracture", "gastritis", "gastroenteritis", "headache",
+    "history", "hypertension", "hypothyroidism", "hyperthyroidism",
+    "infection", "inflammation", "investigation", "investigations",
+    "ischemic", "ischaemic", "medication", "medications", "medicine",
+    "migraine", "morning", "myocardial", "nausea", "negative", "normal",
+    "oedema", "edema", "oral", "pain", "palpitations", "patient",
+    "pneumonia", "positive", "prescription", "productive", "pulse",
+    "radiology", "recommended", "respiratory", "review", "sputum",
+    "symptoms", "syrup", "tablet", "tablets", "tachycardia",
+    "temperature", "tenderness", "treatment", "tuberculosis", "ultrasound",
+    "urinary", "urine", "vomiting", "weakness", "wheezing",
+    # Labels of the usual forms
+    "name", "gender", "male", "female", "date", "visit", "department",
+    "doctor", "hospital", "clinic", "address", "phone", "signature",
+})
+
+UNITS = frozenset({
+    "mg", "mcg", "g", "kg", "ml", "l", "iu", "units", "mmhg", "bpm", "mmol",
+    "mg/dl", "g/dl", "mmol/l", "meq/l", "iu/l", "u/l", "ng/ml", "pg/ml",
+    "cells/cumm", "lakhs/cumm", "/min", "%",
+})
+
+# Words kept hyphenated when a hyphen splits them across lines
+HYPHENATED_TERMS = frozenset({
+    "follow-up", "x-ray", "ex-smoker", "non-smoker", "anti-inflammatory",
+    "co-amoxiclav", "post-operative", "pre-operative", "e-gfr",
+})
+
+MEDICAL_WORDS = DRUG_NAMES | LAB_TESTS | CLINICAL_TERMS
+
+# Prescription shorthand, as written before a drug name and after its dose
+DOSAGE_FORMS = (
+    "tab", "tablet", "tabs", "cap", "capsule", "caps", "syp", "syrup", "inj",
+    "injection", "susp", "suspension", "drops", "drop", "oint", "ointment",
+    "cream", "gel", "inhaler", "neb", "sachet", "lotion",
+)
+FREQUENCIES = (
+    "od", "bd", "bid", "tds", "tid", "qid", "qds", "hs", "qhs", "sos", "prn",
+    "stat", "qam", "qpm", "once daily", "twice daily", "thrice daily",
+    "once a day", "twice a day", "at night", "at bedtime", "before food",
+    "after food", "1-0-1", "1-1-1", "1-0-0", "0-0-1", "0-1-0",
+)
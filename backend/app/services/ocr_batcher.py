@@ -0,0 +1,266 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Recognised lines for one image: [(text, confidence), ...] in reading order
+OCRLines = List[Tuple[str, float]]
+
+
+def _sorted_boxes(dt_boxes: np.ndarray) -> list:
+    """
+    Sort detected text boxes top to bottom, then left to right
+
+    Same ordering as PaddleOCR's TextSystem: boxes whose top edges are
+    within 10px of each other count as one line.
+    """
+    boxes = sorted(dt_boxes, key=lambda box: (box[0][1], box[0][0]))
+
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+
+    return boxes
+
+
+def _crop_box(image: np.ndarray, box: np.ndarray) -> np.ndarray:
+    """
+    Cut a (possibly rotated) quadrilateral text box out of the image
+
+    Mirrors PaddleOCR's get_rotate_crop_image: the box is warped to an
+    axis-aligned rectangle, and tall crops are turned on their side.
+    """
+    points = np.asarray(box, dtype=np.float32)
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(
+        image, matrix, (width, height),
+        borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC
+    )
+
+    if crop.shape[0] * 1.0 / max(crop.shape[1], 1) >= 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+
+def recognize_batch(engine: Any, images: List[np.ndarray]) -> List[OCRLines]:
+    """
+    Run detection on each image, then classify and recognise every text
+    crop from every image together
+
+    Detection runs per image because PaddleOCR's detector takes one image
+    at a time. The recognizer (and angle classifier) batch their input
+    internally (rec_batch_num), so pooling crops from several images fills
+    those batches instead of running many small ones.
+
+    Args:
+        engine: PaddleOCR instance
+        images: Preprocessed images (grayscale or BGR)
+
+    Returns:
+        Recognised lines for each image, in input order
+    """
+    crops = []
+    counts = []
+
+    for image in images:
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+        dt_boxes, _ = engine.text_detector(image)
+        boxes = _sorted_boxes(dt_boxes) if dt_boxes is not None and len(dt_boxes) else []
+
+        crops.extend(_crop_box(image, box) for box in boxes)
+        counts.append(len(boxes))
+
+    rec_res = []
+    if crops:
+        if engine.use_angle_cls:
+            crops, _, _ = engine.text_classifier(crops)
+        rec_res, _ = engine.text_recognizer(crops)
+
+    results = []
+    offset = 0
+    for count in counts:
+        lines = [
+            (text, float(score))
+            for text, score in rec_res[offset:offset + count]
+            if score >= engine.drop_score
+        ]
+        results.append(lines)
+        offset += count
+
+    return results
+
+
+class OCRBatchScheduler:
+    """
+    Groups OCR requests from concurrent callers into micro-batches
+
+    Callers block in recognize() while a single scheduler thread collects
+    images for up to max_wait_ms, or until max_batch_size images have
+    arrived, and runs them through run_batch together. Each caller gets back
+    only the lines for its own image.
+
+    The engine is only ever used from the scheduler thread, which also
+    keeps PaddleOCR's (not thread-safe) predictors out of concurrent use.
+
+    run_batch may instead hand the batch off and return a Future of the
+    results, as the OCR worker pool does. Up to max_in_flight such batches
+    run at once; while all are busy, arriving images queue up and go out
+    together as the next batch.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Union[List[Any], Future]],
+        max_batch_size: int,
+        max_wait_ms: int,
+        max_in_flight: int = 1
+    ):
+        """
+        Start the scheduler thread
+
+        Args:
+            run_batch: Callable that OCRs a list of images, returning the
+                results or a Future of them
+            max_batch_size: Most images processed together
+            max_wait_ms: Longest time the first image waits for others
+            max_in_flight: Batches handed off by run_batch that may be
+                unfinished at once
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.images = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._slots = threading.Semaphore(max_in_flight)
+        self._stats_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="ocr-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image: Any) -> Future:
+        """
+        Queue an image for OCR
+
+        Args:
+            image: Preprocessed image array (or whatever run_batch takes)
+
+        Returns:
+            Future resolving to the image's recognised lines (or its entry
+            in run_batch's results)
+        """
+        if self._stopped:
+            raise RuntimeError("OCR batch scheduler has been shut down")
+
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def recognize(self, image: np.ndarray) -> OCRLines:
+        """
+        OCR an image as part of the next batch and wait for its lines
+        """
+        return self.submit(image).result()
+
+    def _run(self) -> None:
+        while True:
+            # Wait for a free slot before starting a batch, so images keep
+            # gathering in the queue while every batch in flight is busy
+            self._slots.acquire()
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch: list) -> None:
+        images = [image for image, _ in batch]
+        try:
+            results = self.run_batch(images)
+        except Exception as e:
+            self._finish(batch, error=e)
+            return
+
+        if isinstance(results, Future):
+            results.add_done_callback(lambda done: self._finish_future(batch, done))
+        else:
+            self._finish(batch, results)
+
+    def _finish_future(self, batch: list, done: Future) -> None:
+        if done.cancelled():
+            self._finish(batch, error=RuntimeError("OCR batch was cancelled"))
+        elif done.exception() is not None:
+            self._finish(batch, error=done.exception())
+        else:
+            self._finish(batch, done.result())
+
+    def _finish(self, batch: list, results: Optional[list] = None, error: Optional[Exception] = None) -> None:
+        """Hand each caller its result (or the batch's error) and free the slot"""
+        self._slots.release()
+        if error is not None:
+            logger.error(f"Error running OCR batch of {len(batch)}: {str(error)}")
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        with self._stats_lock:
+            self.batches += 1
+            self.images += len(batch)
+        for (_, future), lines in zip(batch, results):
+            future.set_result(lines)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Batch counters since start
+        """
+        return {
+            "batches": self.batches,
+            "images": self.images,
+            "avg_batch_size": round(self.images / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": int(self.max_wait * 1000)
+        }
+
+    def shutdown(self) -> None:
+        """
+        Finish queued work and stop the scheduler thread
+        """
+        if not self._stopped:
+            self._stopped = True
+            self._queue.put(None)
+            self._thread.join()
@@ -0,0 +1,202 @@
+import os
+import time
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Tuple, Optional, Union
+import numpy as np
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# OCRService owned by a worker process. It is created once by the pool
+# initializer so the PaddleOCR models stay loaded between tasks.
+_worker_service = None
+
+
+def _init_worker():
+    """
+    Load PaddleOCR once per worker process
+    """
+    global _worker_service
+    import cv2
+    from .ocr_service import OCRService
+
+    # Parallelism comes from the pool; keep OpenCV from oversubscribing cores
+    cv2.setNumThreads(1)
+    # The images of one task are recognised together (see _ocr_images)
+    _worker_service = OCRService(pool_size=0, use_cache=False)
+    _worker_service.load_models()
+
+
+def _ping(delay: float) -> int:
+    """
+    No-op task used to make sure a worker process is up and warm
+    """
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _ocr_image(image: Union[str, np.ndarray]) -> Tuple[str, float]:
+    """
+    Preprocess and OCR one image or rendered page inside a worker process
+    """
+    return _worker_service.extract_text_from_image(image)
+
+
+def _ocr_images(images: List[Union[str, np.ndarray]]) -> List[Tuple[str, float]]:
+    """
+    Preprocess and OCR a batch of images inside a worker process
+
+    Each image runs on its own thread, so their recognition calls meet in
+    the worker's micro-batch scheduler and run as one batch (profile
+    escalations of several images batch together as well).
+    """
+    if len(images) == 1:
+        return [_ocr_image(images[0])]
+    with ThreadPoolExecutor(max_workers=len(images), thread_name_prefix="ocr-batch") as executor:
+        return list(executor.map(_ocr_image, images))
+
+
+class OCRWorkerPool:
+    """
+    Pool of long-lived worker processes, each holding a warm PaddleOCR instance
+
+    The web process only hands out work: it never imports PaddleOCR or
+    holds the models, however many uvicorn workers run.
+
+    With batching, images from concurrent requests are grouped by an
+    OCRBatchScheduler and each group is one task, recognised together in
+    the worker. At most one group per worker is in flight; images arriving
+    while all workers are busy form the next group.
+    """
+
+    def __init__(self, max_workers: int, use_batching: Optional[bool] = None):
+        """
+        Create the pool (worker processes start on first use or warm_up)
+
+        Args:
+            max_workers: Number of OCR worker processes
+            use_batching: Group concurrent images into one task per worker
+                (defaults to settings.OCR_BATCH_ENABLED)
+        """
+        self.max_workers = max_workers
+        if use_batching is None:
+            use_batching = settings.OCR_BATCH_ENABLED
+        # Spawn rather than fork: PaddleOCR holds threads and native state
+        # that do not survive a fork of an already initialised parent
+        self._executor: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+        self._batcher = None
+        if use_batching:
+            from .ocr_batcher import OCRBatchScheduler
+
+            self._batcher = OCRBatchScheduler(
+                lambda images: self._get_executor().submit(_ocr_images, images),
+                max_batch_size=settings.OCR_BATCH_MAX_SIZE,
+                max_wait_ms=settings.OCR_BATCH_MAX_WAIT_MS,
+                max_in_flight=max_workers
+            )
+        logger.info(f"OCR worker pool created with {max_workers} workers")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            raise RuntimeError("OCR worker pool has been shut down")
+        return self._executor
+
+    def warm_up(self) -> List[int]:
+        """
+        Start every worker process and wait until its models are loaded
+
+        Returns:
+            PIDs of the workers that answered
+        """
+        start = time.time()
+        executor = self._get_executor()
+
+        # Workers are spawned on demand while none is idle, so submitting
+        # one short task per worker brings the whole pool up
+        futures = [executor.submit(_ping, 0.2) for _ in range(self.max_workers)]
+        wait(futures)
+        pids = sorted({future.result() for future in futures})
+
+        logger.info(f"OCR worker pool warm: {len(pids)} workers in {time.time() - start:.2f}s")
+        return pids
+
+    def ocr_image(self, image: Union[str, np.ndarray]) -> Tuple[str, float]:
+        """
+        OCR a single image in a worker process
+
+        Args:
+            image: Image path or array
+
+        Returns:
+            Tuple of (extracted_text, confidence_score)
+        """
+        return self._submit(image).result()
+
+    def _submit(self, image: Union[str, np.ndarray]) -> Future:
+        """Send an image to the batcher, or straight to a worker without one"""
+        if self._batcher is not None:
+            return self._batcher.submit(image)
+        return self._get_executor().submit(_ocr_image, image)
+
+    def ocr_pages(self, images: Iterable[np.ndarray]) -> List[Tuple[str, float]]:
+        """
+        OCR pages concurrently
+
+        Pages are pulled from the iterable only as workers free up, with at
+        most two pages (or, with batching, one full batch) per worker in
+        flight, so a long document never has all of its pages rendered at
+        once.
+
+        Args:
+            images: Rendered page images, e.g. OCRService.pdf_to_images
+
+        Returns:
+            List of (text, confidence) tuples in the same order as the input
+        """
+        per_worker = max(2, settings.OCR_BATCH_MAX_SIZE) if self._batcher is not None else 2
+        max_in_flight = self.max_workers * per_worker
+        pending = deque()
+        results = []
+
+        for image in images:
+            # The page is pickled for the worker after the render loop has
+            # moved on, so the task needs its own copy of the pixels
+            pending.append(self._submit(np.array(image)))
+
+            # Collect in submission order, whatever order workers finish in
+            if len(pending) >= max_in_flight:
+                results.append(pending.popleft().result())
+
+        while pending:
+            results.append(pending.popleft().result())
+
+        return results
+
+    def batch_stats(self) -> Dict[str, Any]:
+        """
+        Counters of the groups of images sent to the workers
+        """
+        if self._batcher is None:
+            return {"enabled": False, "batches": 0, "images": 0}
+        return {"enabled": True, **self._batcher.stats()}
+
+    def shutdown(self) -> None:
+        """
+        Stop the worker processes
+        """
+        if self._batcher is not None:
+            # Let the batches already queued reach a worker first
+            self._batcher.shutdown()
+            self._batcher = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("OCR worker pool shut down")
@@ -1,151 +1,580 @@
 import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-from paddleocr import PaddleOCR
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Union, Iterator, List, Dict, Any
 import logging
 from PIL import Image
 import fitz  # PyMuPDF for PDF handling
 
+from ..core.config import settings
+from .cache_service import CacheService
+
 logger = logging.getLogger(__name__)
 
+# Bump whenever preprocess_image changes in a way that alters OCR output.
+# The version is part of the OCR cache key, so old results stop matching.
+PREPROCESS_VERSION = 2
+
+# Preprocessing profiles from lightest to heaviest. "auto" picks one per image.
+PREPROCESS_PROFILES = ("none", "fast", "full")
+
 
 class OCRService:
     """
     Service for OCR text extraction using PaddleOCR
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        use_cache: Optional[bool] = None,
+        use_batching: Optional[bool] = None
+    ):
         """
-        Initialize PaddleOCR with English language support
+        Configure OCR with English language support
+        
+        PaddleOCR is not loaded here. With a worker pool the models only
+        ever live in the worker processes; without one they are loaded on
+        first use (or by warm_up).
+        
+        Args:
+            pool_size: Number of OCR worker processes (defaults to
+                settings.OCR_POOL_SIZE, or one per document extracted at
+                once; 0 runs OCR in-process)
+            use_cache: Whether to use the persistent OCR result cache
+                (defaults to settings.OCR_CACHE_ENABLED)
+            use_batching: Whether OCR goes through the micro-batch scheduler,
+                in-process or in front of the worker pool (defaults to
+                settings.OCR_BATCH_ENABLED)
         """
-        try:
-            self.ocr = PaddleOCR(
-                use_angle_cls=True,
-                lang='en',
-                use_gpu=False,
-                show_log=False
-            )
-            logger.info("PaddleOCR initialized successfully")
-        except Exception as e:
-            logger.error(f"Error initializing PaddleOCR: {str(e)}")
-            raise
+        self.lang = 'en'
+        self.use_angle_cls = True
+        if pool_size is None:
+            pool_size = settings.OCR_POOL_SIZE
+        if pool_size is None:
+            # Enough workers for extract_documents to OCR its documents in parallel
+            pool_size = max(1, min(settings.OCR_MAX_CONCURRENT_DOCUMENTS, os.cpu_count() or 1))
+        self.pool_size = pool_size
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._engine = None
+        self._engine_lock = threading.Lock()
+        # PaddleOCR's predictors are not thread-safe; documents OCRed
+        # concurrently in-process take turns on the shared engine
+        self._ocr_lock = threading.Lock()
+        self._batcher = None
+        self.use_batching = use_batching if use_batching is not None else settings.OCR_BATCH_ENABLED
+        
+        if use_cache is None:
+            use_cache = settings.OCR_CACHE_ENABLED
+        self.cache = CacheService(settings.OCR_CACHE_PATH, settings.OCR_CACHE_MAX_BYTES) if use_cache else None
+    
+    def load_models(self):
+        """
+        Load PaddleOCR (detector, angle classifier, recognizer) if needed
+        
+        Returns:
+            The PaddleOCR instance
+        """
+        if self._engine is not None:
+            return self._engine
+        
+        with self._engine_lock:
+            if self._engine is None:
+                try:
+                    # Imported here so processes that never run OCR
+                    # themselves do not pay for importing Paddle
+                    from paddleocr import PaddleOCR
+                    
+                    self._engine = PaddleOCR(
+                        use_angle_cls=self.use_angle_cls,
+                        lang=self.lang,
+                        use_gpu=False,
+                        show_log=False
+                    )
+                    logger.info("PaddleOCR initialized successfully")
+                except Exception as e:
+                    logger.error(f"Error initializing PaddleOCR: {str(e)}")
+                    raise
+        
+        return self._engine
+    
+    @property
+    def ocr(self):
+        """PaddleOCR instance, loaded on first use"""
+        return self.load_models()
+    
+    def warm_up(self) -> None:
+        """
+        Get OCR ready ahead of the first request
+        
+        Starts the worker pool and waits for every worker to load its models,
+        or loads the models in-process when no pool is configured.
+        """
+        if self.pool_size > 0:
+            self._get_pool().warm_up()
+        else:
+            self.load_models()
     
-    def preprocess_image(self, image_path: str) -> Optional[np.ndarray]:
+    def preprocess_image(self, image: Union[str, np.ndarray], profile: Optional[str] = None) -> Optional[np.ndarray]:
         """
         Preprocess image to improve OCR accuracy
         
         Args:
-            image_path: Path to the image file
+            image: Path to the image file, or an image array in OpenCV
+                channel order (grayscale, BGR or BGRA)
+            profile: "none", "fast", "full" or "auto"
+                (defaults to settings.OCR_PREPROCESS_PROFILE)
             
         Returns:
             Preprocessed image as numpy array
         """
         try:
-            # Read image
-            img = cv2.imread(image_path)
-            if img is None:
-                raise ValueError(f"Could not read image: {image_path}")
+            profile = profile or settings.OCR_PREPROCESS_PROFILE
             
             # Convert to grayscale
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            gray = self._to_grayscale(image)
             
+            if profile == "auto":
+                profile = self.select_profile(gray)
+            
+            return self._apply_profile(gray, profile)
+        except Exception as e:
+            logger.error(f"Error preprocessing image: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _apply_profile(gray: np.ndarray, profile: str) -> np.ndarray:
+        """
+        Run one preprocessing profile on a grayscale image
+        
+        - none: grayscale only
+        - fast: 3x3 median filter and a global Otsu threshold
+        - full: non-local means denoising and adaptive thresholding
+        """
+        if profile == "none":
+            return gray
+        
+        if profile == "fast":
+            smoothed = cv2.medianBlur(gray, 3)
+            _, binary = cv2.threshold(smoothed, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            return binary
+        
+        if profile == "full":
             # Apply denoising
             denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
             
             # Apply adaptive thresholding
-            binary = cv2.adaptiveThreshold(
+            return cv2.adaptiveThreshold(
                 denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                 cv2.THRESH_BINARY, 11, 2
             )
+        
+        raise ValueError(f"Unknown preprocessing profile: {profile}")
+    
+    @staticmethod
+    def measure_image_quality(gray: np.ndarray) -> Dict[str, float]:
+        """
+        Cheap noise and contrast estimates for a grayscale image
+        
+        Noise is Immerkaer's fast estimate of the Gaussian noise sigma,
+        computed on a central crop of at most 512x512 pixels so the cost does
+        not grow with render resolution. The 10% of pixels with the strongest
+        local gradient (text strokes) are left out so clean text does not
+        read as noise. Contrast is the standard deviation of the same crop.
+        
+        Args:
+            gray: Grayscale image
             
-            return binary
-        except Exception as e:
-            logger.error(f"Error preprocessing image: {str(e)}")
-            return None
+        Returns:
+            Dict with "noise" and "contrast"
+        """
+        height, width = gray.shape
+        top = max((height - 512) // 2, 0)
+        left = max((width - 512) // 2, 0)
+        crop = np.ascontiguousarray(gray[top:top + 512, left:left + 512])
+        
+        if crop.shape[0] < 3 or crop.shape[1] < 3:
+            return {"noise": 0.0, "contrast": float(crop.std())}
+        
+        kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+        response = np.abs(cv2.filter2D(crop.astype(np.float32), -1, kernel))[1:-1, 1:-1]
+        
+        gradient = cv2.morphologyEx(crop, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))[1:-1, 1:-1]
+        flat = gradient <= max(np.percentile(gradient, 90), 1)
+        noise = np.sqrt(np.pi / 2) * response[flat].mean() / 6
+        
+        return {"noise": float(noise), "contrast": float(crop.std())}
     
-    def pdf_to_images(self, pdf_path: str) -> list:
+    def select_profile(self, gray: np.ndarray) -> str:
         """
-        Convert PDF pages to images
+        Pick the lightest preprocessing profile likely to keep OCR accuracy
         
         Args:
-            pdf_path: Path to PDF file
+            gray: Grayscale image
+            
+        Returns:
+            Profile name
+        """
+        quality = self.measure_image_quality(gray)
+        
+        if quality["noise"] <= settings.OCR_AUTO_MAX_NOISE_NONE and quality["contrast"] >= settings.OCR_AUTO_MIN_CONTRAST:
+            profile = "none"
+        elif quality["noise"] <= settings.OCR_AUTO_MAX_NOISE_FAST:
+            profile = "fast"
+        else:
+            profile = "full"
+        
+        logger.debug(
+            f"Auto preprocessing: noise={quality['noise']:.2f} "
+            f"contrast={quality['contrast']:.2f} -> {profile}"
+        )
+        return profile
+    
+    @staticmethod
+    def _to_grayscale(image: Union[str, np.ndarray]) -> np.ndarray:
+        """
+        Load an image path or take an array and return a grayscale array
+        """
+        if isinstance(image, str):
+            img = cv2.imread(image)
+            if img is None:
+                raise ValueError(f"Could not read image: {image}")
+        else:
+            img = image
+        
+        if img.ndim == 2:
+            return img
+        if img.shape[2] == 4:
+            return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    
+    @staticmethod
+    def render_zoom(width_pt: float, height_pt: float) -> float:
+        """
+        Choose the render scale for a PDF page
+        
+        Pages are rendered at settings.OCR_RENDER_DPI, so the pixel size
+        follows the physical page size. Oversized pages (A3, drawings,
+        posters) are scaled down to stay within
+        settings.OCR_MAX_PAGE_PIXELS.
+        
+        Args:
+            width_pt: Page width in points (1/72 inch)
+            height_pt: Page height in points
             
         Returns:
-            List of image arrays
+            Zoom factor for fitz.Matrix
+        """
+        zoom = settings.OCR_RENDER_DPI / 72
+        
+        area_pt = width_pt * height_pt
+        if area_pt > 0 and area_pt * zoom * zoom > settings.OCR_MAX_PAGE_PIXELS:
+            zoom = (settings.OCR_MAX_PAGE_PIXELS / area_pt) ** 0.5
+        
+        return zoom
+    
+    def pdf_to_images(self, pdf_path: str, page_numbers: Optional[List[int]] = None) -> Iterator[np.ndarray]:
+        """
+        Convert PDF pages to images, one page at a time
+        
+        Pages are rendered straight to grayscale at settings.OCR_RENDER_DPI,
+        scaled down where needed so no page exceeds
+        settings.OCR_MAX_PAGE_PIXELS. Only one page is held in memory at a
+        time, however long the document.
+        
+        Each array is a read-only view over the page's pixmap buffer rather
+        than a copy, so it is only valid until the next page is requested.
+        Copy it if it has to outlive the iteration.
+        
+        Args:
+            pdf_path: Path to PDF file
+            page_numbers: 0-based pages to render (all pages if None)
+            
+        Yields:
+            Grayscale page image arrays (height x width)
         """
+        pdf_document = None
         try:
-            images = []
             pdf_document = fitz.open(pdf_path)
+            if page_numbers is None:
+                page_numbers = range(len(pdf_document))
             
-            for page_num in range(len(pdf_document)):
+            for page_num in page_numbers:
                 page = pdf_document[page_num]
                 
-                # Render page to image (higher resolution for better OCR)
-                mat = fitz.Matrix(2, 2)  # 2x zoom for better quality
-                pix = page.get_pixmap(matrix=mat)
+                # Render page to a single-channel image; OCR only needs
+                # grayscale, which is a third of the memory of RGB
+                zoom = self.render_zoom(page.rect.width, page.rect.height)
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
                 
-                # Convert to numpy array
-                img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
-                    pix.height, pix.width, pix.n
+                # Wrap the pixmap samples without copying (MuPDF pixmaps
+                # are tightly packed, stride == width * n)
+                img = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(
+                    pix.height, pix.width
                 )
                 
-                # Convert RGBA to RGB if necessary
-                if pix.n == 4:
-                    img = cv2.cvtColor(img, cv2.COLOR_RGBA2RGB)
+                yield img
                 
-                images.append(img)
-            
-            pdf_document.close()
-            return images
+                # Drop the view before the pixmap that backs it
+                del img
+                pix = None
+                
+                # MuPDF keeps decoded page images in its resource store
+                # (up to 256MB by default); release them page by page
+                fitz.TOOLS.store_shrink(100)
         except Exception as e:
             logger.error(f"Error converting PDF to images: {str(e)}")
-            return []
+        finally:
+            if pdf_document is not None:
+                pdf_document.close()
     
-    def extract_text_from_image(self, image_path: str) -> Tuple[str, float]:
+    def extract_text_from_image(self, image: Union[str, np.ndarray]) -> Tuple[str, float]:
         """
         Extract text from image using PaddleOCR
         
         Args:
-            image_path: Path to the image file
+            image: Path to the image file or an image array
             
         Returns:
             Tuple of (extracted_text, confidence_score)
         """
         try:
-            # Preprocess image
-            preprocessed = self.preprocess_image(image_path)
+            if self.pool_size > 0:
+                return self._get_pool().ocr_image(image)
             
-            # Use preprocessed image if available, otherwise use original
-            input_image = preprocessed if preprocessed is not None else image_path
+            profile = settings.OCR_PREPROCESS_PROFILE
+            if profile != "auto":
+                # Preprocess image
+                preprocessed = self.preprocess_image(image, profile)
+                
+                # Use preprocessed image if available, otherwise use original
+                input_image = preprocessed if preprocessed is not None else image
+                
+                return self._run_ocr(input_image)
             
-            # Perform OCR
-            result = self.ocr.ocr(input_image, cls=True)
+            # Start from the lightest profile the image quality allows and
+            # escalate only while OCR confidence stays below the threshold
+            gray = self._to_grayscale(image)
+            start = PREPROCESS_PROFILES.index(self.select_profile(gray))
             
-            if not result or not result[0]:
-                return "", 0.0
+            best_text, best_confidence = "", 0.0
+            for candidate in PREPROCESS_PROFILES[start:]:
+                text, confidence = self._run_ocr(self._apply_profile(gray, candidate))
+                if confidence > best_confidence:
+                    best_text, best_confidence = text, confidence
+                if confidence >= settings.OCR_AUTO_MIN_CONFIDENCE:
+                    break
+                logger.debug(f"Profile {candidate} confidence {confidence:.2f} below threshold, escalating")
             
-            # Extract text and confidence scores
-            extracted_lines = []
-            confidence_scores = []
+            return best_text, best_confidence
             
-            for line in result[0]:
-                text = line[1][0]
-                confidence = line[1][1]
-                extracted_lines.append(text)
-                confidence_scores.append(confidence)
+        except Exception as e:
+            logger.error(f"Error extracting text from image: {str(e)}")
+            return "", 0.0
+    
+    def _run_ocr(self, input_image: Union[str, np.ndarray]) -> Tuple[str, float]:
+        """
+        Run PaddleOCR on a prepared image and join the recognised lines
+        
+        Args:
+            input_image: Image path or array
             
-            # Combine all text with newlines
-            full_text = "\n".join(extracted_lines)
+        Returns:
+            Tuple of (extracted_text, confidence_score)
+        """
+        # Perform OCR
+        if self.use_batching:
+            if isinstance(input_image, str):
+                input_image = cv2.imread(input_image)
+            lines = self._get_batcher().recognize(input_image)
+        else:
+            engine = self.ocr
+            with self._ocr_lock:
+                result = engine.ocr(input_image, cls=True)
+            lines = [line[1] for line in result[0]] if result and result[0] else []
+        
+        if not lines:
+            return "", 0.0
+        
+        # Extract text and confidence scores
+        extracted_lines = []
+        confidence_scores = []
+        
+        for text, confidence in lines:
+            extracted_lines.append(text)
+            confidence_scores.append(confidence)
+        
+        # Combine all text with newlines
+        full_text = "\n".join(extracted_lines)
+        
+        # Calculate average confidence
+        avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0.0
+        
+        return full_text, avg_confidence
+    
+    def ocr_page(self, image: np.ndarray) -> Tuple[str, float]:
+        """
+        Extract text from a single rendered PDF page
+        
+        Args:
+            image: Page image array
             
-            # Calculate average confidence
-            avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0.0
+        Returns:
+            Tuple of (extracted_text, confidence_score)
+        """
+        return self.extract_text_from_image(image)
+    
+    def _get_pool(self):
+        """
+        Create the OCR worker pool on first use
+        """
+        from .ocr_pool import OCRWorkerPool
+        
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = OCRWorkerPool(self.pool_size, self.use_batching)
+            return self._pool
+    
+    def _get_batcher(self):
+        """
+        Start the micro-batching scheduler for the in-process engine on first use
+        """
+        from .ocr_batcher import OCRBatchScheduler, recognize_batch
+        
+        with self._engine_lock:
+            if self._batcher is None:
+                self._batcher = OCRBatchScheduler(
+                    lambda images: recognize_batch(self.load_models(), images),
+                    max_batch_size=settings.OCR_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.OCR_BATCH_MAX_WAIT_MS
+                )
+            return self._batcher
+    
+    def batch_stats(self) -> Dict[str, Any]:
+        """
+        Micro-batching counters for the worker pool or the in-process engine
+        """
+        if self.pool_size > 0:
+            with self._pool_lock:
+                if self._pool is not None:
+                    return self._pool.batch_stats()
+            return {"enabled": self.use_batching, "batches": 0, "images": 0}
+        if self._batcher is None:
+            return {"enabled": self.use_batching, "batches": 0, "images": 0}
+        return {"enabled": self.use_batching, **self._batcher.stats()}
+    
+    def close(self) -> None:
+        """
+        Shut down the OCR worker pool and batch scheduler if they were started
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        
+        with self._engine_lock:
+            batcher, self._batcher = self._batcher, None
+        if batcher is not None:
+            batcher.shutdown()
+    
+    @staticmethod
+    def has_usable_text_layer(text: str) -> bool:
+        """
+        Decide whether a page's embedded text can be used instead of OCR
+        
+        Scanned pages have no text layer, or only a few stray characters
+        (stamps, page numbers). Broken font encodings produce long runs of
+        symbols, so mostly non-alphanumeric text is rejected as well.
+        
+        Args:
+            text: Text extracted from the page's text layer
             
-            return full_text, avg_confidence
+        Returns:
+            True if the text layer is good enough to skip OCR
+        """
+        visible = "".join(text.split())
+        if len(visible) < settings.PDF_TEXT_LAYER_MIN_CHARS:
+            return False
+        
+        alphanumeric = sum(1 for char in visible if char.isalnum())
+        return alphanumeric / len(visible) >= 0.5
+    
+    def extract_pdf_pages(self, pdf_path: str) -> List[Dict[str, Any]]:
+        """
+        Extract text from each PDF page, choosing the source per page
+        
+        Pages with a usable text layer take their embedded text (confidence
+        1.0). Only the remaining pages are rendered and run through OCR.
+        
+        Args:
+            pdf_path: Path to the PDF file
             
-        except Exception as e:
-            logger.error(f"Error extracting text from image: {str(e)}")
+        Returns:
+            One dict per page, in page order, with keys page (1-based),
+            source ("text_layer" or "ocr"), confidence and text
+        """
+        pdf_document = fitz.open(pdf_path)
+        pages = []
+        
+        try:
+            for idx, page in enumerate(pdf_document):
+                text = page.get_text()
+                if self.has_usable_text_layer(text):
+                    pages.append({"page": idx + 1, "source": "text_layer", "confidence": 1.0, "text": text.strip()})
+                else:
+                    pages.append({"page": idx + 1, "source": "ocr", "confidence": 0.0, "text": ""})
+                
+                # Parsing a scanned page loads its images into MuPDF's
+                # store; do not let them pile up across the document
+                fitz.TOOLS.store_shrink(100)
+        finally:
+            pdf_document.close()
+        
+        ocr_pages = [page["page"] - 1 for page in pages if page["source"] == "ocr"]
+        logger.info(
+            f"PDF routing: {len(pages) - len(ocr_pages)} text-layer pages, "
+            f"{len(ocr_pages)} OCR pages"
+        )
+        
+        if not ocr_pages:
+            return pages
+        
+        if self.pool_size > 0:
+            logger.info(f"Running OCR on {len(ocr_pages)} pages with {self.pool_size} workers")
+            page_results = self._get_pool().ocr_pages(self.pdf_to_images(pdf_path, ocr_pages))
+        else:
+            page_results = [self.ocr_page(img) for img in self.pdf_to_images(pdf_path, ocr_pages)]
+        
+        for page_num, (text, confidence) in zip(ocr_pages, page_results):
+            pages[page_num]["text"] = text
+            pages[page_num]["confidence"] = confidence
+        
+        return pages
+    
+    @staticmethod
+    def combine_pages(pages: List[Dict[str, Any]]) -> Tuple[str, float]:
+        """
+        Join per-page results into one text with page markers
+        
+        Args:
+            pages: Page dicts as returned by extract_pdf_pages
+            
+        Returns:
+            Tuple of (extracted_text, average_confidence)
+        """
+        if not pages:
             return "", 0.0
+        
+        full_text = "\n\n".join(f"--- Page {page['page']} ---\n{page['text']}" for page in pages)
+        avg_confidence = sum(page["confidence"] for page in pages) / len(pages)
+        
+        return full_text, avg_confidence
     
     def extract_text_from_pdf(self, pdf_path: str) -> Tuple[str, float]:
         """
@@ -158,52 +587,195 @@ class OCRService:
             Tuple of (extracted_text, average_confidence)
         """
         try:
-            # First try to extract text directly from PDF (for digital PDFs)
-            pdf_document = fitz.open(pdf_path)
-            direct_text = ""
-            
-            for page in pdf_document:
-                direct_text += page.get_text()
-            
-            pdf_document.close()
+            return self.combine_pages(self.extract_pdf_pages(pdf_path))
+        except Exception as e:
+            logger.error(f"Error extracting text from PDF: {str(e)}")
+            return "", 0.0
+    
+    def extract_text_with_pages(self, file_path: str, file_type: str) -> Tuple[str, float, List[Dict[str, Any]]]:
+        """
+        Extract text and report where each page's text came from
+        
+        Args:
+            file_path: Path to the file
+            file_type: Type of file (pdf, jpg, png, etc.)
             
-            # If we got substantial text directly, use it
-            if len(direct_text.strip()) > 100:
-                logger.info("Extracted text directly from PDF")
-                return direct_text, 1.0
+        Returns:
+            Tuple of (extracted_text, confidence_score, page_details) where
+            page_details holds page, source and confidence for every page
+        """
+        try:
+            file_type = file_type.lower()
             
-            # Otherwise, convert to images and use OCR
-            logger.info("Converting PDF to images for OCR")
-            images = self.pdf_to_images(pdf_path)
+            cache_key = self.cache_key(file_path) if self.cache is not None else None
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"OCR cache hit for {file_path}")
+                    return cached["text"], cached["confidence"], cached["page_details"]
             
-            if not images:
-                return "", 0.0
+            text, confidence, page_details = self._extract(file_path, file_type)
             
-            all_text = []
-            all_confidences = []
+            # Only store real results; failures should be retried next time
+            if cache_key is not None and text:
+                self.cache.set(cache_key, {"text": text, "confidence": confidence, "page_details": page_details})
             
-            for idx, img in enumerate(images):
-                # Save image temporarily
-                temp_img_path = f"temp_page_{idx}.png"
-                cv2.imwrite(temp_img_path, img)
+            return text, confidence, page_details
                 
-                # Extract text
-                text, confidence = self.extract_text_from_image(temp_img_path)
-                all_text.append(f"--- Page {idx + 1} ---\n{text}")
-                all_confidences.append(confidence)
-                
-                # Clean up temp file
-                if os.path.exists(temp_img_path):
-                    os.remove(temp_img_path)
-            
-            full_text = "\n\n".join(all_text)
-            avg_confidence = sum(all_confidences) / len(all_confidences) if all_confidences else 0.0
+        except Exception as e:
+            logger.error(f"Error in extract_text_with_pages: {str(e)}")
+            return "", 0.0, []
+    
+    def extract_documents(self, documents: List[Tuple[str, str]]) -> List[Tuple[str, float, List[Dict[str, Any]], float]]:
+        """
+        Extract text from several documents at the same time
+        
+        Documents are extracted on up to OCR_MAX_CONCURRENT_DOCUMENTS
+        threads. Their pages are OCRed in parallel only with that many pool
+        workers (the default pool size), so the total time is close to that
+        of the slowest document; with fewer workers or in-process, their
+        pages are batched together and text layers, rendering and
+        preprocessing overlap with OCR.
+        
+        Args:
+            documents: (file_path, file_type) pairs
             
-            return full_text, avg_confidence
+        Returns:
+            (extracted_text, confidence_score, page_details, seconds) for
+            each document, in input order
+        """
+        if not documents:
+            return []
+        
+        def extract(document: Tuple[str, str]) -> Tuple[str, float, List[Dict[str, Any]], float]:
+            start = time.time()
+            text, confidence, page_details = self.extract_text_with_pages(*document)
+            return text, confidence, page_details, time.time() - start
+        
+        max_workers = max(1, min(len(documents), settings.OCR_MAX_CONCURRENT_DOCUMENTS))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr-document") as executor:
+            return list(executor.map(extract, documents))
+    
+    @staticmethod
+    def combine_documents(documents: List[Tuple[str, str, float]]) -> Tuple[str, float]:
+        """
+        Join the text of several documents with document markers
+        
+        A single document is returned unchanged.
+        
+        Args:
+            documents: (filename, text, confidence) for each document, in order
             
-        except Exception as e:
-            logger.error(f"Error extracting text from PDF: {str(e)}")
+        Returns:
+            Tuple of (combined_text, average_confidence)
+        """
+        if not documents:
             return "", 0.0
+        
+        if len(documents) == 1:
+            _, text, confidence = documents[0]
+            return text, confidence
+        
+        full_text = "\n\n".join(
+            f"=== Document {index}: {filename} ===\n{text}"
+            for index, (filename, text, _) in enumerate(documents, start=1)
+        )
+        avg_confidence = sum(confidence for _, _, confidence in documents) / len(documents)
+        
+        return full_text, avg_confidence
+    
+    @staticmethod
+    def combine_stored_texts(document_texts: List[Tuple[Any, Any]]) -> Tuple[str, float]:
+        """
+        Join stored OCR texts of a visit's documents
+        
+        Args:
+            document_texts: (RawDocument, OCRText) pairs, as returned by
+                DatabaseService.get_document_ocr_texts
+            
+        Returns:
+            Tuple of (combined_text, average_confidence)
+        """
+        return OCRService.combine_documents([
+            (document.filename, ocr_text.raw_text, float(ocr_text.confidence_score or 0.0))
+            for document, ocr_text in document_texts
+        ])
+    
+    def _extract(self, file_path: str, file_type: str) -> Tuple[str, float, List[Dict[str, Any]]]:
+        """
+        Run extraction for a file type, bypassing the cache
+        """
+        if file_type == 'pdf':
+            pages = self.extract_pdf_pages(file_path)
+            text, confidence = self.combine_pages(pages)
+            page_details = [
+                {"page": page["page"], "source": page["source"], "confidence": round(page["confidence"], 4)}
+                for page in pages
+            ]
+            return text, confidence, page_details
+        elif file_type in ['jpg', 'jpeg', 'png', 'bmp', 'tiff']:
+            text, confidence = self.extract_text_from_image(file_path)
+            return text, confidence, [{"page": 1, "source": "ocr", "confidence": round(confidence, 4)}]
+        else:
+            logger.error(f"Unsupported file type: {file_type}")
+            return "", 0.0, []
+    
+    def cache_config(self) -> Dict[str, Any]:
+        """
+        OCR settings that affect the output and so belong in the cache key
+        """
+        return {
+            "lang": self.lang,
+            "use_angle_cls": self.use_angle_cls,
+            "preprocess_version": PREPROCESS_VERSION,
+            "preprocess_profile": settings.OCR_PREPROCESS_PROFILE,
+            "auto_min_confidence": settings.OCR_AUTO_MIN_CONFIDENCE,
+            "auto_max_noise_none": settings.OCR_AUTO_MAX_NOISE_NONE,
+            "auto_min_contrast": settings.OCR_AUTO_MIN_CONTRAST,
+            "auto_max_noise_fast": settings.OCR_AUTO_MAX_NOISE_FAST,
+            "render_dpi": settings.OCR_RENDER_DPI,
+            "max_page_pixels": settings.OCR_MAX_PAGE_PIXELS,
+            "text_layer_min_chars": settings.PDF_TEXT_LAYER_MIN_CHARS
+        }
+    
+    def cache_key(self, file_path: str) -> str:
+        """
+        Build the OCR cache key for a file
+        
+        Args:
+            file_path: Path to the file
+            
+        Returns:
+            "<sha256 of file bytes>:<hash of OCR configuration>"
+        """
+        file_hash = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                file_hash.update(chunk)
+        
+        config = json.dumps(self.cache_config(), sort_keys=True)
+        config_hash = hashlib.sha256(config.encode("utf-8")).hexdigest()[:16]
+        
+        return f"{file_hash.hexdigest()}:{config_hash}"
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters and size of the OCR cache
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def invalidate_cache(self) -> int:
+        """
+        Drop all cached OCR results, e.g. after changing preprocessing
+        
+        Returns:
+            Number of entries removed
+        """
+        if self.cache is None:
+            return 0
+        return self.cache.clear()
     
     def extract_text(self, file_path: str, file_type: str) -> Tuple[str, float]:
         """
@@ -216,17 +788,5 @@ class OCRService:
         Returns:
             Tuple of (extracted_text, confidence_score)
         """
-        try:
-            file_type = file_type.lower()
-            
-            if file_type == 'pdf':
-                return self.extract_text_from_pdf(file_path)
-            elif file_type in ['jpg', 'jpeg', 'png', 'bmp', 'tiff']:
-                return self.extract_text_from_image(file_path)
-            else:
-                logger.error(f"Unsupported file type: {file_type}")
-                return "", 0.0
-                
-        except Exception as e:
-            logger.error(f"Error in extract_text: {str(e)}")
-            return "", 0.0
+        text, confidence, _ = self.extract_text_with_pages(file_path, file_type)
+        return text, confidence
@@ -0,0 +1,708 @@
+import time
+import asyncio
+import logging
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from .ocr_service import OCRService
+from .llm_service import LLMService, LLMError
+from .token_budget import PromptTooLong
+from .database_service import DatabaseService
+from .admission_service import AdmissionService, StageOverloaded
+from ..schemas import OCRResponse, VisitOCRResponse, CleanedTextResponse, SummaryResponse, PipelineResponse
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineError(Exception):
+    """
+    A pipeline stage could not run or failed
+
+    Carries the HTTP status the API should answer with.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+    @classmethod
+    def too_long(cls, error: PromptTooLong) -> "PipelineError":
+        """413 for a document whose LLM request does not fit the context window"""
+        return cls(413, f"Document is too long to process: {str(error)}")
+
+
+class PipelineService:
+    """
+    Runs the processing stages of a visit: OCR, cleaning and summary
+
+    Used by the stage endpoints and by the background job workers. Each
+    stage reads its input from the database, stores its output and keeps
+    the visit status up to date. Database work runs in the thread pool and
+    LLM calls are awaited, so stages never block the event loop.
+
+    With an AdmissionService, each stage first takes one of its slots.
+    Requests that find the stage's queue full get StageOverloaded; callers
+    passing background=True (the job workers) wait for a slot instead.
+    """
+
+    def __init__(
+        self,
+        ocr_service: Optional[OCRService] = None,
+        llm_service: Optional[LLMService] = None,
+        admission_service: Optional[AdmissionService] = None,
+        fused_mode: Optional[bool] = None
+    ):
+        """
+        Args:
+            ocr_service: Service used by the OCR stage
+            llm_service: Service used by the cleaning and summary stages
+            admission_service: Limits how many requests each stage runs at once
+            fused_mode: Have process() make one LLM request per visit
+                (defaults to settings.LLM_FUSED_MODE)
+        """
+        self.ocr_service = ocr_service
+        self.llm_service = llm_service
+        self.admission_service = admission_service
+        self.fused_mode = settings.LLM_FUSED_MODE if fused_mode is None else fused_mode
+
+    @asynccontextmanager
+    async def _slot(self, stage: str, background: bool) -> AsyncIterator[None]:
+        """Hold a slot of the stage, if admission control is configured"""
+        if self.admission_service is None:
+            yield
+            return
+        async with self.admission_service.slot(stage, background):
+            yield
+
+    # OCR
+    async def ocr(self, db: Session, visit_id: str, background: bool = False) -> VisitOCRResponse:
+        """
+        OCR every document of a visit that has no OCR text yet
+
+        Args:
+            db: Database session
+            visit_id: Visit ID
+            background: Wait for a slot rather than fail when the stage is busy
+
+        Returns:
+            Combined text of all documents and per-document results
+        """
+        async with self._slot("ocr", background):
+            return await run_in_threadpool(self._ocr_visit, db, visit_id)
+
+    def _ocr_visit(self, db: Session, visit_id: str) -> VisitOCRResponse:
+        try:
+            # Get visit
+            visit = DatabaseService.get_visit(db, visit_id)
+            if not visit:
+                raise PipelineError(404, "Visit not found")
+
+            # Get documents for this visit
+            documents = DatabaseService.get_documents_by_visit(db, visit_id)
+            if not documents:
+                raise PipelineError(404, "No documents found for this visit")
+
+            # Only documents without stored OCR text need processing
+            stored = {
+                document.document_id: ocr_text
+                for document, ocr_text in DatabaseService.get_document_ocr_texts(db, visit_id)
+            }
+            skipped = [document.document_id for document in documents if document.document_id in stored]
+            pending = [document for document in documents if document.document_id not in stored]
+
+            start_time = time.time()
+            failed = []
+            if pending:
+                # Update visit status
+                DatabaseService.update_visit_status(db, visit_id, "processing_ocr")
+
+                # Perform OCR on all pending documents concurrently
+                results = self.ocr_service.extract_documents(
+                    [(document.file_path, document.file_type) for document in pending]
+                )
+
+                # Save OCR results (the session stays on this thread); they are
+                # committed together with the final visit status below
+                for document, (extracted_text, confidence, page_details, seconds) in zip(pending, results):
+                    if not extracted_text:
+                        failed.append(document.filename)
+                        continue
+
+                    stored[document.document_id] = DatabaseService.create_ocr_text(
+                        db=db,
+                        visit_id=visit_id,
+                        document_id=document.document_id,
+                        raw_text=extracted_text,
+                        confidence_score=f"{confidence:.2f}",
+                        processing_time=f"{seconds:.2f}s",
+                        page_details=page_details,
+                        commit=False
+                    )
+
+            if failed:
+                # Documents that worked are kept; running OCR again retries the rest
+                DatabaseService.update_visit_status(db, visit_id, "ocr_failed", commit=False)
+                db.commit()
+                raise PipelineError(500, f"Could not extract text from: {', '.join(failed)}")
+
+            document_texts = [
+                (document, stored[document.document_id])
+                for document in documents
+                if document.document_id in stored
+            ]
+            combined_text, confidence = OCRService.combine_stored_texts(document_texts)
+
+            response = VisitOCRResponse(
+                visit_id=visit_id,
+                raw_text=combined_text,
+                confidence_score=f"{confidence:.2f}",
+                processing_time=f"{time.time() - start_time:.2f}s",
+                documents=[OCRResponse.model_validate(ocr_text) for _, ocr_text in document_texts],
+                skipped_documents=skipped
+            )
+
+            # Update visit status
+            DatabaseService.update_visit_status(db, visit_id, "ocr_completed", commit=False)
+            db.commit()
+
+            return response
+
+        except PipelineError:
+            raise
+        except Exception as e:
+            db.rollback()
+            DatabaseService.update_visit_status(db, visit_id, "ocr_failed")
+            raise PipelineError(500, f"Error performing OCR: {str(e)}")
+
+    # Cleaning
+    async def clean(self, db: Session, visit_id: str, background: bool = False) -> CleanedTextResponse:
+        """
+        Clean the visit's OCR text and extract structured data
+
+        Args:
+            db: Database session
+            visit_id: Visit ID
+            background: Wait for a slot rather than fail when the stage is busy
+
+        Returns:
+            Stored cleaned text and extracted data
+        """
+        async with self._slot("clean", background):
+            return await self._clean(db, visit_id)
+
+    async def _clean(self, db: Session, visit_id: str) -> CleanedTextResponse:
+        try:
+            raw_text, confidence = await run_in_threadpool(self._start_cleaning, db, visit_id)
+
+            # Clean text using LLM
+            start_time = time.time()
+            cleaned_text = await self.llm_service.aclean_ocr_text(raw_text, confidence)
+
+            # Extract structured data
+            extracted_data = await self.llm_service.aextract_structured_data(cleaned_text)
+
+            processing_time = f"{time.time() - start_time:.2f}s"
+
+            # Save cleaned text and structured data
+            return await run_in_threadpool(
+                self._save_cleaned_text, db, visit_id, cleaned_text, extracted_data, processing_time
+            )
+
+        except PipelineError:
+            raise
+        except LLMError:
+            # Answered by the app's LLMError handler (429/502/503)
+            await run_in_threadpool(DatabaseService.update_visit_status, db, visit_id, "cleaning_failed")
+            raise
+        except PromptTooLong as e:
+            await run_in_threadpool(DatabaseService.update_visit_status, db, visit_id, "cleaning_failed")
+            raise PipelineError.too_long(e)
+        except Exception as e:
+            await run_in_threadpool(DatabaseService.update_visit_status, db, visit_id, "cleaning_failed")
+            raise PipelineError(500, f"Error cleaning text: {str(e)}")
+
+    @staticmethod
+    def _start_cleaning(db: Session, visit_id: str) -> Tuple[str, float]:
+        """
+        Load the visit's OCR text and mark the visit as being cleaned
+
+        Returns:
+            Combined raw OCR text of every document and its average confidence
+        """
+        # Get visit
+        visit = DatabaseService.get_visit(db, visit_id)
+        if not visit:
+            raise PipelineError(404, "Visit not found")
+
+        # Get OCR text of every document
+        document_texts = DatabaseService.get_document_ocr_texts(db, visit_id)
+        if not document_texts:
+            raise PipelineError(404, "No OCR text found. Please run OCR first.")
+
+        # Update visit status
+        DatabaseService.update_visit_status(db, visit_id, "processing_cleaning")
+
+        return OCRService.combine_stored_texts(document_texts)
+
+    @staticmethod
+    def _save_cleaned_text(
+        db: Session,
+        visit_id: str,
+        cleaned_text: str,
+        extracted_data: dict,
+        processing_time: str
+    ) -> CleanedTextResponse:
+        """
+        Store cleaned text and structured data and mark cleaning as completed
+        """
+        cleaned_result = DatabaseService.create_cleaned_text(
+            db=db,
+            visit_id=visit_id,
+            cleaned_text=cleaned_text,
+            extracted_data=extracted_data,
+            processing_time=processing_time
+        )
+        response = CleanedTextResponse.model_validate(cleaned_result)
+
+        # Update visit status
+        DatabaseService.update_visit_status(db, visit_id, "cleaning_completed")
+
+        return response
+
+    # Summary
+    async def summarize(self, db: Session, visit_id: str, background: bool = False) -> SummaryResponse:
+        """
+        Generate the medical summary and key findings of a visit
+
+        Args:
+            db: Database session
+            visit_id: Visit ID
+            background: Wait for a slot rather than fail when the stage is busy
+
+        Returns:
+            Stored summary
+        """
+        async with self._slot("summarize", background):
+            return await self._summarize(db, visit_id)
+
+    async def _summarize(self, db: Session, visit_id: str) -> SummaryResponse:
+        try:
+            cleaned_text = await run_in_threadpool(self._start_summary, db, visit_id)
+
+            # Generate summary using LLM
+            start_time = time.time()
+            summary_text = await self.llm_service.agenerate_medical_summary(cleaned_text)
+
+            # Extract key findings
+            key_findings = await self.llm_service.aextract_key_findings(summary_text)
+
+            processing_time = f"{time.time() - start_time:.2f}s"
+
+            # Save summary
+            return await run_in_threadpool(
+                self._save_summary, db, visit_id, summary_text, key_findings, processing_time
+            )
+
+        except PipelineError:
+            raise
+        except LLMError:
+            await run_in_threadpool(DatabaseService.update_visit_status, db, visit_id, "summary_failed")
+            raise
+        except PromptTooLong as e:
+            await run_in_threadpool(DatabaseService.update_visit_status, db, visit_id, "summary_failed")
+            raise PipelineError.too_long(e)
+        except Exception as e:
+            await run_in_threadpool(DatabaseService.update_visit_status, db, visit_id, "summary_failed")
+            raise PipelineError(500, f"Error generating summary: {str(e)}")
+
+    @staticmethod
+    def _start_summary(db: Session, visit_id: str) -> str:
+        """
+        Load the visit's cleaned text and mark the visit as being summarised
+
+        Returns:
+            Cleaned text
+        """
+        # Get visit
+        visit = DatabaseService.get_visit(db, visit_id)
+        if not visit:
+            raise PipelineError(404, "Visit not found")
+
+        # Get cleaned text
+        cleaned_text = DatabaseService.get_cleaned_text_by_visit(db, visit_id)
+        if not cleaned_text:
+            raise PipelineError(404, "No cleaned text found. Please run cleaning first.")
+
+        # Update visit status
+        DatabaseService.update_visit_status(db, visit_id, "processing_summary")
+
+        return cleaned_text.cleaned_text
+
+    @staticmethod
+    def _save_summary(
+        db: Session,
+        visit_id: str,
+        summary_text: str,
+        key_findings: str,
+        processing_time: str
+    ) -> SummaryResponse:
+        """
+        Store the summary and mark the visit as completed
+        """
+        summary_result = DatabaseService.create_summary(
+            db=db,
+            visit_id=visit_id,
+            summary_text=summary_text,
+            key_findings=key_findings,
+            processing_time=processing_time
+        )
+        response = SummaryResponse.model_validate(summary_result)
+
+        # Update visit status
+        DatabaseService.update_visit_status(db, visit_id, "completed")
+
+        return response
+
+    async def summarize_stream(self, db: Session, visit_id: str, background: bool = False) -> "SummaryStream":
+        """
+        Start generating the summary of a visit for delivery as it is written
+
+        The summarize slot is taken and the cleaned text loaded here, so a
+        missing visit or a busy stage is reported before anything is sent.
+
+        Args:
+            db: Database session
+            visit_id: Visit ID
+            background: Wait for a slot rather than fail when the stage is busy
+
+        Returns:
+            The stream; the caller must close() it when done with it
+        """
+        exit_stack = AsyncExitStack()
+        await exit_stack.enter_async_context(self._slot("summarize", background))
+        try:
+            cleaned_text = await run_in_threadpool(self._start_summary, db, visit_id)
+        except PipelineError:
+            await exit_stack.aclose()
+            raise
+        except Exception as e:
+            await exit_stack.aclose()
+            raise PipelineError(500, f"Error generating summary: {str(e)}")
+
+        return SummaryStream(self.llm_service, visit_id, cleaned_text, exit_stack)
+
+    # Combined pipeline
+    async def process(
+        self,
+        db: Session,
+        visit_id: str,
+        on_stage: Optional[Callable[[str], Awaitable[None]]] = None,
+        background: bool = False
+    ) -> PipelineResponse:
+        """
+        Run OCR, cleaning, extraction, summary and key findings in one flow
+
+        Unlike calling the stages one by one, each stage's output is handed
+        to the next in memory rather than read back from the database, and
+        the cleaned text, summary and final visit status are written in a
+        single transaction. Structured extraction and the summary both start
+        from the cleaned text, so they run concurrently; the LLM calls on
+        the critical path drop from four to three.
+
+        In fused mode a single request returns all four artifacts. If its
+        reply does not validate or the text is too long for one request,
+        the separate requests are made as usual.
+
+        LLM calls that fail for good raise LLMError, after the visit is
+        marked as failed at the stage that failed (extraction counts as
+        cleaning). A failure on either side of the concurrent extraction
+        and summary cancels the other side.
+
+        Args:
+            db: Database session
+            visit_id: Visit ID
+            on_stage: Awaited with "ocr", "clean" and "summarize" as each
+                stage starts (used to report job progress)
+            background: Wait for slots rather than fail when a stage is busy
+
+        Returns:
+            Results of every stage with per-stage timings in seconds
+        """
+        timings = {}
+        started = time.perf_counter()
+        stage = "ocr"
+
+        async def enter(name: str) -> float:
+            nonlocal stage
+            stage = name
+            if on_stage is not None:
+                await on_stage(name)
+            return time.perf_counter()
+
+        async def extract(cleaned_text: str) -> dict:
+            nonlocal stage
+            try:
+                async with self._slot("clean", background):
+                    mark = time.perf_counter()
+                    extracted_data = await self.llm_service.aextract_structured_data(cleaned_text)
+                    timings["extract"] = time.perf_counter() - mark
+            except Exception:
+                # Extraction belongs to cleaning, even though it runs alongside the summary
+                stage = "clean"
+                raise
+            return extracted_data
+
+        async def summarize(cleaned_text: str) -> Tuple[str, str]:
+            async with self._slot("summarize", background):
+                mark = time.perf_counter()
+                summary_text = await self.llm_service.agenerate_medical_summary(cleaned_text)
+                timings["summary"] = time.perf_counter() - mark
+
+                mark = time.perf_counter()
+                key_findings = await self.llm_service.aextract_key_findings(summary_text)
+                timings["key_findings"] = time.perf_counter() - mark
+            return summary_text, key_findings
+
+        mark = await enter("ocr")
+        ocr_result = await self.ocr(db, visit_id, background)
+        timings["ocr"] = time.perf_counter() - mark
+
+        try:
+            await enter("clean")
+            fused = None
+            if self.fused_mode:
+                async with self._slot("clean", background):
+                    mark = time.perf_counter()
+                    fused = await self.llm_service.aprocess_document(ocr_result.raw_text)
+                    timings["fused"] = time.perf_counter() - mark
+                if fused is None:
+                    logger.warning(f"Fused LLM request failed for visit {visit_id}, making separate requests")
+
+            if fused is not None:
+                cleaned_text = fused.cleaned_text
+                extracted_data = fused.structured_data
+                summary_text = fused.summary
+                key_findings = fused.key_findings_text
+                # One request produced everything, so both stages report its time
+                cleaning_time = summary_time = timings["fused"]
+            else:
+                async with self._slot("clean", background):
+                    mark = time.perf_counter()
+                    cleaned_text = await self.llm_service.aclean_ocr_text(
+                        ocr_result.raw_text, float(ocr_result.confidence_score)
+                    )
+                    timings["clean"] = time.perf_counter() - mark
+
+                # Extraction runs alongside the summary and key findings
+                await enter("summarize")
+                mark = time.perf_counter()
+                extracted_data, (summary_text, key_findings) = await self._gather_or_cancel(
+                    extract(cleaned_text), summarize(cleaned_text)
+                )
+                timings["extract_and_summary"] = time.perf_counter() - mark
+                cleaning_time = timings["clean"] + timings["extract"]
+                summary_time = timings["summary"] + timings["key_findings"]
+
+            mark = time.perf_counter()
+            cleaned, summary = await run_in_threadpool(
+                self._save_results,
+                db,
+                visit_id,
+                cleaned_text,
+                extracted_data,
+                f"{cleaning_time:.2f}s",
+                summary_text,
+                key_findings,
+                f"{summary_time:.2f}s"
+            )
+            timings["save"] = time.perf_counter() - mark
+
+        except (PipelineError, StageOverloaded):
+            raise
+        except Exception as e:
+            failed_status = "cleaning_failed" if stage == "clean" else "summary_failed"
+            await run_in_threadpool(DatabaseService.update_visit_status, db, visit_id, failed_status)
+            if isinstance(e, LLMError):
+                raise
+            if isinstance(e, PromptTooLong):
+                raise PipelineError.too_long(e)
+            raise PipelineError(500, f"Error processing visit: {str(e)}")
+
+        timings["total"] = time.perf_counter() - started
+
+        return PipelineResponse(
+            visit_id=visit_id,
+            status="completed",
+            ocr=ocr_result,
+            cleaned=cleaned,
+            summary=summary,
+            timings={name: round(seconds, 3) for name, seconds in timings.items()}
+        )
+
+    @staticmethod
+    async def _gather_or_cancel(*coroutines: Awaitable[Any]) -> list:
+        """
+        Run coroutines concurrently; if one fails, cancel the others
+
+        Unlike asyncio.gather, a failure does not leave the siblings running
+        (and spending LLM quota and stage slots) for a request that has
+        already failed. The first exception is raised once they have stopped.
+        """
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    @staticmethod
+    def _save_results(
+        db: Session,
+        visit_id: str,
+        cleaned_text: str,
+        extracted_data: dict,
+        cleaning_time: str,
+        summary_text: str,
+        key_findings: str,
+        summary_time: str
+    ) -> Tuple[CleanedTextResponse, SummaryResponse]:
+        """
+        Store cleaned text, summary and the completed status in one transaction
+        """
+        try:
+            cleaned = DatabaseService.create_cleaned_text(
+                db=db,
+                visit_id=visit_id,
+                cleaned_text=cleaned_text,
+                extracted_data=extracted_data,
+                processing_time=cleaning_time,
+                commit=False
+            )
+            summary = DatabaseService.create_summary(
+                db=db,
+                visit_id=visit_id,
+                summary_text=summary_text,
+                key_findings=key_findings,
+                processing_time=summary_time,
+                commit=False
+            )
+            DatabaseService.update_visit_status(db, visit_id, "completed", commit=False)
+            response = (CleanedTextResponse.model_validate(cleaned), SummaryResponse.model_validate(summary))
+            db.commit()
+            return response
+        except Exception:
+            db.rollback()
+            raise
+
+
+class SummaryStream:
+    """
+    Summary of a visit generated and delivered piece by piece
+
+    Iterating yields ("token", text) for each piece of the summary as the
+    LLM writes it, then ("summary", SummaryResponse) once the summary and
+    its key findings are stored. Failures are raised as PipelineError.
+
+    close() must be called whether or not the stream was iterated to the
+    end: it stops the upstream request of a stream cut short (e.g. the
+    client went away), releases the summarize slot and, if no summary was
+    stored, sets the visit back to cleaning_completed (summary_failed after
+    an error).
+    """
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        visit_id: str,
+        cleaned_text: str,
+        exit_stack: AsyncExitStack,
+        session_factory=SessionLocal
+    ):
+        """
+        Args:
+            llm_service: Service that writes the summary
+            visit_id: Visit ID
+            cleaned_text: Text to summarise
+            exit_stack: Holds the summarize slot until close()
+            session_factory: Creates the session the results are stored
+                with (the request's session may be gone by the time the
+                stream ends)
+        """
+        self.llm_service = llm_service
+        self.visit_id = visit_id
+        self.cleaned_text = cleaned_text
+        self.session_factory = session_factory
+        self.saved = False
+        self.failed = False
+        self._exit_stack = exit_stack
+        self._events: Optional[AsyncIterator[Tuple[str, Any]]] = None
+        self._closed = False
+
+    def __aiter__(self) -> AsyncIterator[Tuple[str, Any]]:
+        if self._events is None:
+            self._events = self._generate()
+        return self._events
+
+    async def _generate(self) -> AsyncIterator[Tuple[str, Any]]:
+        start_time = time.time()
+        pieces = []
+        try:
+            async with aclosing(self.llm_service.astream_medical_summary(self.cleaned_text)) as summary:
+                async for piece in summary:
+                    pieces.append(piece)
+                    yield "token", piece
+
+            summary_text = "".join(pieces).strip()
+            key_findings = await self.llm_service.aextract_key_findings(summary_text)
+            processing_time = f"{time.time() - start_time:.2f}s"
+            response = await run_in_threadpool(self._save, summary_text, key_findings, processing_time)
+        except Exception as e:
+            self.failed = True
+            logger.error(f"Error streaming summary of visit {self.visit_id}: {str(e)}")
+            if isinstance(e, PromptTooLong):
+                raise PipelineError.too_long(e)
+            raise PipelineError(500, f"Error generating summary: {str(e)}")
+
+        self.saved = True
+        yield "summary", response
+
+    def _save(self, summary_text: str, key_findings: str, processing_time: str) -> SummaryResponse:
+        db = self.session_factory()
+        try:
+            return PipelineService._save_summary(db, self.visit_id, summary_text, key_findings, processing_time)
+        finally:
+            db.close()
+
+    def _reset_status(self) -> None:
+        db = self.session_factory()
+        try:
+            status = "summary_failed" if self.failed else "cleaning_completed"
+            DatabaseService.update_visit_status(db, self.visit_id, status)
+        finally:
+            db.close()
+
+    async def close(self) -> None:
+        """
+        Stop generating if still running, release the slot and tidy up the
+        visit status (safe to call more than once)
+        """
+        if self._closed:
+            return
+        try:
+            if self._events is not None:
+                await self._events.aclose()
+        finally:
+            await self._exit_stack.aclose()
+            if not self.saved:
+                if not self.failed:
+                    logger.info(f"Summary stream of visit {self.visit_id} ended before completion")
+                await run_in_threadpool(self._reset_status)
+        self._closed = True
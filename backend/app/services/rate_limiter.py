@@ -0,0 +1,128 @@
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Capacity refilled at a steady rate, up to a per-minute limit
+
+    Starts full, so a burst of up to one minute's allowance goes through at
+    once and later requests are spaced out at the refill rate.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0  # units per second
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if it already is)"""
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+
+class RateLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute limits
+
+    One limiter is shared by every LLM call of the process, so bursts (many
+    chunks, many visits at once) are spread out to stay within the
+    provider's quota instead of being answered with 429s.
+
+    A request takes one request unit and its estimated tokens (prompt plus
+    max_tokens, as the provider counts them) when it is sent.
+
+    Limits are per process; with several API processes, divide the
+    provider's quota between them.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        """
+        Args:
+            requests_per_minute: Requests allowed per minute (0 for no limit)
+            tokens_per_minute: Tokens allowed per minute (0 for no limit)
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.acquired = 0
+        self.delayed = 0
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Take capacity for a request if both buckets have it
+
+        Returns:
+            0 if the capacity was taken, otherwise seconds to wait before
+            trying again
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.tokens is not None:
+                # A request larger than the whole allowance waits for a full bucket
+                tokens = min(tokens, self.tokens.capacity)
+            wait = max(
+                self.requests.wait_time(1, now) if self.requests is not None else 0.0,
+                self.tokens.wait_time(tokens, now) if self.tokens is not None else 0.0
+            )
+            if wait > 0:
+                return wait
+
+            if self.requests is not None:
+                self.requests.available -= 1
+            if self.tokens is not None:
+                self.tokens.available -= tokens
+            self.acquired += 1
+            return 0.0
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Wait until a request of this many tokens may be sent
+
+        Args:
+            tokens: Estimated tokens of the request
+        """
+        started = None
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0:
+                break
+            started = started or time.monotonic()
+            await asyncio.sleep(wait)
+        self._record_wait(started)
+
+    def _record_wait(self, started: Optional[float]) -> None:
+        if started is None:
+            return
+        with self._lock:
+            self.delayed += 1
+            self.waited_seconds += time.monotonic() - started
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Limits, current allowance and how often requests had to wait
+        """
+        with self._lock:
+            now = time.monotonic()
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.wait_time(0, now)
+            return {
+                "requests_per_minute": int(self.requests.capacity) if self.requests is not None else None,
+                "tokens_per_minute": int(self.tokens.capacity) if self.tokens is not None else None,
+                "requests_available": int(self.requests.available) if self.requests is not None else None,
+                "tokens_available": int(self.tokens.available) if self.tokens is not None else None,
+                "acquired": self.acquired,
+                "delayed": self.delayed,
+                "waited_seconds": round(self.waited_seconds, 3)
+            }
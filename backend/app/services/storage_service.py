@@ -0,0 +1,505 @@
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of the file types we accept
+MAGIC_NUMBERS = (
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+)
+
+# Allowance for the multipart boundaries, part headers and small form fields
+# around the file when judging a request by its Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+MAX_FORM_FIELD_SIZE = 1024
+MAX_FORM_FILES = 1000  # file parts accepted in one bulk upload
+
+
+class FileTooLargeError(Exception):
+    """The upload exceeded the size limit"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"File is larger than {max_size} bytes")
+
+
+class RequestTooLargeError(FileTooLargeError):
+    """The request body exceeded the size limit for the whole upload"""
+
+    def __init__(self, max_size: int):
+        Exception.__init__(self, f"Request is larger than {max_size} bytes")
+        self.max_size = max_size
+
+
+class UnsupportedFileTypeError(Exception):
+    """The upload's content is not a PDF or a supported image"""
+
+    def __init__(self):
+        super().__init__("File content is not a PDF, JPEG or PNG")
+
+
+class MalformedUploadError(Exception):
+    """The request body is not a multipart form carrying the file"""
+
+
+@dataclass
+class StagedFile:
+    """An upload written to a temporary file, not yet in its final place"""
+    temp_path: str
+    size: int
+    content_hash: str  # sha256 hex digest
+    file_type: str  # detected from the content: pdf, jpg or png
+
+
+@dataclass
+class StagedForm:
+    """A multipart upload whose file has been staged"""
+    filename: str
+    staged: StagedFile
+    fields: Dict[str, str] = field(default_factory=dict)  # the form's text fields
+
+
+@dataclass
+class StagedPart:
+    """A file part of a bulk upload: staged, rejected, or not read (staged and error both None)"""
+    filename: str
+    staged: Optional[StagedFile] = None
+    error: Optional[Exception] = None  # FileTooLargeError or UnsupportedFileTypeError
+
+
+class _Staging:
+    """A temporary file being written, with its running size, hash and leading bytes"""
+
+    def __init__(self, temp_path: str, max_size: int, file_type: Optional[str] = None):
+        self.temp_path = temp_path
+        self.max_size = max_size
+        self.file_type = file_type  # recorded as is instead of detected from the content
+        self.size = 0
+        self.head = b""
+        self.content_hash = hashlib.sha256()
+        self.target = open(temp_path, "wb")
+
+    def take(self, chunk: bytes) -> None:
+        """Account for a chunk, raising FileTooLargeError before anything is written past the limit"""
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise FileTooLargeError(self.max_size)
+        if len(self.head) < 16:
+            self.head += chunk[:16 - len(self.head)]
+        self.content_hash.update(chunk)
+
+    def write(self, chunk: bytes) -> None:
+        self.take(chunk)
+        self.target.write(chunk)
+
+    def finish(self) -> StagedFile:
+        self.target.close()
+        file_type = self.file_type or StorageService.detect_type(self.head)
+        if file_type is None:
+            raise UnsupportedFileTypeError()
+        return StagedFile(self.temp_path, self.size, self.content_hash.hexdigest(), file_type)
+
+    def abort(self) -> None:
+        self.target.close()
+        StorageService._remove(self.temp_path)
+
+
+class _FormReader:
+    """
+    MultipartParser callbacks that collect a form's text fields and stage
+    its file parts
+
+    Each chunk of a file part is counted against the part's size limit as
+    it is parsed and queued in pending. The caller writes the queue out
+    between parser calls, off the event loop, and finishes the parts in
+    ended. With skip_rejected, a part that is too large (or, once
+    finished, not a supported type) is dropped with its error and reading
+    carries on; otherwise the error ends the upload.
+    """
+
+    def __init__(
+        self,
+        file_field: str,
+        max_files: int,
+        open_file: Callable[[str], Optional[_Staging]],
+        skip_rejected: bool
+    ):
+        """
+        Args:
+            file_field: Name of the form field carrying files
+            max_files: Most file parts accepted
+            open_file: Returns the staging file for a part's filename, or
+                None to drop the part's data
+            skip_rejected: Drop rejected parts instead of raising
+        """
+        self.file_field = file_field
+        self.max_files = max_files
+        self.open_file = open_file
+        self.skip_rejected = skip_rejected
+        self.fields: Dict[str, str] = {}
+        self.parts: List[StagedPart] = []
+        self.pending: List[Tuple[_Staging, bytes]] = []
+        self.pending_size = 0
+        self.ended: List[Tuple[StagedPart, _Staging]] = []
+        self._stagings: List[_Staging] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name = ""
+        self._data = bytearray()
+        self._part: Optional[StagedPart] = None
+        self._staging: Optional[_Staging] = None
+
+    def callbacks(self) -> Dict[str, Callable]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers, self._name, self._data = {}, "", bytearray()
+        self._part, self._staging = None, None
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field, self._header_value = b"", b""
+
+    def on_headers_finished(self) -> None:
+        _, disposition = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        if self._name != self.file_field:
+            return
+        if len(self.parts) >= self.max_files:
+            raise MalformedUploadError(f"More than {self.max_files} files in one request")
+        self._part = StagedPart(disposition.get(b"filename", b"").decode("utf-8", "replace"))
+        self.parts.append(self._part)
+        self._staging = self.open_file(self._part.filename)
+        if self._staging is not None:
+            self._stagings.append(self._staging)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        chunk = data[start:end]
+        if self._part is None:
+            if len(self._data) + len(chunk) <= MAX_FORM_FIELD_SIZE:
+                self._data += chunk
+            return
+        if self._staging is None:
+            return
+        try:
+            self._staging.take(chunk)
+        except FileTooLargeError as e:
+            if not self.skip_rejected:
+                raise
+            self._reject(self._part, self._staging, e)
+            self._staging = None
+            return
+        self.pending.append((self._staging, chunk))
+        self.pending_size += len(chunk)
+
+    def on_part_end(self) -> None:
+        if self._part is None:
+            if self._name:
+                self.fields[self._name] = self._data.decode("utf-8", "replace")
+        elif self._staging is not None:
+            self.ended.append((self._part, self._staging))
+        self._part, self._staging = None, None
+
+    def write_pending(self) -> None:
+        """Write the queued chunks and finish the ended parts (runs in a worker thread)"""
+        pending, self.pending, self.pending_size = self.pending, [], 0
+        ended, self.ended = self.ended, []
+        for staging, chunk in pending:
+            staging.target.write(chunk)
+        for part, staging in ended:
+            try:
+                part.staged = staging.finish()
+            except UnsupportedFileTypeError as e:
+                if not self.skip_rejected:
+                    raise
+                self._reject(part, staging, e)
+
+    def _reject(self, part: StagedPart, staging: _Staging, error: Exception) -> None:
+        part.error = error
+        self.pending = [(target, chunk) for target, chunk in self.pending if target is not staging]
+        self.pending_size = sum(len(chunk) for _, chunk in self.pending)
+        staging.abort()
+
+    def abort(self) -> None:
+        """Remove every file staged so far"""
+        for staging in self._stagings:
+            staging.abort()
+
+
+class StorageService:
+    """
+    Streams uploads to disk
+
+    An upload is copied in fixed-size chunks into a temporary file inside the
+    upload directory. The same pass computes its SHA-256 and detects its type
+    from the leading bytes, and stops as soon as the size limit is exceeded.
+    The temporary file is then renamed into place, so a stored path never
+    points at a partially written file.
+
+    stage_form and stage_files parse a multipart request body as it
+    arrives, so an upload is never spooled anywhere before its size is
+    checked.
+    """
+
+    def __init__(
+        self,
+        upload_dir: Optional[str] = None,
+        max_size: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        max_request_size: Optional[int] = None
+    ):
+        """
+        Args:
+            upload_dir: Storage root (defaults to settings.UPLOAD_DIR)
+            max_size: Largest accepted file in bytes (defaults to settings.MAX_FILE_SIZE)
+            chunk_size: Bytes read and written at a time (defaults to settings.UPLOAD_CHUNK_SIZE)
+            max_request_size: Largest accepted bulk upload request in bytes
+                (defaults to settings.BULK_UPLOAD_MAX_SIZE)
+        """
+        self.upload_dir = upload_dir or settings.UPLOAD_DIR
+        self.max_size = max_size or settings.MAX_FILE_SIZE
+        self.chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        self.max_request_size = max_request_size or settings.BULK_UPLOAD_MAX_SIZE
+        self.temp_dir = os.path.join(self.upload_dir, ".incoming")
+
+    def stage(self, source: BinaryIO) -> StagedFile:
+        """
+        Copy an upload to a temporary file
+
+        Args:
+            source: Readable binary file object
+
+        Returns:
+            The staged file
+
+        Raises:
+            FileTooLargeError: More than max_size bytes were read
+            UnsupportedFileTypeError: The content is not a PDF, JPEG or PNG
+        """
+        staging = self._begin()
+        try:
+            while True:
+                chunk = source.read(self.chunk_size)
+                if not chunk:
+                    break
+                staging.write(chunk)
+            return staging.finish()
+        except BaseException:
+            staging.abort()
+            raise
+
+    def check_content_length(self, content_length: Optional[str], max_request_size: Optional[int] = None) -> None:
+        """
+        Reject a multipart request whose declared length exceeds its limit
+
+        Args:
+            content_length: Content-Length header of the request
+            max_request_size: Limit for the whole body (defaults to max_size
+                plus the multipart overhead, i.e. one file)
+
+        Raises:
+            FileTooLargeError: Content-Length exceeds the limit of a single file upload
+            RequestTooLargeError: Content-Length exceeds max_request_size
+        """
+        if not content_length or not content_length.isdigit():
+            return
+        if max_request_size is not None:
+            if int(content_length) > max_request_size:
+                raise RequestTooLargeError(max_request_size)
+        elif int(content_length) > self.max_size + MULTIPART_OVERHEAD:
+            raise FileTooLargeError(self.max_size)
+
+    async def stage_form(self, content_type: str, body: AsyncIterator[bytes], file_field: str = "file") -> StagedForm:
+        """
+        Stream the file of a multipart/form-data request body to a temporary file
+
+        The body is parsed chunk by chunk as it is received. Reading stops
+        as soon as the file exceeds max_size, so an oversized upload is
+        neither received in full nor written to disk. Disk writes of
+        chunk_size are done in a worker thread.
+
+        Args:
+            content_type: Content-Type header of the request
+            body: The request body (e.g. Request.stream())
+            file_field: Name of the form field carrying the file
+
+        Returns:
+            The staged file, its filename and the form's text fields
+
+        Raises:
+            FileTooLargeError: The file exceeded max_size (RequestTooLargeError
+                if the body as a whole exceeded it plus the multipart overhead)
+            UnsupportedFileTypeError: The content is not a PDF, JPEG or PNG
+            MalformedUploadError: The body is not a multipart form with the file
+        """
+        reader = _FormReader(file_field, 1, lambda filename: self._begin(), skip_rejected=False)
+        await self._read_form(content_type, body, reader)
+
+        if not reader.parts:
+            raise MalformedUploadError(f"The form has no {file_field} field")
+        part = reader.parts[0]
+        return StagedForm(part.filename, part.staged, reader.fields)
+
+    async def stage_files(self, content_type: str, body: AsyncIterator[bytes], file_field: str = "files") -> List[StagedPart]:
+        """
+        Stream every file of a bulk multipart/form-data request body to its own temporary file
+
+        Like stage_form, the body is parsed as it is received. Documents
+        are held to max_size each; a document that exceeds it, or turns out
+        not to be a PDF, JPEG or PNG, is dropped with its error while the
+        rest of the body is read. Zip archives are staged as they are for
+        the caller to expand. The whole body is held to max_request_size.
+
+        Args:
+            content_type: Content-Type header of the request
+            body: The request body (e.g. Request.stream())
+            file_field: Name of the form field carrying the files
+
+        Returns:
+            A part per file, in upload order. Parts whose extension is
+            neither a document type nor .zip are not read (staged and
+            error are None); the caller reports them from their name.
+            The caller must discard the staged files it does not store.
+
+        Raises:
+            RequestTooLargeError: The body exceeded max_request_size
+            MalformedUploadError: The body is not a multipart form, or has
+                more than MAX_FORM_FILES files
+        """
+        def open_file(filename: str) -> Optional[_Staging]:
+            file_ext = os.path.splitext(filename.strip())[1].lower()
+            if file_ext == ".zip":
+                return self._begin(self.max_request_size, "zip")
+            if file_ext in settings.ALLOWED_EXTENSIONS:
+                return self._begin()
+            return None
+
+        reader = _FormReader(file_field, MAX_FORM_FILES, open_file, skip_rejected=True)
+        await self._read_form(content_type, body, reader, self.max_request_size)
+        return reader.parts
+
+    async def _read_form(
+        self,
+        content_type: str,
+        body: AsyncIterator[bytes],
+        reader: _FormReader,
+        max_request_size: Optional[int] = None
+    ) -> None:
+        """
+        Feed a multipart body to the reader as it arrives, writing its files out in a worker thread
+
+        Every file staged is removed again if reading fails.
+
+        Raises:
+            RequestTooLargeError: The body exceeded max_request_size
+                (defaults to max_size plus the multipart overhead)
+            MalformedUploadError: The body is not a multipart form
+        """
+        mime_type, options = parse_options_header(content_type)
+        boundary = options.get(b"boundary")
+        if mime_type != b"multipart/form-data" or not boundary:
+            raise MalformedUploadError("Expected a multipart/form-data body")
+        if max_request_size is None:
+            max_request_size = self.max_size + MULTIPART_OVERHEAD
+
+        parser = MultipartParser(boundary, reader.callbacks())
+        received = 0
+        try:
+            async for chunk in body:
+                received += len(chunk)
+                if received > max_request_size:
+                    raise RequestTooLargeError(max_request_size)
+                try:
+                    parser.write(chunk)
+                except (FileTooLargeError, MalformedUploadError):
+                    raise
+                except Exception as e:
+                    raise MalformedUploadError(f"Malformed multipart body: {str(e)}") from e
+                if reader.pending_size >= self.chunk_size or reader.ended:
+                    await asyncio.to_thread(reader.write_pending)
+            parser.finalize()
+            await asyncio.to_thread(reader.write_pending)
+        except BaseException:
+            reader.abort()
+            raise
+
+    def store(self, staged: StagedFile, directory: str, filename: str) -> str:
+        """
+        Move a staged file into place
+
+        Args:
+            staged: File returned by stage
+            directory: Folder under the storage root (e.g. the visit ID)
+            filename: Name to store the file under
+
+        Returns:
+            Path of the stored file
+        """
+        target_dir = os.path.join(self.upload_dir, directory)
+        os.makedirs(target_dir, exist_ok=True)
+        file_path = os.path.join(target_dir, filename)
+        os.replace(staged.temp_path, file_path)
+        return file_path
+
+    def _begin(self, max_size: Optional[int] = None, file_type: Optional[str] = None) -> _Staging:
+        """Open a new temporary file in the incoming folder (limited to max_size unless given)"""
+        os.makedirs(self.temp_dir, exist_ok=True)
+        return _Staging(
+            os.path.join(self.temp_dir, f"{uuid.uuid4().hex}.part"),
+            max_size or self.max_size,
+            file_type
+        )
+
+    def discard(self, staged: StagedFile) -> None:
+        """Delete a staged file that will not be stored"""
+        self._remove(staged.temp_path)
+
+    def delete(self, file_path: str) -> None:
+        """Delete a stored file whose records could not be saved"""
+        self._remove(file_path)
+
+    @staticmethod
+    def detect_type(head: bytes) -> Optional[str]:
+        """
+        Detect the file type from its first bytes
+
+        Returns:
+            pdf, jpg or png, or None if the content is none of them
+        """
+        for magic, file_type in MAGIC_NUMBERS:
+            if head.startswith(magic):
+                return file_type
+        return None
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
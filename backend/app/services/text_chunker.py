@@ -0,0 +1,97 @@
+import re
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Headers OCRService puts in front of each page and each document
+SECTION_MARKER = re.compile(r"^(?:--- Page \d+ ---|=== Document \d+: .* ===)$", re.MULTILINE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class TextChunker:
+    """
+    Splits long OCR or cleaned text into chunks that fit one LLM request
+
+    Text is cut at page and document headers first, then at paragraphs,
+    then at sentence ends; only a single sentence longer than a chunk is cut
+    at a space. Consecutive pieces are packed together up to max_chars, so
+    short pages share a chunk. Joining the chunks with blank lines gives the
+    original text back, apart from whitespace at the cuts.
+    """
+
+    def __init__(self, max_chars: int):
+        """
+        Args:
+            max_chars: Longest chunk, in characters
+        """
+        self.max_chars = max_chars
+
+    def split(self, text: str) -> List[str]:
+        """
+        Split text into chunks of at most max_chars, in order
+
+        Args:
+            text: Text to split
+
+        Returns:
+            Chunks (a single one if the text already fits)
+        """
+        text = text.strip()
+        if len(text) <= self.max_chars:
+            return [text] if text else []
+
+        pieces = []
+        for section in self._sections(text):
+            pieces.extend(self._fit(section))
+        chunks = self._pack(pieces)
+        logger.info(f"Split {len(text)} chars into {len(chunks)} chunks")
+        return chunks
+
+    @staticmethod
+    def _sections(text: str) -> List[str]:
+        """Cut text in front of each page or document header"""
+        starts = [match.start() for match in SECTION_MARKER.finditer(text)]
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        bounds = starts + [len(text)]
+        return [
+            text[start:end].strip()
+            for start, end in zip(bounds, bounds[1:])
+            if text[start:end].strip()
+        ]
+
+    def _fit(self, section: str) -> List[str]:
+        """Break a section that is too long at paragraphs, sentences, then spaces"""
+        if len(section) <= self.max_chars:
+            return [section]
+
+        pieces = []
+        for paragraph in re.split(r"\n\s*\n", section):
+            if len(paragraph) <= self.max_chars:
+                pieces.append(paragraph)
+                continue
+            for sentence in SENTENCE_END.split(paragraph):
+                while len(sentence) > self.max_chars:
+                    cut = sentence.rfind(" ", 0, self.max_chars)
+                    if cut <= 0:
+                        cut = self.max_chars
+                    pieces.append(sentence[:cut])
+                    sentence = sentence[cut:].lstrip()
+                pieces.append(sentence)
+        return [piece.strip() for piece in pieces if piece.strip()]
+
+    def _pack(self, pieces: List[str]) -> List[str]:
+        """Join consecutive pieces into chunks of at most max_chars"""
+        chunks = []
+        current = ""
+        for piece in pieces:
+            candidate = f"{current}\n\n{piece}" if current else piece
+            if len(candidate) <= self.max_chars:
+                current = candidate
+            else:
+                chunks.append(current)
+                current = piece
+        if current:
+            chunks.append(current)
+        return chunks
@@ -0,0 +1,253 @@
+import re
+import math
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional; token counts are then estimated from length
+    tiktoken = None
+
+from .text_chunker import SECTION_MARKER
+
+logger = logging.getLogger(__name__)
+
+# Reply size by method: max_tokens = min(cap, input tokens * ratio + extra),
+# where input tokens are those of the text the request is about. Cleaning
+# returns about as much text as it gets; the other replies are shorter.
+OUTPUT_RATIOS = {
+    "clean": (1.2, 64),
+    "fused": (1.2, 1280),
+    "extract": (0.5, 256),
+    "summary": (0.5, 128),
+    "summary_part": (0.5, 64),
+    "summary_merge": (0.5, 128),
+    "findings": (0.5, 64),
+}
+MIN_OUTPUT_TOKENS = 64
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators of each chat message
+
+
+class PromptTooLong(ValueError):
+    """A request would not fit the model's context window"""
+
+    def __init__(self, method: str, prompt_tokens: int, context_tokens: int):
+        super().__init__(
+            f"{method} prompt of {prompt_tokens} tokens leaves no room for a reply "
+            f"in a {context_tokens} token context"
+        )
+        self.prompt_tokens = prompt_tokens
+        self.context_tokens = context_tokens
+
+
+def compact_ocr_text(text: str) -> str:
+    """
+    Remove what costs tokens in OCR text without carrying information
+
+    - Runs of spaces and tabs become one space; blank line runs become one
+    - Lines without a letter or digit (rules, stray "|", "~", "...") are
+      dropped; a single letter or digit is kept, as it can be a value
+      ("M", "F", "2") split from its label
+    - With three or more pages, header and footer lines that repeat on at
+      least half of the pages (page numbers aside) are kept only on the
+      first page they appear on
+
+    Page and document headers written by OCRService are kept.
+
+    Args:
+        text: Raw OCR text
+
+    Returns:
+        Compacted text
+    """
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"[ \t\u00a0\u2000-\u200b\u3000]+", " ", line).strip()
+        if line and not any(char.isalnum() for char in line):
+            continue
+        lines.append(line)
+
+    lines = _drop_repeated_margins(lines)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _drop_repeated_margins(lines: List[str]) -> List[str]:
+    """Drop header/footer lines that repeat across pages, keeping the first"""
+    pages = [[]]
+    for line in lines:
+        if SECTION_MARKER.match(line):
+            pages.append([])
+        pages[-1].append(line)
+    pages = [page for page in pages if page]
+    if len(pages) < 3:
+        return lines
+
+    def margins(page: List[str]) -> List[str]:
+        content = [line for line in page if line and not SECTION_MARKER.match(line)]
+        return content[:2] + content[-2:]
+
+    def shape(line: str) -> str:
+        return re.sub(r"\d+", "#", line.lower())
+
+    seen_on = Counter()
+    for page in pages:
+        seen_on.update({shape(line) for line in margins(page)})
+    repeated = {key for key, count in seen_on.items() if count >= max(3, len(pages) / 2)}
+    if not repeated:
+        return lines
+
+    kept = []
+    first_seen = set()
+    for page in pages:
+        edge = set(margins(page))
+        for line in page:
+            key = shape(line)
+            if line in edge and key in repeated:
+                if key in first_seen:
+                    continue
+                first_seen.add(key)
+            kept.append(line)
+    return kept
+
+
+class TokenBudget:
+    """
+    Token counts, reply sizing and per-method token statistics for LLM calls
+
+    Counts use tiktoken's cl100k_base encoding when tiktoken is installed (an
+    approximation for Llama models, which is enough for budgeting) and about
+    four characters per token otherwise.
+    """
+
+    def __init__(self, context_tokens: int, encoding: str = "cl100k_base"):
+        """
+        Args:
+            context_tokens: Model context window, prompt plus reply
+            encoding: tiktoken encoding used for counting
+        """
+        self.context_tokens = context_tokens
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding)
+            except Exception as e:
+                logger.warning(f"Could not load tiktoken encoding {encoding}, estimating tokens: {str(e)}")
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def counter(self) -> str:
+        return "tiktoken" if self._encoding is not None else "chars/4"
+
+    def count(self, text: str) -> int:
+        """Tokens in a text"""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / 4)
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """Prompt tokens of a list of chat messages"""
+        return sum(self.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+    def compact(self, method: str, text: str) -> str:
+        """
+        Compact OCR text (see compact_ocr_text), recording the tokens saved
+
+        Args:
+            method: Operation the text is for, for the statistics
+            text: Raw OCR text
+
+        Returns:
+            Compacted text
+        """
+        compacted = compact_ocr_text(text)
+        saved = self.count(text) - self.count(compacted)
+        with self._lock:
+            self._method_stats(method)["compaction_tokens_saved"] += max(saved, 0)
+        return compacted
+
+    def size(
+        self,
+        method: str,
+        request: Dict[str, Any],
+        text: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], int]:
+        """
+        Size a request's max_tokens to its input and check it fits the context
+
+        Args:
+            method: One of OUTPUT_RATIOS
+            request: messages, temperature and max_tokens, the latter being
+                the upper bound for the reply
+            text: The text the request is about, which the reply size scales
+                with (the whole prompt if omitted)
+
+        Returns:
+            (the request with max_tokens set, prompt tokens)
+
+        Raises:
+            PromptTooLong: Prompt plus the smallest reply exceed the context
+        """
+        prompt_tokens = self.count_messages(request["messages"])
+        available = self.context_tokens - prompt_tokens
+        if available < MIN_OUTPUT_TOKENS:
+            raise PromptTooLong(method, prompt_tokens, self.context_tokens)
+
+        ratio, extra = OUTPUT_RATIOS.get(method, (1.0, 0))
+        input_tokens = self.count(text) if text is not None else prompt_tokens
+        max_tokens = min(
+            request["max_tokens"],
+            available,
+            max(MIN_OUTPUT_TOKENS, math.ceil(input_tokens * ratio) + extra)
+        )
+        return {**request, "max_tokens": max_tokens}, prompt_tokens
+
+    def fit(self, method: str, request: Dict[str, Any], text: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Size a request (see size) and record its tokens in the statistics
+
+        Returns:
+            The request with max_tokens set
+
+        Raises:
+            PromptTooLong: Prompt plus the smallest reply exceed the context
+        """
+        sized, prompt_tokens = self.size(method, request, text)
+        cap = request["max_tokens"]
+        max_tokens = sized["max_tokens"]
+
+        with self._lock:
+            stats = self._method_stats(method)
+            stats["calls"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["max_tokens"] += max_tokens
+            stats["max_tokens_saved"] += cap - max_tokens
+
+        return sized
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Prompt tokens, reply budgets and tokens saved, overall and by method
+        """
+        with self._lock:
+            methods = {method: dict(stats) for method, stats in self._stats.items()}
+
+        names = ("calls", "prompt_tokens", "max_tokens", "max_tokens_saved", "compaction_tokens_saved")
+        return {
+            "counter": self.counter,
+            "context_tokens": self.context_tokens,
+            **{name: sum(stats[name] for stats in methods.values()) for name in names},
+            "methods": methods
+        }
+
+    def _method_stats(self, method: str) -> Dict[str, int]:
+        """Counters of a method (lock held)"""
+        return self._stats.setdefault(method, {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "max_tokens": 0,
+            "max_tokens_saved": 0,
+            "compaction_tokens_saved": 0
+        })
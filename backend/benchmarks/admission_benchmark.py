@@ -0,0 +1,135 @@
+"""
+Latency of OCR requests under overload, with and without admission control.
+
+Usage (from the backend directory):
+    DATABASE_URL=sqlite:///admission_bench.db python -m benchmarks.admission_benchmark --requests 32
+    python -m benchmarks.admission_benchmark --requests 32 --simulate 0.5   # CPU-bound stand-in for OCR
+
+The app runs in-process. A burst of OCR requests is sent at once, first with
+limits high enough to admit everything and then with the configured OCR
+stage limits. Without limits every request shares the CPU, so all of them
+slow down together; with limits, admitted requests wait at most for the
+bounded queue ahead of them and the rest are turned away at once with 429
+and a Retry-After.
+
+--simulate replaces PaddleOCR with a pure-Python busy loop of about the
+given number of seconds per document, which contends for the CPU the same
+way without needing the OCR models.
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fixtures import make_scanned_pdf
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def summarize(latencies: list) -> str:
+    latencies = sorted(latencies)
+    if not latencies:
+        return "no samples"
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[math.ceil(len(latencies) * 0.95) - 1]
+    return f"p50={p50:6.2f}s  p95={p95:6.2f}s  max={latencies[-1]:6.2f}s"
+
+
+async def burst(client: httpx.AsyncClient, visit_ids: list) -> tuple:
+    async def one(visit_id: str):
+        start = time.perf_counter()
+        response = await client.post(f"/ocr/{visit_id}")
+        return response, time.perf_counter() - start
+
+    results = await asyncio.gather(*(one(visit_id) for visit_id in visit_ids))
+    ok = [seconds for response, seconds in results if response.status_code == 200]
+    rejected = [seconds for response, seconds in results if response.status_code == 429]
+    return ok, rejected
+
+
+async def run(args) -> None:
+    os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="admission_bench_"))
+    os.environ.setdefault("OCR_CACHE_ENABLED", "false")
+
+    import main
+    from app.core.config import settings
+    from app.services.admission_service import AdmissionService
+    from app.services.container import ServiceContainer
+    from app.services.ocr_service import OCRService
+
+    class SimulatedOCRService(OCRService):
+        """OCRService whose extraction is a busy loop"""
+
+        def extract_documents(self, documents: list) -> list:
+            results = []
+            for _ in documents:
+                busy(args.simulate)
+                results.append(("simulated text", 0.9, [], args.simulate))
+            return results
+
+    services = ServiceContainer(
+        ocr_service=SimulatedOCRService() if args.simulate else None,
+        job_workers=0
+    )
+    app = main.create_app(services)
+
+    workdir = tempfile.mkdtemp(prefix="admission_bench_")
+    base_page = random.randint(1_000, 1_000_000)
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=3600) as client:
+        async def upload_visits() -> list:
+            nonlocal base_page
+            visit_ids = []
+            for _ in range(args.requests):
+                path = make_scanned_pdf(os.path.join(workdir, f"scan_{base_page}.pdf"), 1, first_page=base_page)
+                base_page += 1
+                with open(path, "rb") as f:
+                    response = await client.post("/upload/", files={"file": (os.path.basename(path), f, "application/pdf")})
+                response.raise_for_status()
+                visit_ids.append(response.json()["visit_id"])
+            return visit_ids
+
+        configs = (
+            ("no limits", AdmissionService({"ocr": (args.requests, args.requests)})),
+            (
+                f"limit {settings.OCR_STAGE_CONCURRENCY} + queue {settings.OCR_STAGE_QUEUE}",
+                AdmissionService({"ocr": (settings.OCR_STAGE_CONCURRENCY, settings.OCR_STAGE_QUEUE)})
+            ),
+        )
+        results = {}
+        for name, admission_service in configs:
+            services.pipeline_service.admission_service = admission_service
+            visit_ids = await upload_visits()
+            start = time.perf_counter()
+            results[name] = await burst(client, visit_ids) + (time.perf_counter() - start,)
+
+    print(f"{args.requests} concurrent OCR requests\n")
+    for name, (ok, rejected, seconds) in results.items():
+        print(f"{name:<22} ok={len(ok):<4} 429={len(rejected):<4} burst={seconds:6.2f}s")
+        print(f"{'':<22} ok latency       {summarize(ok)}")
+        if rejected:
+            print(f"{'':<22} 429 latency      {summarize(rejected)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32, help="OCR requests sent at once")
+    parser.add_argument("--simulate", type=float, default=0.0, help="seconds of CPU work per document instead of OCR")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
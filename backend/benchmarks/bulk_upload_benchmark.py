@@ -0,0 +1,102 @@
+"""
+Ingesting many documents: one POST /upload/ per document versus a single
+POST /upload/bulk carrying them as a zip archive.
+
+Usage (from the backend directory):
+    DATABASE_URL=sqlite:///bulk_bench.db python -m benchmarks.bulk_upload_benchmark --documents 2000
+
+The app runs in-process, so the numbers leave out the network but include
+multipart parsing, file writes and the database. SQL statements and commits
+are counted with SQLAlchemy engine events. The documents are small
+synthetic PDFs; uploaded files are written under a temporary UPLOAD_DIR.
+"""
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+import zipfile
+
+import httpx
+from sqlalchemy import event
+
+
+class Counter:
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+
+def make_document(i: int, size: int) -> bytes:
+    header = f"%PDF-1.4\n% synthetic document {i}\n".encode()
+    return header + b"0" * max(size - len(header), 0)
+
+
+async def single_uploads(client: httpx.AsyncClient, documents: list) -> int:
+    for name, content in documents:
+        response = await client.post("/upload/", files={"file": (name, content, "application/pdf")})
+        response.raise_for_status()
+    return len(documents)
+
+
+async def bulk_upload(client: httpx.AsyncClient, documents: list) -> int:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as z:
+        for name, content in documents:
+            z.writestr(f"archive/{name[:-4]}/{name}", content)
+
+    response = await client.post(
+        "/upload/bulk", files={"files": ("archive.zip", archive.getvalue(), "application/zip")}
+    )
+    response.raise_for_status()
+    assert response.json()["documents_created"] == len(documents)
+    return 1
+
+
+async def run(args) -> None:
+    os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="bulk_bench_"))
+
+    import main
+    from app.core.database import engine
+    from app.services.container import ServiceContainer
+
+    app = main.create_app(ServiceContainer(job_workers=0))
+
+    counter = Counter()
+    event.listen(engine, "before_cursor_execute", lambda *a: setattr(counter, "statements", counter.statements + 1))
+    event.listen(engine, "commit", lambda *a: setattr(counter, "commits", counter.commits + 1))
+
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=3600) as client:
+        for name, flow in (("POST /upload/ each", single_uploads), ("POST /upload/bulk", bulk_upload)):
+            documents = [(f"scan_{i}.pdf", make_document(i, args.size)) for i in range(args.documents)]
+            counter.reset()
+            start = time.perf_counter()
+            requests = await flow(client, documents)
+            seconds = time.perf_counter() - start
+            results[name] = (requests, counter.statements, counter.commits, seconds)
+
+    print(f"{args.documents} documents of {args.size} bytes\n")
+    print(f"{'flow':<22}{'requests':>10}{'statements':>12}{'commits':>10}{'seconds':>10}{'docs/s':>10}")
+    for name, (requests, statements, commits, seconds) in results.items():
+        print(f"{name:<22}{requests:>10}{statements:>12}{commits:>10}{seconds:>10.2f}{args.documents / seconds:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=20_000, help="bytes per document")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Latency of cheap endpoints (/health, /visits/) while OCR and LLM requests
+are in flight, against a running server.
+
+Usage (from the backend directory, with the API running):
+    python -m benchmarks.event_loop_benchmark --url http://localhost:8000 --ocr 4 --pages 4
+    python -m benchmarks.event_loop_benchmark --ocr 4 --clean   # also run /clean (needs Groq)
+
+The script uploads one synthetic scanned PDF per OCR request (each with
+different content, so the OCR cache does not answer them), then probes the
+cheap endpoints on a fixed interval, first with the server idle and then
+while the OCR (and optionally /clean) requests run. If a handler blocks the
+event loop, the probes stall for as long as it runs.
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fixtures import make_scanned_pdf
+
+PROBES = ("/health", "/visits/")
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> dict:
+    """
+    Request each probe endpoint every interval until stop is set
+
+    Returns:
+        Latencies in seconds by endpoint
+    """
+    latencies = {path: [] for path in PROBES}
+    while not stop.is_set():
+        for path in PROBES:
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies[path].append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def process_visit(client: httpx.AsyncClient, visit_id: str, clean: bool) -> float:
+    """
+    Run OCR (and cleaning) for one visit
+
+    Returns:
+        Wall-clock seconds
+    """
+    start = time.perf_counter()
+    response = await client.post(f"/ocr/{visit_id}")
+    response.raise_for_status()
+    if clean:
+        response = await client.post(f"/clean/{visit_id}")
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def summarize(latencies: list) -> str:
+    latencies = sorted(latencies)
+    if not latencies:
+        return "no samples"
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[math.ceil(len(latencies) * 0.95) - 1] * 1000
+    return f"n={len(latencies):<5} p50={p50:8.1f}ms  p95={p95:8.1f}ms  max={latencies[-1] * 1000:8.1f}ms"
+
+
+async def run(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="event_loop_bench_")
+    base_page = random.randint(1_000, 1_000_000)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=600) as client:
+        # Setup: one freshly uploaded visit per OCR request
+        visit_ids = []
+        for i in range(args.ocr):
+            path = make_scanned_pdf(
+                os.path.join(workdir, f"scan_{i}.pdf"), args.pages, first_page=base_page + i * args.pages
+            )
+            with open(path, "rb") as f:
+                response = await client.post("/upload/", files={"file": (os.path.basename(path), f, "application/pdf")})
+            response.raise_for_status()
+            visit_ids.append(response.json()["visit_id"])
+
+        # Idle baseline
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop, args.interval))
+        await asyncio.sleep(args.baseline)
+        stop.set()
+        idle = await probe_task
+
+        # Under load
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop, args.interval))
+        start = time.perf_counter()
+        durations = await asyncio.gather(*(process_visit(client, visit_id, args.clean) for visit_id in visit_ids))
+        load_time = time.perf_counter() - start
+        stop.set()
+        loaded = await probe_task
+
+    work = "OCR + clean" if args.clean else "OCR"
+    print(f"{args.ocr} concurrent {work} requests, {args.pages} pages each: "
+          f"{load_time:.2f}s total, slowest {max(durations):.2f}s\n")
+    for path in PROBES:
+        print(f"{path:<10} idle  {summarize(idle[path])}")
+        print(f"{'':<10} load  {summarize(loaded[path])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--ocr", type=int, default=4, help="concurrent OCR requests")
+    parser.add_argument("--pages", type=int, default=4, help="pages per uploaded document")
+    parser.add_argument("--clean", action="store_true", help="also run /clean after each OCR request")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between probes")
+    parser.add_argument("--baseline", type=float, default=2.0, help="seconds of idle probing")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
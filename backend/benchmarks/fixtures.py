@@ -0,0 +1,224 @@
+"""
+Synthetic documents and a stand-in LLM shared by the benchmark scripts.
+
+Pages are rendered to images and re-inserted into a fresh PDF so the result
+has no text layer, which forces the OCR path the way a faxed or scanned
+document does.
+"""
+import os
+import json
+import random
+import asyncio
+from typing import Optional
+
+import fitz
+
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_service import LLMService
+
+SAMPLE_LINES = [
+    "Patient Name: John Doe        Age: 54      Gender: Male",
+    "Date of Visit: 12/03/2024     Dept: Internal Medicine",
+    "Chief Complaint: Fever and productive cough for 5 days",
+    "BP 130/85 mmHg   Pulse 92/min   Temp 101.2 F   SpO2 96%",
+    "Diagnosis: Community acquired pneumonia, right lower lobe",
+    "Tab Amoxicillin 500 mg TDS x 7 days",
+    "Tab Paracetamol 650 mg SOS for fever",
+    "Syp Ambroxol 10 ml BD after food",
+    "HbA1c 7.2%   Fasting glucose 142 mg/dL   Creatinine 1.1 mg/dL",
+    "Chest X-ray: patchy consolidation right lower zone",
+    "Advice: plenty of fluids, review after one week",
+    "Dr. A. Kumar, MD (General Medicine)",
+]
+
+
+def page_lines(page_number: int, line_count: int = 30) -> list:
+    """
+    Deterministic pseudo-clinical text for one page
+    """
+    rng = random.Random(page_number)
+    return [f"Discharge Summary - Page {page_number}"] + [rng.choice(SAMPLE_LINES) for _ in range(line_count)]
+
+
+# Page sizes in points
+LETTER = (612, 792)
+A3 = (842, 1191)
+
+
+def make_scanned_pdf(
+    path: str, pages: int, zoom: float = 2.0, page_size: tuple = LETTER, first_page: int = 1
+) -> str:
+    """
+    Write an image-only PDF with the given number of pages
+
+    Args:
+        path: Output file path
+        pages: Number of pages
+        zoom: Render scale used for the page images
+        page_size: (width, height) in points
+        first_page: Page number of the first page; documents with different
+            first pages have different content (and OCR cache keys)
+
+    Returns:
+        The output path
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    scanned = fitz.open()
+
+    for page_number in range(first_page, first_page + pages):
+        source = fitz.open()
+        page = source.new_page(width=page_size[0], height=page_size[1])
+        page.insert_text((50, 60), "\n".join(page_lines(page_number)), fontsize=11)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+        target = scanned.new_page(width=page_size[0], height=page_size[1])
+        target.insert_image(target.rect, stream=pix.tobytes("png"))
+        source.close()
+
+    scanned.save(path, deflate=True)
+    scanned.close()
+    return path
+
+
+def make_image_corpus(directory: str, seed: int = 0) -> list:
+    """
+    Write a small corpus of degraded page images with ground-truth text
+
+    Each image <name>.png is written next to <name>.txt holding the text
+    that was rendered. Variants cover the conditions preprocessing has to
+    deal with: clean renders, sensor noise, low contrast, speckle and blur.
+
+    Args:
+        directory: Output directory
+        seed: Random seed for the degradations
+
+    Returns:
+        List of (image_path, text_path) tuples
+    """
+    import cv2
+    import numpy as np
+
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    variants = {
+        "clean": lambda g: g,
+        "noise_low": lambda g: g + rng.normal(0, 8, g.shape),
+        "noise_high": lambda g: g + rng.normal(0, 20, g.shape),
+        "low_contrast": lambda g: g * 0.35 + 140,
+        "speckle": lambda g: np.where(rng.random(g.shape) < 0.02, rng.choice([0, 255], g.shape), g),
+        "blur": lambda g: cv2.GaussianBlur(g, (5, 5), 1.5),
+    }
+
+    corpus = []
+    for page_number in range(1, 3):
+        lines = page_lines(page_number, line_count=15)
+        source = fitz.open()
+        page = source.new_page(width=612, height=396)
+        page.insert_text((40, 40), "\n".join(lines), fontsize=11)
+        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), colorspace=fitz.csGRAY, alpha=False)
+        gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width).astype(np.float32)
+        source.close()
+
+        for name, degrade in variants.items():
+            stem = os.path.join(directory, f"page{page_number}_{name}")
+            image = np.clip(degrade(gray), 0, 255).astype(np.uint8)
+            cv2.imwrite(f"{stem}.png", image)
+            with open(f"{stem}.txt", "w") as f:
+                f.write("\n".join(lines))
+            corpus.append((f"{stem}.png", f"{stem}.txt"))
+
+    return corpus
+
+
+def make_small_images(count: int, seed: int = 0) -> list:
+    """
+    Small prescription-slip sized grayscale images (about 600x300 pixels)
+
+    Args:
+        count: Number of images
+        seed: Random seed for line selection
+
+    Returns:
+        List of numpy arrays
+    """
+    import numpy as np
+
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        source = fitz.open()
+        page = source.new_page(width=300, height=150)
+        page.insert_text((15, 25), "\n".join(rng.choice(SAMPLE_LINES) for _ in range(5)), fontsize=8)
+        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), colorspace=fitz.csGRAY, alpha=False)
+        images.append(np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width).copy())
+        source.close()
+    return images
+
+
+class CannedLLMService(LLMService):
+    """
+    LLMService that answers every request locally with canned replies
+
+    latency is the delay before a reply starts, standing in for the
+    provider's time to first token; with tokens_per_second the reply also
+    takes time to generate (4 chars per token), piece by piece when
+    streamed. calls and prompt_chars count what would have been sent;
+    requests answered by the reply cache (if one is given) are not counted.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        cache: Optional[LLMResponseCache] = None,
+        tokens_per_second: Optional[float] = None
+    ):
+        self._configure(use_cache=False)
+        self.cache = cache
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _generation_time(self, text: str) -> float:
+        return len(text) / 4 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    async def _asend(self, request):
+        self.calls += 1
+        self.prompt_chars += sum(len(message["content"]) for message in request["messages"])
+        reply = self._reply(request)
+        delay = self.latency + self._generation_time(reply)
+        if delay:
+            await asyncio.sleep(delay)
+        return reply
+
+    async def _asend_stream(self, request):
+        self.calls += 1
+        self.prompt_chars += sum(len(message["content"]) for message in request["messages"])
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for word in self._reply(request).split(" "):
+            piece = word + " "
+            if self.tokens_per_second:
+                await asyncio.sleep(self._generation_time(piece))
+            yield piece
+
+    def _reply(self, request) -> str:
+        return canned_reply(request["messages"])
+
+
+def canned_reply(messages: list) -> str:
+    """Canned reply to an LLMService request, picked by what its prompt asks for"""
+    prompt = messages[-1]["content"]
+    if '"cleaned_text"' in prompt:
+        return json.dumps({
+            "cleaned_text": "Patient presented with fever and productive cough.",
+            "structured_data": {"diagnosis": "Community acquired pneumonia", "medications": ["Tab Amoxicillin 500 mg TDS"]},
+            "summary": "Patient presented with fever and productive cough. Diagnosis: community acquired pneumonia.",
+            "key_findings": ["Fever and productive cough", "Right lower lobe pneumonia"]
+        })
+    if "JSON" in prompt:
+        return '{"diagnosis": "Community acquired pneumonia", "medications": ["Tab Amoxicillin 500 mg TDS"]}'
+    if "bullet points" in prompt:
+        return "- Fever and productive cough\n- Right lower lobe pneumonia"
+    return "Patient presented with fever and productive cough. Diagnosis: community acquired pneumonia."
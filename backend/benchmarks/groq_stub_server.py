@@ -0,0 +1,189 @@
+"""
+Local stand-in for the Groq (OpenAI-compatible) chat completions API.
+
+Usage (from the backend directory):
+    python -m benchmarks.groq_stub_server --port 8100 --latency 0.5 --error-rate 0.05 --rate-limit-rate 0.05
+
+then start the backend against it:
+    GROQ_BASE_URL=http://localhost:8100 GROQ_API_KEY=stub uvicorn main:app
+
+POST /openai/v1/chat/completions (the path the Groq SDK uses) and
+/v1/chat/completions (OpenAI clients) answer with the same canned replies as
+the benchmarks' CannedLLMService, streamed as server-sent events when the
+request asks for it. Each reply waits --latency seconds before it starts and
+is then generated at --tokens-per-second (4 chars per token).
+
+Failures are injected at random: --error-rate of requests get a 503 and
+--rate-limit-rate a 429 with a Retry-After of --retry-after seconds. With
+--requests-per-minute, requests beyond that rate also get a 429, like a
+provider quota. GET /stats reports what was served.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.rate_limiter import TokenBucket
+from benchmarks.fixtures import canned_reply
+
+
+def create_stub_app(
+    latency: float = 0.0,
+    tokens_per_second: Optional[float] = None,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    retry_after: float = 1.0,
+    requests_per_minute: int = 0,
+    seed: Optional[int] = None
+) -> FastAPI:
+    """
+    Create the stub API
+
+    Args:
+        latency: Seconds before a reply starts
+        tokens_per_second: Generation speed (instant if None)
+        error_rate: Share of requests answered with 503
+        rate_limit_rate: Share of requests answered with 429
+        retry_after: Retry-After of the 429 replies, in seconds
+        requests_per_minute: Requests served per minute before answering
+            429 (0 for no limit)
+        seed: Seed of the failure injection
+
+    Returns:
+        The app; app.state.counts counts replies by kind
+    """
+    app = FastAPI(title="Groq API stub")
+    app.state.counts = {"ok": 0, "stream": 0, "error": 0, "rate_limited": 0}
+    rng = random.Random(seed)
+    quota = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+
+    def error(status_code: int, message: str, kind: str, headers: Optional[dict] = None) -> JSONResponse:
+        return JSONResponse(
+            status_code=status_code,
+            content={"error": {"message": message, "type": kind}},
+            headers=headers
+        )
+
+    def generation_time(text: str) -> float:
+        return len(text) / 4 / tokens_per_second if tokens_per_second else 0.0
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if quota is not None:
+            wait = quota.wait_time(1, time.monotonic())
+            if wait > 0:
+                app.state.counts["rate_limited"] += 1
+                return error(429, "Rate limit reached for requests", "requests",
+                             headers={"retry-after": f"{wait:.2f}"})
+            quota.available -= 1
+
+        draw = rng.random()
+        if draw < error_rate:
+            app.state.counts["error"] += 1
+            return error(503, "Service unavailable (injected)", "internal_server_error")
+        if draw < error_rate + rate_limit_rate:
+            app.state.counts["rate_limited"] += 1
+            return error(429, "Rate limit reached (injected)", "tokens",
+                         headers={"retry-after": str(retry_after)})
+
+        reply = canned_reply(body["messages"])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "stub")
+
+        if body.get("stream"):
+            app.state.counts["stream"] += 1
+            return StreamingResponse(
+                stream(completion_id, created, model, reply),
+                media_type="text/event-stream"
+            )
+
+        delay = latency + generation_time(reply)
+        if delay:
+            await asyncio.sleep(delay)
+        app.state.counts["ok"] += 1
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+        completion_tokens = len(reply) // 4
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+                "logprobs": None
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    async def stream(completion_id: str, created: int, model: str, reply: str):
+        def chunk(delta: dict, finish_reason: Optional[str] = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}]
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        if latency:
+            await asyncio.sleep(latency)
+        yield chunk({"role": "assistant", "content": ""})
+        for word in reply.split(" "):
+            piece = word + " "
+            if tokens_per_second:
+                await asyncio.sleep(generation_time(piece))
+            yield chunk({"content": piece})
+        yield chunk({}, "stop")
+        yield "data: [DONE]\n\n"
+
+    async def stats():
+        return app.state.counts
+
+    app.add_api_route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/stats", stats, methods=["GET"])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before a reply starts")
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of injected 429s, in seconds")
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="429 beyond this rate (0 for no limit)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_stub_app(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        requests_per_minute=args.requests_per_minute,
+        seed=args.seed
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
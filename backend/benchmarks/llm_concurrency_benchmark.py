@@ -0,0 +1,103 @@
+"""
+LLM latency and input size per visit: the stage endpoints (/clean then
+/summarize, four LLM calls one after another), /process, which runs
+structured extraction alongside the summary and key findings, and /process
+in fused mode, which makes a single request.
+
+Usage (from the backend directory):
+    DATABASE_URL=sqlite:///llm_bench.db python -m benchmarks.llm_concurrency_benchmark --visits 5 --latency 1.0
+
+The app runs in-process. LLM calls are answered by a stand-in that waits
+--latency seconds per call, in place of Groq's response time, and counts
+the prompt characters that would have been sent. OCR is done up front and
+excluded from the measurement.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+from app.services.container import ServiceContainer
+from benchmarks.fixtures import CannedLLMService, make_scanned_pdf
+
+
+async def prepare_visit(client: httpx.AsyncClient, path: str) -> str:
+    """Upload a document and OCR it"""
+    with open(path, "rb") as f:
+        response = await client.post("/upload/", files={"file": (os.path.basename(path), f, "application/pdf")})
+    response.raise_for_status()
+    visit_id = response.json()["visit_id"]
+    (await client.post(f"/ocr/{visit_id}")).raise_for_status()
+    return visit_id
+
+
+async def run_stages(client: httpx.AsyncClient, visit_id: str) -> float:
+    start = time.perf_counter()
+    for path in (f"/clean/{visit_id}", f"/summarize/{visit_id}"):
+        (await client.post(path)).raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run_process(client: httpx.AsyncClient, visit_id: str) -> float:
+    # OCR is already stored, so /process spends its time on the LLM calls
+    start = time.perf_counter()
+    (await client.post(f"/process/{visit_id}")).raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(args) -> None:
+    import main
+
+    llm_service = CannedLLMService(latency=args.latency)
+    services = ServiceContainer(llm_service=llm_service, job_workers=0)
+    app = main.create_app(services)
+
+    workdir = tempfile.mkdtemp(prefix="llm_bench_")
+    base_page = random.randint(1_000, 1_000_000)
+    transport = httpx.ASGITransport(app=app)
+
+    results = {}
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        flows = (
+            ("/clean + /summarize", run_stages, False),
+            ("/process", run_process, False),
+            ("/process (fused)", run_process, True),
+        )
+        for n, (name, flow, fused_mode) in enumerate(flows):
+            services.pipeline_service.fused_mode = fused_mode
+            seconds = 0.0
+            calls = 0
+            prompt_chars = 0
+            for i in range(args.visits):
+                first_page = base_page + i * len(flows) + n
+                path = make_scanned_pdf(os.path.join(workdir, f"scan_{first_page}.pdf"), 1, first_page=first_page)
+                visit_id = await prepare_visit(client, path)
+
+                calls_before, chars_before = llm_service.calls, llm_service.prompt_chars
+                seconds += await flow(client, visit_id)
+                calls += llm_service.calls - calls_before
+                prompt_chars += llm_service.prompt_chars - chars_before
+            results[name] = (calls / args.visits, prompt_chars / args.visits, seconds / args.visits)
+
+    print(f"per visit, averaged over {args.visits} visits, {args.latency:.2f}s per LLM call\n")
+    print(f"{'flow':<22}{'LLM calls':>10}{'prompt chars':>14}{'seconds':>10}")
+    for name, (calls, prompt_chars, seconds) in results.items():
+        print(f"{name:<22}{calls:>10.0f}{prompt_chars:>14.0f}{seconds:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visits", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per simulated LLM call")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Whole-pipeline load test against the local Groq stub, with and without
+retries.
+
+Usage (from the backend directory):
+    DATABASE_URL=sqlite:///resilience_bench.db python -m benchmarks.llm_resilience_benchmark --visits 12
+
+The stub (benchmarks/groq_stub_server.py) and the app are served by uvicorn
+on local ports, and the app's real LLMService talks to the stub through the
+Groq SDK, so rate limiting, retries and error handling run as they would
+against Groq. The stub fails --error-rate of requests with 503 and
+--rate-limit-rate with 429. All visits are sent to POST /process/{visit_id}
+at once, first with retries off and then with LLM_MAX_RETRIES; failed
+visits are counted by status code. The client-side limiter runs at
+--requests-per-minute (LLM_REQUESTS_PER_MINUTE by default), so time spent
+waiting for it is part of the result.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+import uvicorn
+
+from app.core.config import settings
+from app.services.container import ServiceContainer
+from benchmarks.fixtures import make_scanned_pdf
+from benchmarks.groq_stub_server import create_stub_app
+
+
+async def serve(app) -> tuple:
+    """Start uvicorn on a free local port; returns (server, task, port)"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, serving, server.servers[0].sockets[0].getsockname()[1]
+
+
+async def run(args) -> None:
+    import main
+    from app.services.llm_service import LLMService
+    from app.services.rate_limiter import RateLimiter
+
+    stub = create_stub_app(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    stub_server, stub_serving, stub_port = await serve(stub)
+    settings.GROQ_BASE_URL = f"http://127.0.0.1:{stub_port}"
+    settings.GROQ_API_KEY = settings.GROQ_API_KEY or "stub"
+    if args.requests_per_minute is not None:
+        settings.LLM_REQUESTS_PER_MINUTE = args.requests_per_minute
+
+    llm_service = LLMService(use_cache=False)
+    app = main.create_app(ServiceContainer(llm_service=llm_service, job_workers=0))
+    server, serving, port = await serve(app)
+
+    workdir = tempfile.mkdtemp(prefix="resilience_bench_")
+    base_page = random.randint(1_000, 1_000_000)
+    results = {}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+            for name, max_retries in (("no retries", 0), (f"{settings.LLM_MAX_RETRIES} retries", settings.LLM_MAX_RETRIES)):
+                llm_service.max_retries = max_retries
+                llm_service.retries = llm_service.failures = 0
+                llm_service.rate_limiter = RateLimiter(settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE)
+                visit_ids = []
+                for _ in range(args.visits):
+                    path = make_scanned_pdf(os.path.join(workdir, f"scan_{base_page}.pdf"), 1, first_page=base_page)
+                    base_page += 1
+                    with open(path, "rb") as f:
+                        response = await client.post("/upload/", files={"file": (os.path.basename(path), f, "application/pdf")})
+                    response.raise_for_status()
+                    visit_ids.append(response.json()["visit_id"])
+
+                start = time.perf_counter()
+                responses = await asyncio.gather(*(client.post(f"/process/{visit_id}") for visit_id in visit_ids))
+                seconds = time.perf_counter() - start
+                rate_stats = (await client.get("/llm/rate/stats")).json()
+                results[name] = (Counter(response.status_code for response in responses), seconds, rate_stats)
+    finally:
+        server.should_exit = True
+        stub_server.should_exit = True
+        await serving
+        await stub_serving
+
+    print(f"{args.visits} concurrent /process requests, stub latency {args.latency:.2f}s, "
+          f"{args.error_rate:.0%} 503s, {args.rate_limit_rate:.0%} 429s\n")
+    print(f"{'':<12}{'200':>6}{'failed':>16}{'time':>9}{'retries':>9}{'given up':>10}{'limiter wait':>14}")
+    for name, (statuses, seconds, rate_stats) in results.items():
+        failed = ", ".join(f"{status}x{count}" for status, count in sorted(statuses.items()) if status != 200) or "-"
+        print(f"{name:<12}{statuses.get(200, 0):>6}{failed:>16}{seconds:>8.2f}s"
+              f"{rate_stats['retries']:>9}{rate_stats['failures']:>10}{rate_stats['waited_seconds']:>13.2f}s")
+    print(f"\nstub replies: {stub.state.counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visits", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per reply")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="share of LLM requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.1, help="share of LLM requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--requests-per-minute", type=int, default=None, help="client-side limit (0 for none)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
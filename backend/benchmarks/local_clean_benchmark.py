@@ -0,0 +1,109 @@
+"""
+Cleaning with and without the local rule-based fast path.
+
+Usage (from the backend directory):
+    DATABASE_URL=sqlite:///local_clean_bench.db python -m benchmarks.local_clean_benchmark --digital 6 --scanned 2
+
+Uploads --digital PDFs with a text layer (confidence 1.0) and --scanned
+image-only PDFs, runs OCR, then POST /clean/{visit_id} for each visit, first
+with every chunk sent to the LLM and then with local cleaning. The LLM is a
+stand-in with --latency seconds per request. Reports cleaning requests made,
+time per /clean call and the local cleaner's own time per page.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import fitz
+import httpx
+
+from app.core.config import settings
+from app.services.container import ServiceContainer
+from app.services.text_cleaner import LocalCleaner
+from benchmarks.fixtures import CannedLLMService, make_scanned_pdf, page_lines
+
+
+def make_digital_pdf(path: str, page_count: int, first_page: int = 1) -> str:
+    """PDF whose pages carry a text layer, like one exported from an EMR"""
+    doc = fitz.open()
+    for page_number in range(first_page, first_page + page_count):
+        page = doc.new_page()
+        page.insert_text((50, 72), "\n".join(page_lines(page_number)), fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+async def run(args) -> None:
+    import main
+
+    llm_service = CannedLLMService(latency=args.latency)
+    llm_service.local_extractor = None  # every visit then makes exactly one extraction request
+    app = main.create_app(ServiceContainer(llm_service=llm_service, job_workers=0))
+    workdir = tempfile.mkdtemp(prefix="local_clean_bench_")
+    base_page = random.randint(1_000, 1_000_000)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=3600) as client:
+        for name, enabled in (("LLM only", False), ("local fast path", True)):
+            llm_service.local_cleaner = (
+                LocalCleaner(settings.LOCAL_CLEAN_MIN_CONFIDENCE, settings.LOCAL_CLEAN_MAX_NOISE) if enabled else None
+            )
+            paths = []
+            for i in range(args.digital + args.scanned):
+                path = os.path.join(workdir, f"doc_{base_page}.pdf")
+                if i < args.digital:
+                    make_digital_pdf(path, args.pages, first_page=base_page)
+                else:
+                    make_scanned_pdf(path, args.pages, first_page=base_page)
+                base_page += args.pages
+                paths.append(path)
+
+            visit_ids = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    response = await client.post("/upload/", files={"file": (os.path.basename(path), f, "application/pdf")})
+                response.raise_for_status()
+                visit_id = response.json()["visit_id"]
+                (await client.post(f"/ocr/{visit_id}")).raise_for_status()
+                visit_ids.append(visit_id)
+
+            calls = llm_service.calls
+            seconds = []
+            for visit_id in visit_ids:
+                start = time.perf_counter()
+                (await client.post(f"/clean/{visit_id}")).raise_for_status()
+                seconds.append(time.perf_counter() - start)
+            # /clean also makes the extraction request, one per visit
+            results[name] = (llm_service.calls - calls - len(visit_ids), sum(seconds) / len(seconds))
+            if enabled:
+                stats = llm_service.clean_stats()
+
+    print(f"{args.digital} digital + {args.scanned} scanned visits of {args.pages} pages, "
+          f"{args.latency:.2f}s per LLM request\n")
+    print(f"{'':<18}{'clean requests':>16}{'per /clean':>12}")
+    for name, (requests, average) in results.items():
+        print(f"{name:<18}{requests:>16}{average:>11.2f}s")
+    print(f"\nchunks cleaned locally: {stats['local']}, sent to the LLM: "
+          f"{stats['llm_low_confidence'] + stats['llm_noisy'] + stats['llm_unknown_confidence']}")
+    print(f"local cleaner: {stats['microseconds_per_1000_chars']:.0f} us per 1000 chars")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--digital", type=int, default=6, help="visits with a digital PDF")
+    parser.add_argument("--scanned", type=int, default=2, help="visits with a scanned PDF")
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per LLM request")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Structured data extraction by the LLM alone, by local patterns alone, and by
+local patterns with the LLM filling the gaps.
+
+Usage (from the backend directory):
+    DATABASE_URL=sqlite:///local_extract_bench.db python -m benchmarks.local_extract_benchmark --documents 40
+
+Builds --documents synthetic cleaned notes in the formats seen on outpatient
+notes and prescriptions, each with its true field values. Some notes give
+the diagnosis or advice in a sentence instead of after a label, which local
+extraction leaves to the LLM. Each note goes through
+LLMService.aextract_structured_data in every mode; reported are LLM
+requests, prompt tokens, time per document and field coverage (share
+of the true values found: every item of a list, every vital sign).
+
+By default the LLM is a stand-in that answers after --latency seconds with
+the true values of the fields it is asked for, so "LLM only" is the best
+coverage an LLM could reach. With --live the real LLMService is used
+(GROQ_API_KEY, or GROQ_BASE_URL for benchmarks/groq_stub_server.py, whose
+canned replies make coverage meaningless but exercise the requests).
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.services.local_extractor import FIELDS, LIST_FIELDS, LocalExtractor
+from benchmarks.fixtures import CannedLLMService
+
+NAMES = ["John Doe", "Priya Sharma", "Ravi Kumar", "Anita Desai", "Mohammed Iqbal", "Sara Thomas"]
+SYMPTOMS = ["fever", "cough", "headache", "vomiting", "dizziness", "chest pain", "breathlessness", "fatigue"]
+DIAGNOSES = ["Community acquired pneumonia", "Type 2 diabetes mellitus", "Essential hypertension",
+             "Acute gastroenteritis", "Migraine", "Hypothyroidism"]
+# (form, drug, dose, frequency, duration)
+MEDICATIONS = [
+    ("Tab", "Amoxicillin", "500 mg", "TDS", "x 7 days"), ("Tab", "Paracetamol", "650 mg", "SOS", ""),
+    ("Tab", "Metformin", "500 mg", "BD", "x 30 days"), ("Cap", "Omeprazole", "20 mg", "OD before food", ""),
+    ("Syp", "Ambroxol", "10 ml", "BD", "for 5 days"), ("Tab", "Amlodipine", "5 mg", "OD", ""),
+    ("Inj", "Ceftriaxone", "1 g", "BD", "for 5 days"), ("Tab", "Levothyroxine", "50 mcg", "OD", ""),
+    ("", "Atorvastatin", "10 mg", "HS", ""), ("", "Ondansetron", "4 mg", "SOS", ""),
+]
+# (name, value, unit)
+LABS = [
+    ("HbA1c", "7.2", "%"), ("Fasting glucose", "142", "mg/dL"), ("Creatinine", "1.1", "mg/dL"),
+    ("Hb", "11.4", "g/dL"), ("TSH", "6.8", "mIU/L"), ("Serum Potassium", "4.2", "mEq/L"),
+    ("Platelets", "2.1", "lakhs/cumm"), ("LDL", "132", "mg/dL"), ("ESR", "28", "mm/hr"),
+]
+ADVICE = ["plenty of fluids, review after one week", "low salt diet and daily walks", "repeat HbA1c after 3 months"]
+
+
+def make_document(rng: random.Random) -> Tuple[str, Dict[str, Any], Dict[str, List[str]]]:
+    """
+    One synthetic note
+
+    Returns:
+        (text, true field values, what has to appear in the result for each
+        list item or vital sign: drug and test names, symptoms, vital keys)
+    """
+    name, age, male = rng.choice(NAMES), str(rng.randint(18, 85)), rng.random() < 0.5
+    symptoms = rng.sample(SYMPTOMS, rng.randint(1, 3))
+    diagnosis = rng.choice(DIAGNOSES)
+    medications = rng.sample(MEDICATIONS, rng.randint(1, 4))
+    labs = rng.sample(LABS, rng.randint(0, 3))
+    advice = rng.choice(ADVICE)
+    date = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024"
+    vitals = {
+        "blood_pressure": f"{rng.randint(100, 160)}/{rng.randint(60, 100)} mmHg",
+        "pulse": f"{rng.randint(60, 110)}/min",
+        "temperature": f"{rng.randint(97, 102)}.{rng.randint(0, 9)} F",
+        "spo2": f"{rng.randint(90, 99)}%",
+    }
+
+    if rng.random() < 0.5:
+        lines = [f"Patient Name: {name}    Age: {age}    Gender: {'Male' if male else 'Female'}", f"Date of Visit: {date}"]
+    else:
+        lines = [f"Name: {name}, Age: {age} yrs, Sex: {'M' if male else 'F'}", f"Date: {date}"]
+    lines.append(f"{rng.choice(['Chief Complaint', 'C/O'])}: {', '.join(symptoms[:-1]) + ' and ' if len(symptoms) > 1 else ''}{symptoms[-1]}")
+    if rng.random() < 0.5:
+        lines.append(f"BP {vitals['blood_pressure']}   Pulse {vitals['pulse']}   Temp {vitals['temperature']}   SpO2 {vitals['spo2']}")
+    else:
+        lines.append(f"B.P.: {vitals['blood_pressure']}, HR {vitals['pulse'].replace('/min', ' bpm')}, "
+                     f"Temp: {vitals['temperature']}, O2 Sat {vitals['spo2']}")
+    lines.append(f"{rng.choice(['Diagnosis', 'Impression'])}: {diagnosis}" if rng.random() < 0.7
+                 else f"Findings are consistent with {diagnosis.lower()}.")
+    lines.append("Rx:")
+    lines += [" ".join(part for part in medication if part) for medication in medications]
+    if labs:
+        lines.append("   ".join(f"{test} {value}{unit if unit == '%' else ' ' + unit}" for test, value, unit in labs))
+    lines.append(f"Advice: {advice}" if rng.random() < 0.7 else f"The patient was told {advice}.")
+    lines.append("Dr. A. Kumar, MD (General Medicine)")
+
+    truth = {
+        "patient_name": name, "age": age, "gender": "Male" if male else "Female", "symptoms": symptoms,
+        "diagnosis": diagnosis, "doctor_notes": advice, "date_of_visit": date, "vital_signs": vitals,
+        "medications": [" ".join(part for part in medication if part) for medication in medications],
+        "test_results": [f"{test} {value} {unit}" for test, value, unit in labs],
+    }
+    keys = {
+        "symptoms": symptoms, "vital_signs": list(vitals),
+        "medications": [drug for _, drug, _, _, _ in medications], "test_results": [test for test, _, _ in labs],
+    }
+    return "\n".join(lines), truth, keys
+
+
+def coverage(result: Dict[str, Any], truth: Dict[str, Any], keys: Dict[str, List[str]]) -> Dict[str, float]:
+    """Share of each field's true value found: 0 or 1, or the share of list items / vital signs"""
+    scores = {}
+    for field in FIELDS:
+        if not truth[field]:
+            continue
+        value = result.get(field)
+        if field == "vital_signs":
+            scores[field] = sum(key in (value or {}) for key in keys[field]) / len(keys[field])
+        elif field in LIST_FIELDS:
+            found = " ".join(map(str, value or [])).lower()
+            scores[field] = sum(key.lower() in found for key in keys[field]) / len(keys[field])
+        else:
+            scores[field] = 1.0 if value else 0.0
+    return scores
+
+
+class OracleLLMService(CannedLLMService):
+    """Stand-in LLM that answers extraction prompts with the document's true values"""
+
+    def __init__(self, truths: Dict[str, Dict[str, Any]], latency: float):
+        super().__init__(latency=latency)
+        self.truths = truths
+
+    def _reply(self, request) -> str:
+        prompt = request["messages"][-1]["content"]
+        text = prompt.split("Medical Text:\n", 1)[1].rsplit("\n\nReturn ONLY", 1)[0]
+        asked = [field for field in FIELDS if f'"{field}":' in prompt]
+        return json.dumps({field: self.truths[text][field] for field in asked})
+
+
+async def run(args) -> None:
+    rng = random.Random(args.seed)
+    documents = [make_document(rng) for _ in range(args.documents)]
+
+    if args.live:
+        from app.services.llm_service import LLMService
+        llm_service = LLMService(use_cache=False)
+    else:
+        llm_service = OracleLLMService({text: truth for text, truth, _ in documents}, args.latency)
+
+    modes = (("LLM only", False, True), ("local only", True, False), ("local + LLM gaps", True, True))
+    results = {}
+    for name, local, gaps in modes:
+        llm_service.local_extractor = LocalExtractor() if local else None
+        llm_service.extract_llm_gaps = gaps
+        before = llm_service.token_stats()["methods"].get("extract", {})
+        seconds, scores = [], {field: [] for field in FIELDS}
+        for text, truth, keys in documents:
+            start = time.perf_counter()
+            result = await llm_service.aextract_structured_data(text)
+            seconds.append(time.perf_counter() - start)
+            for field, score in coverage(result, truth, keys).items():
+                scores[field].append(score)
+        after = llm_service.token_stats()["methods"].get("extract", {})
+        results[name] = {
+            "requests": after.get("calls", 0) - before.get("calls", 0),
+            "prompt_tokens": after.get("prompt_tokens", 0) - before.get("prompt_tokens", 0),
+            "seconds": seconds,
+            "fields": {field: statistics.mean(values) for field, values in scores.items() if values},
+        }
+        if local:
+            local_us = llm_service.local_extractor.stats()["average_microseconds"]
+
+    print(f"{args.documents} documents, " + ("live LLM" if args.live else f"{args.latency:.2f}s per LLM request") + "\n")
+    print(f"{'':<18}{'requests':>9}{'prompt tokens':>15}{'per doc':>10}{'p95':>10}{'coverage':>10}")
+    for name, result in results.items():
+        seconds = sorted(result["seconds"])
+        p95 = seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))]
+        print(f"{name:<18}{result['requests']:>9}{result['prompt_tokens']:>15}"
+              f"{statistics.mean(seconds) * 1000:>8.1f}ms{p95 * 1000:>8.1f}ms"
+              f"{statistics.mean(result['fields'].values()):>10.1%}")
+    print(f"\nlocal extraction: {local_us:.0f} us per document\n")
+    print(f"{'coverage by field':<18}" + "".join(f"{name:>18}" for name in results))
+    for field in FIELDS:
+        print(f"{field:<18}" + "".join(f"{result['fields'].get(field, 0.0):>18.0%}" for result in results.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per stand-in LLM request")
+    parser.add_argument("--live", action="store_true", help="use the real LLMService instead of the stand-in")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+LLM time to clean and summarise long documents, whole versus chunked.
+
+Usage (from the backend directory):
+    python -m benchmarks.long_document_benchmark --pages 1 5 20 --latency 0.5 --tokens-per-second 250
+
+Builds OCR-style text of the given number of pages (page headers as
+OCRService writes them) and runs cleaning and the summary through
+LLMService with a stand-in LLM. Each call takes --latency seconds plus the
+time to generate its reply at --tokens-per-second (4 chars per token), and
+replies are cut off at the request's max_tokens, as the provider does.
+Cleaning replies echo the text they were given.
+
+"whole" sends each text in a single request, as before chunking; "chunked"
+uses LLM_CHUNK_MAX_CHARS and LLM_CHUNK_CONCURRENCY. "pages kept" counts the
+page headers that survive cleaning.
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.config import settings
+from benchmarks.fixtures import CannedLLMService, page_lines
+
+
+class EchoLLMService(CannedLLMService):
+    """Stand-in whose cleaning replies are the text it was given, like a real cleaner's"""
+
+    def _reply(self, request) -> str:
+        reply = super()._reply(request)
+        prompt = request["messages"][-1]["content"]
+        if "OCR Text:\n" in prompt:
+            reply = prompt.split("OCR Text:\n", 1)[1].rsplit("\n\nProvide ONLY", 1)[0]
+        return reply[:request["max_tokens"] * 4]
+
+
+def document_text(pages: int) -> str:
+    return "\n\n".join(
+        f"--- Page {page} ---\n" + "\n".join(page_lines(page, line_count=80))
+        for page in range(1, pages + 1)
+    )
+
+
+async def measure(llm_service: EchoLLMService, text: str) -> tuple:
+    start = time.perf_counter()
+    cleaned = await llm_service.aclean_ocr_text(text)
+    await llm_service.agenerate_medical_summary(cleaned)
+    return cleaned.count("--- Page "), llm_service.calls, time.perf_counter() - start
+
+
+async def run(args) -> None:
+    print(f"{args.latency:.2f}s + {args.tokens_per_second:.0f} tokens/s per LLM call, "
+          f"chunks of {settings.LLM_CHUNK_MAX_CHARS} chars, {settings.LLM_CHUNK_CONCURRENCY} at a time\n")
+    print(f"{'pages':>6}{'chars':>9}{'mode':>10}{'pages kept':>12}{'LLM calls':>11}{'seconds':>9}")
+    for pages in args.pages:
+        text = document_text(pages)
+        for mode in ("whole", "chunked"):
+            llm_service = EchoLLMService(latency=args.latency, tokens_per_second=args.tokens_per_second)
+            if mode == "whole":
+                llm_service.chunker.max_chars = len(text) + 1
+            kept, calls, seconds = await measure(llm_service, text)
+            print(f"{pages:>6}{len(text):>9}{mode:>10}{kept:>12}{calls:>11}{seconds:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per simulated LLM call")
+    parser.add_argument("--tokens-per-second", type=float, default=250, help="simulated generation speed")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+OCR throughput with cross-request micro-batching versus one image per call.
+
+Usage (from the backend directory):
+    python -m benchmarks.ocr_batch_benchmark --images 64 --clients 8
+
+- single: every image goes through its own self.ocr.ocr(...) call, one at
+  a time (PaddleOCR's predictors cannot be shared between threads, so
+  concurrent requests are serialised anyway)
+- batched: `--clients` threads submit images concurrently and the
+  OCRBatchScheduler groups them, with detection per image and recognition
+  over the pooled text crops
+
+Images are small prescription-sized slips, preprocessed with the "none"
+profile so only OCR is measured.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.services.ocr_service import OCRService
+from benchmarks.fixtures import make_small_images
+
+
+def run_single(images: list) -> float:
+    service = OCRService(pool_size=0, use_cache=False, use_batching=False)
+    service.warm_up()
+    service.extract_text_from_image(images[0])
+
+    start = time.perf_counter()
+    for image in images:
+        service.extract_text_from_image(image)
+    return time.perf_counter() - start
+
+
+def run_batched(images: list, clients: int, max_batch_size: int, max_wait_ms: int) -> tuple:
+    settings.OCR_BATCH_MAX_SIZE = max_batch_size
+    settings.OCR_BATCH_MAX_WAIT_MS = max_wait_ms
+    service = OCRService(pool_size=0, use_cache=False, use_batching=True)
+    service.warm_up()
+    service.extract_text_from_image(images[0])
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(service.extract_text_from_image, images))
+        elapsed = time.perf_counter() - start
+        return elapsed, service.batch_stats()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--max-batch-size", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--max-wait-ms", type=int, default=10)
+    args = parser.parse_args()
+
+    settings.OCR_PREPROCESS_PROFILE = "none"
+    images = make_small_images(args.images)
+
+    single = run_single(images)
+    print(f"{'mode':<22}{'seconds':>9}{'images/s':>10}{'avg batch':>11}{'gain':>7}")
+    print(f"{'single':<22}{single:>9.2f}{len(images) / single:>10.1f}{1:>11.1f}{1:>6.2f}x")
+
+    for max_batch_size in args.max_batch_size:
+        elapsed, stats = run_batched(images, args.clients, max_batch_size, args.max_wait_ms)
+        label = f"batched (max {max_batch_size})"
+        print(
+            f"{label:<22}{elapsed:>9.2f}{len(images) / elapsed:>10.1f}"
+            f"{stats['avg_batch_size']:>11.1f}{single / elapsed:>6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Wall-clock time of OCRService.extract_text_from_pdf by page count and
+worker count.
+
+Usage (from the backend directory):
+    python -m benchmarks.ocr_parallel_benchmark --pages 1 2 4 8 16 --workers 0 2 4
+
+Workers is the OCR pool size; 0 runs OCR in the benchmark process. Each
+worker count is measured with an already warm pool, so the numbers show
+steady-state page throughput rather than model loading time.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.services.ocr_service import OCRService
+from benchmarks.fixtures import make_scanned_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--repeat", type=int, default=1, help="runs per cell, the best is reported")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ocr_bench_")
+    pdfs = {n: make_scanned_pdf(os.path.join(workdir, f"scan_{n}.pdf"), n) for n in args.pages}
+
+    results = {}
+    for workers in args.workers:
+        service = OCRService(pool_size=workers, use_cache=False)
+        try:
+            service.warm_up()
+
+            for pages, path in pdfs.items():
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    service.extract_text_from_pdf(path)
+                    best = min(best, time.perf_counter() - start)
+                results[(pages, workers)] = best
+                print(f"pages={pages:<4} workers={workers:<3} {best:8.2f}s", flush=True)
+        finally:
+            service.close()
+
+    print()
+    header = "pages  " + "".join(f"{f'w={w}':>12}" for w in args.workers) + f"{'speedup':>10}"
+    print(header)
+    print("-" * len(header))
+    for pages in args.pages:
+        row = f"{pages:<7}" + "".join(f"{results[(pages, w)]:>11.2f}s" for w in args.workers)
+        speedup = results[(pages, args.workers[0])] / results[(pages, args.workers[-1])]
+        print(row + f"{speedup:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Per-page cost of handing a rendered PDF page to preprocessing: the old
+temp_page_{idx}.png write/read round trip versus the in-memory view used by
+OCRService.pdf_to_images.
+
+Usage (from the backend directory):
+    python -m benchmarks.page_io_benchmark --pages 10 --repeat 5
+
+Only the hand-off is timed (rendering, denoising and OCR are identical on
+both paths). The script also checks that both paths produce the same
+grayscale pixels.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import fitz
+import numpy as np
+
+from benchmarks.fixtures import make_scanned_pdf
+
+
+def disk_round_trip(pix: fitz.Pixmap, workdir: str, idx: int) -> np.ndarray:
+    """
+    Previous behaviour: copy samples, PNG encode, write, read, decode, unlink
+    """
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    path = os.path.join(workdir, f"temp_page_{idx}.png")
+    cv2.imwrite(path, img)
+    loaded = cv2.imread(path)
+    os.remove(path)
+    return cv2.cvtColor(loaded, cv2.COLOR_BGR2GRAY)
+
+
+def in_memory(pix: fitz.Pixmap) -> np.ndarray:
+    """
+    Current behaviour: view over the pixmap buffer, straight to grayscale
+    """
+    img = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="page_io_bench_")
+    pdf_path = make_scanned_pdf(os.path.join(workdir, "scan.pdf"), args.pages)
+
+    timings = {"disk round trip": [], "in memory": []}
+    document = fitz.open(pdf_path)
+    for _ in range(args.repeat):
+        for idx, page in enumerate(document):
+            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)
+
+            start = time.perf_counter()
+            old = disk_round_trip(pix, workdir, idx)
+            timings["disk round trip"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            new = in_memory(pix)
+            timings["in memory"].append(time.perf_counter() - start)
+
+            if not np.array_equal(old, new):
+                raise SystemExit(f"Page {idx + 1}: grayscale output differs between paths")
+    document.close()
+
+    print(f"{'path':<18}{'mean ms/page':>14}{'p95 ms/page':>14}")
+    for name, samples in timings.items():
+        samples = sorted(samples)
+        mean = sum(samples) / len(samples) * 1000
+        p95 = samples[int(len(samples) * 0.95) - 1] * 1000
+        print(f"{name:<18}{mean:>14.2f}{p95:>14.2f}")
+
+    saved = (sum(timings["disk round trip"]) - sum(timings["in memory"])) / len(timings["in memory"]) * 1000
+    print(f"\nsaved per page: {saved:.2f} ms (outputs identical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Client round trips and database traffic per visit: the three stage
+endpoints (/ocr, /clean, /summarize) called one after another versus the
+combined /process endpoint.
+
+Usage (from the backend directory):
+    DATABASE_URL=sqlite:///pipeline_bench.db python -m benchmarks.pipeline_db_benchmark --visits 5
+
+The app runs in-process with a stand-in LLM service that answers with
+canned replies, so that only the application's own work is measured; OCR
+runs for real on a synthetic scanned PDF. SQL statements and commits are
+counted with SQLAlchemy engine events.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import event
+
+from app.core.database import engine
+from app.services.container import ServiceContainer
+from benchmarks.fixtures import CannedLLMService, make_scanned_pdf
+
+
+class Counter:
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+
+async def upload(client: httpx.AsyncClient, path: str) -> str:
+    with open(path, "rb") as f:
+        response = await client.post("/upload/", files={"file": (os.path.basename(path), f, "application/pdf")})
+    response.raise_for_status()
+    return response.json()["visit_id"]
+
+
+async def run_stages(client: httpx.AsyncClient, visit_id: str) -> int:
+    for path in (f"/ocr/{visit_id}", f"/clean/{visit_id}", f"/summarize/{visit_id}"):
+        response = await client.post(path)
+        response.raise_for_status()
+    return 3
+
+
+async def run_process(client: httpx.AsyncClient, visit_id: str) -> int:
+    response = await client.post(f"/process/{visit_id}")
+    response.raise_for_status()
+    return 1
+
+
+async def run(args) -> None:
+    import main
+
+    app = main.create_app(ServiceContainer(llm_service=CannedLLMService(), job_workers=0))
+
+    counter = Counter()
+    event.listen(engine, "before_cursor_execute", lambda *a: setattr(counter, "statements", counter.statements + 1))
+    event.listen(engine, "commit", lambda *a: setattr(counter, "commits", counter.commits + 1))
+
+    workdir = tempfile.mkdtemp(prefix="pipeline_bench_")
+    base_page = random.randint(1_000, 1_000_000)
+    transport = httpx.ASGITransport(app=app)
+
+    results = {}
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        for name, flow in (("stage endpoints", run_stages), ("/process", run_process)):
+            totals = {"round trips": 0, "statements": 0, "commits": 0, "seconds": 0.0}
+            for i in range(args.visits):
+                first_page = base_page + (i * 2 + (name == "/process")) * args.pages
+                path = make_scanned_pdf(os.path.join(workdir, f"scan_{first_page}.pdf"), args.pages, first_page=first_page)
+                visit_id = await upload(client, path)
+
+                counter.reset()
+                start = time.perf_counter()
+                totals["round trips"] += await flow(client, visit_id)
+                totals["seconds"] += time.perf_counter() - start
+                totals["statements"] += counter.statements
+                totals["commits"] += counter.commits
+            results[name] = {key: value / args.visits for key, value in totals.items()}
+
+    print(f"per visit, averaged over {args.visits} visits of {args.pages} pages\n")
+    print(f"{'flow':<18}{'round trips':>12}{'statements':>12}{'commits':>10}{'seconds':>10}")
+    for name, row in results.items():
+        print(f"{name:<18}{row['round trips']:>12.0f}{row['statements']:>12.1f}{row['commits']:>10.1f}{row['seconds']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visits", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=2)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Time and accuracy of each OCR preprocessing profile on a fixture corpus.
+
+Usage (from the backend directory):
+    python -m benchmarks.preprocess_benchmark
+    python -m benchmarks.preprocess_benchmark --corpus path/to/fixtures
+
+A corpus directory holds images (png/jpg) each with a ground-truth file of
+the same name and a .txt extension. Without --corpus a synthetic corpus of
+clean, noisy, low-contrast, speckled and blurred pages is generated.
+
+Accuracy is the character-level similarity between OCR output and ground
+truth (difflib ratio after whitespace normalisation).
+"""
+import argparse
+import difflib
+import glob
+import os
+import tempfile
+import time
+
+from app.core.config import settings
+from app.services.ocr_service import OCRService, PREPROCESS_PROFILES
+from benchmarks.fixtures import make_image_corpus
+
+
+def load_corpus(directory: str) -> list:
+    corpus = []
+    for image_path in sorted(glob.glob(os.path.join(directory, "*"))):
+        stem, ext = os.path.splitext(image_path)
+        if ext.lower() in (".png", ".jpg", ".jpeg") and os.path.exists(f"{stem}.txt"):
+            corpus.append((image_path, f"{stem}.txt"))
+    return corpus
+
+
+def similarity(text: str, truth: str) -> float:
+    return difflib.SequenceMatcher(None, " ".join(text.split()), " ".join(truth.split())).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of images with .txt ground truth")
+    parser.add_argument("--profiles", nargs="+", default=list(PREPROCESS_PROFILES) + ["auto"])
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else make_image_corpus(tempfile.mkdtemp(prefix="preprocess_bench_"))
+    if not corpus:
+        raise SystemExit("No images with ground truth found")
+
+    service = OCRService(pool_size=0, use_cache=False)
+    # Warm up the models so the first profile is not charged for loading
+    service.extract_text_from_image(corpus[0][0])
+
+    print(f"{len(corpus)} images\n")
+    print(f"{'profile':<9}{'preprocess ms':>15}{'total ms':>11}{'confidence':>12}{'accuracy':>10}")
+
+    for profile in args.profiles:
+        settings.OCR_PREPROCESS_PROFILE = profile
+        preprocess_ms, total_ms, confidences, accuracies = [], [], [], []
+
+        for image_path, text_path in corpus:
+            with open(text_path) as f:
+                truth = f.read()
+
+            start = time.perf_counter()
+            service.preprocess_image(image_path, profile)
+            preprocess_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            text, confidence = service.extract_text_from_image(image_path)
+            total_ms.append((time.perf_counter() - start) * 1000)
+
+            confidences.append(confidence)
+            accuracies.append(similarity(text, truth))
+
+        n = len(corpus)
+        print(
+            f"{profile:<9}{sum(preprocess_ms) / n:>15.1f}{sum(total_ms) / n:>11.1f}"
+            f"{sum(confidences) / n:>12.3f}{sum(accuracies) / n:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
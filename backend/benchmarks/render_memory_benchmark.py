@@ -0,0 +1,99 @@
+"""
+Peak memory (RSS) of OCRService.extract_text_from_pdf by page count.
+
+Usage (from the backend directory):
+    python -m benchmarks.render_memory_benchmark --pages 5 20 60
+
+Each measurement runs in a fresh subprocess on an image-only A3 PDF and
+reports the peak resident set size. Two modes are compared:
+
+- streaming: the current pdf_to_images generator (grayscale, DPI-based
+  zoom, pixel cap), consumed by extract_text_from_pdf
+- eager: every page rendered at a fixed 2x zoom in RGB and kept in a list
+  before OCR starts, which is how pages used to be rasterised
+
+With streaming, the peak should stay flat as the page count grows.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.fixtures import make_scanned_pdf, A3
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak RSS of this process in MB
+
+    VmHWM is reset by exec; ru_maxrss is not, so it would report the
+    parent's peak (which built the fixture PDFs) when that is higher.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(mode: str, pdf_path: str) -> None:
+    """
+    Child process: run one mode and print peak RSS in MB as JSON
+    """
+    import fitz
+    import numpy as np
+    from app.services.ocr_service import OCRService
+
+    service = OCRService(pool_size=0, use_cache=False)
+    baseline = peak_rss_mb()
+
+    if mode == "streaming":
+        service.extract_text_from_pdf(pdf_path)
+    else:
+        document = fitz.open(pdf_path)
+        images = []
+        for page in document:
+            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+            images.append(np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n))
+        document.close()
+        for image in images:
+            service.ocr_page(image)
+
+    print(json.dumps({"baseline_mb": baseline, "peak_mb": peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 60])
+    parser.add_argument("--modes", nargs="+", default=["streaming", "eager"])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PDF"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(*args.child)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="render_mem_bench_")
+    print(f"{'pages':<7}{'mode':<11}{'baseline MB':>13}{'peak MB':>10}{'growth MB':>11}")
+
+    for pages in args.pages:
+        pdf_path = make_scanned_pdf(os.path.join(workdir, f"a3_{pages}.pdf"), pages, zoom=1.5, page_size=A3)
+        for mode in args.modes:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.render_memory_benchmark", "--child", mode, pdf_path],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            growth = result["peak_mb"] - result["baseline_mb"]
+            print(f"{pages:<7}{mode:<11}{result['baseline_mb']:>13.0f}{result['peak_mb']:>10.0f}{growth:>11.0f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
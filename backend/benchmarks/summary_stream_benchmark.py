@@ -0,0 +1,119 @@
+"""
+Time to first byte and to the full summary: POST /summarize/{visit_id}
+versus POST /summarize/{visit_id}/stream.
+
+Usage (from the backend directory):
+    DATABASE_URL=sqlite:///stream_bench.db python -m benchmarks.summary_stream_benchmark --visits 3
+
+The app is served by uvicorn on a local port (an in-process transport would
+buffer the whole response). The LLM is a stand-in with --latency seconds to
+first token and --tokens-per-second generation speed, writing a summary of
+about --summary-tokens tokens. OCR and cleaning are done up front.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+import uvicorn
+
+from app.services.container import ServiceContainer
+from benchmarks.fixtures import CannedLLMService, make_scanned_pdf, SAMPLE_LINES
+
+
+class LongSummaryLLMService(CannedLLMService):
+    """Stand-in whose summaries are of a realistic length"""
+
+    def __init__(self, summary_tokens: int, **kwargs):
+        super().__init__(**kwargs)
+        self.summary_tokens = summary_tokens
+
+    def _reply(self, request) -> str:
+        reply = super()._reply(request)
+        if "medical summary" in request["messages"][-1]["content"]:
+            lines = []
+            while sum(len(line) + 1 for line in lines) < self.summary_tokens * 4:
+                lines.append(SAMPLE_LINES[len(lines) % len(SAMPLE_LINES)])
+            reply = "\n".join(lines)
+        return reply
+
+
+async def prepare_visit(client: httpx.AsyncClient, path: str) -> str:
+    """Upload a document, OCR and clean it"""
+    with open(path, "rb") as f:
+        response = await client.post("/upload/", files={"file": (os.path.basename(path), f, "application/pdf")})
+    response.raise_for_status()
+    visit_id = response.json()["visit_id"]
+    (await client.post(f"/ocr/{visit_id}")).raise_for_status()
+    (await client.post(f"/clean/{visit_id}")).raise_for_status()
+    return visit_id
+
+
+async def timed(client: httpx.AsyncClient, path: str) -> tuple:
+    """Seconds to the first body bytes and to the end of the response"""
+    start = time.perf_counter()
+    first = None
+    async with client.stream("POST", path) as response:
+        response.raise_for_status()
+        async for _ in response.aiter_bytes():
+            if first is None:
+                first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def run(args) -> None:
+    import main
+
+    llm_service = LongSummaryLLMService(
+        args.summary_tokens, latency=args.latency, tokens_per_second=args.tokens_per_second
+    )
+    app = main.create_app(ServiceContainer(llm_service=llm_service, job_workers=0))
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    workdir = tempfile.mkdtemp(prefix="stream_bench_")
+    base_page = random.randint(1_000, 1_000_000)
+    results = {}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+            for n, (name, suffix) in enumerate((("/summarize", ""), ("/summarize/stream", "/stream"))):
+                samples = []
+                for i in range(args.visits):
+                    first_page = base_page + i * 2 + n
+                    path = make_scanned_pdf(os.path.join(workdir, f"scan_{first_page}.pdf"), 1, first_page=first_page)
+                    visit_id = await prepare_visit(client, path)
+                    samples.append(await timed(client, f"/summarize/{visit_id}{suffix}"))
+                results[name] = (
+                    sum(first for first, _ in samples) / len(samples),
+                    sum(total for _, total in samples) / len(samples)
+                )
+    finally:
+        server.should_exit = True
+        await serving
+
+    print(f"{args.latency:.2f}s to first token, {args.tokens_per_second:.0f} tokens/s, "
+          f"~{args.summary_tokens} token summary, averaged over {args.visits} visits\n")
+    print(f"{'endpoint':<22}{'first byte':>12}{'complete':>10}")
+    for name, (first, total) in results.items():
+        print(f"{name:<22}{first:>11.2f}s{total:>9.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visits", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=250)
+    parser.add_argument("--summary-tokens", type=int, default=400)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import logging
 import os
@@ -11,8 +15,15 @@ from app.api import (
     ocr_router,
     clean_router,
     summarize_router,
-    visits_router
+    visits_router,
+    jobs_router,
+    process_router,
+    admission_router,
+    llm_router
 )
+from app.services.admission_service import StageOverloaded
+from app.services.llm_service import LLMError
+from app.services.container import ServiceContainer
 
 # Configure logging
 logging.basicConfig(
@@ -22,45 +33,24 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# Create FastAPI app
-app = FastAPI(
-    title=settings.APP_NAME,
-    version=settings.APP_VERSION,
-    description="Healthcare AI System for Medical Record Processing and Summarization"
-)
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Create upload directory if it doesn't exist
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-
-# Include routers
-app.include_router(upload_router)
-app.include_router(ocr_router)
-app.include_router(clean_router)
-app.include_router(summarize_router)
-app.include_router(visits_router)
-
-
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     """
-    Initialize database on startup
+    Initialize database and services on startup, release them on shutdown
     """
     logger.info("Starting up Healthcare AI System...")
     logger.info("Initializing database...")
     init_db()
     logger.info("Database initialized successfully")
 
+    await app.state.services.start()
+    try:
+        yield
+    finally:
+        await app.state.services.stop()
+
 
-@app.get("/")
 async def root():
     """
     Root endpoint
@@ -72,7 +62,6 @@ async def root():
     }
 
 
-@app.get("/health")
 async def health_check():
     """
     Health check endpoint
@@ -83,6 +72,86 @@ async def health_check():
     }
 
 
+async def stage_overloaded_handler(request: Request, exc: StageOverloaded):
+    """
+    Answer requests turned away by admission control with 429
+    """
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+async def llm_error_handler(request: Request, exc: LLMError):
+    """
+    Answer requests whose LLM calls failed with the error's status code
+    """
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(max(1, round(exc.retry_after)))
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers=headers
+    )
+
+
+def create_app(services: Optional[ServiceContainer] = None) -> FastAPI:
+    """
+    Create the FastAPI app
+
+    Args:
+        services: Service container to use, e.g. one holding stand-in
+            services for tests and benchmarks (a default one if omitted)
+
+    Returns:
+        The app; its services start and stop with the app's lifespan
+    """
+    app = FastAPI(
+        title=settings.APP_NAME,
+        version=settings.APP_VERSION,
+        description="Healthcare AI System for Medical Record Processing and Summarization",
+        lifespan=lifespan
+    )
+    app.state.services = services or ServiceContainer()
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Create upload directory if it doesn't exist
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+
+    app.add_exception_handler(StageOverloaded, stage_overloaded_handler)
+    app.add_exception_handler(LLMError, llm_error_handler)
+
+    # Include routers
+    app.include_router(upload_router)
+    app.include_router(ocr_router)
+    app.include_router(clean_router)
+    app.include_router(summarize_router)
+    app.include_router(visits_router)
+    app.include_router(jobs_router)
+    app.include_router(process_router)
+    app.include_router(admission_router)
+    app.include_router(llm_router)
+
+    app.add_api_route("/", root, methods=["GET"])
+    app.add_api_route("/health", health_check, methods=["GET"])
+
+    return app
+
+
+# Create FastAPI app
+app = create_app()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -40,6 +40,7 @@ CREATE TABLE IF NOT EXISTS raw_documents (
     file_path VARCHAR(500) NOT NULL,
     file_type VARCHAR(50) NOT NULL,
     file_size INTEGER,
+    content_hash VARCHAR(64),
     upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (visit_id) REFERENCES visits(visit_id) ON DELETE CASCADE
@@ -49,12 +50,15 @@ CREATE TABLE IF NOT EXISTS raw_documents (
 CREATE TABLE IF NOT EXISTS ocr_texts (
     ocr_id VARCHAR(50) PRIMARY KEY,
     visit_id VARCHAR(50) NOT NULL,
+    document_id VARCHAR(50),
     raw_text TEXT NOT NULL,
     confidence_score VARCHAR(10),
     processing_time VARCHAR(20),
+    page_details JSONB,
     extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (visit_id) REFERENCES visits(visit_id) ON DELETE CASCADE
+    FOREIGN KEY (visit_id) REFERENCES visits(visit_id) ON DELETE CASCADE,
+    FOREIGN KEY (document_id) REFERENCES raw_documents(document_id) ON DELETE CASCADE
 );
 
 -- Create cleaned_texts table
@@ -82,6 +86,25 @@ CREATE TABLE IF NOT EXISTS summaries (
     FOREIGN KEY (visit_id) REFERENCES visits(visit_id) ON DELETE CASCADE
 );
 
+-- Create jobs table
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id VARCHAR(50) PRIMARY KEY,
+    visit_id VARCHAR(50) NOT NULL,
+    job_type VARCHAR(20) NOT NULL,
+    status VARCHAR(20) DEFAULT 'queued',
+    stage VARCHAR(20),
+    attempts INTEGER DEFAULT 0,
+    result JSONB,
+    error TEXT,
+    worker_id VARCHAR(100),
+    lease_expires_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (visit_id) REFERENCES visits(visit_id) ON DELETE CASCADE
+);
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_visits_patient_id ON visits(patient_id);
 CREATE INDEX IF NOT EXISTS idx_visits_status ON visits(status);
@@ -89,6 +112,15 @@ CREATE INDEX IF NOT EXISTS idx_documents_visit_id ON raw_documents(visit_id);
 CREATE INDEX IF NOT EXISTS idx_ocr_texts_visit_id ON ocr_texts(visit_id);
 CREATE INDEX IF NOT EXISTS idx_cleaned_texts_visit_id ON cleaned_texts(visit_id);
 CREATE INDEX IF NOT EXISTS idx_summaries_visit_id ON summaries(visit_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_visit_id ON jobs(visit_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+
+-- Upgrade existing databases (create_all does not add columns to existing tables)
+ALTER TABLE ocr_texts ADD COLUMN IF NOT EXISTS page_details JSONB;
+ALTER TABLE ocr_texts ADD COLUMN IF NOT EXISTS document_id VARCHAR(50) REFERENCES raw_documents(document_id) ON DELETE CASCADE;
+CREATE INDEX IF NOT EXISTS idx_ocr_texts_document_id ON ocr_texts(document_id);
+ALTER TABLE raw_documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON raw_documents(content_hash);
 
 -- Grant permissions (adjust username as needed)
 -- GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO your_username;
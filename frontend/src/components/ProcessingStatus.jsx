@@ -14,34 +14,61 @@ const ProcessingStatus = ({ visitId, onComplete }) => {
   ];
 
   useEffect(() => {
+    let cancelled = false;
+    let timer = null;
+
+    const stepStatus = {
+      ocr: 'Extracting text from document...',
+      clean: 'Cleaning and correcting text...',
+      summarize: 'Generating medical summary...',
+    };
+
     const processDocument = async () => {
       try {
-        const { performOCR, cleanText, generateSummary } = await import('../services/api');
-
-        // Step 1: OCR
-        setCurrentStep(0);
-        setStatus('Extracting text from document...');
-        setProgress(33);
-        await performOCR(visitId);
-
-        // Step 2: Clean
-        setCurrentStep(1);
-        setStatus('Cleaning and correcting text...');
-        setProgress(66);
-        await cleanText(visitId);
-
-        // Step 3: Summarize
-        setCurrentStep(2);
-        setStatus('Generating medical summary...');
-        setProgress(90);
-        await generateSummary(visitId);
-
-        setStatus('Complete!');
-        setProgress(100);
-        
-        setTimeout(() => {
-          onComplete(visitId);
-        }, 500);
+        const { createJob, getJob } = await import('../services/api');
+
+        // Queue OCR, cleaning and summary as one background job
+        const job = await createJob(visitId);
+        setStatus('Queued for processing...');
+        setProgress(5);
+
+        // Poll until the job finishes; closing the page does not stop it
+        const poll = async () => {
+          if (cancelled) return;
+          try {
+            const current = await getJob(job.job_id);
+
+            if (current.status === 'completed') {
+              setCurrentStep(steps.length);
+              setStatus('Complete!');
+              setProgress(100);
+              setTimeout(() => {
+                onComplete(visitId);
+              }, 500);
+              return;
+            }
+
+            if (current.status === 'failed') {
+              setError(current.error || 'Processing failed');
+              setStatus('Error');
+              return;
+            }
+
+            const index = steps.findIndex((step) => step.key === current.stage);
+            if (index >= 0) {
+              setCurrentStep(index);
+              setStatus(stepStatus[current.stage]);
+              setProgress([33, 66, 90][index]);
+            }
+          } catch (err) {
+            setError(err.response?.data?.detail || 'Processing failed');
+            setStatus('Error');
+            return;
+          }
+          timer = setTimeout(poll, 1000);
+        };
+
+        poll();
       } catch (err) {
         setError(err.response?.data?.detail || 'Processing failed');
         setStatus('Error');
@@ -51,6 +78,11 @@ const ProcessingStatus = ({ visitId, onComplete }) => {
     if (visitId) {
       processDocument();
     }
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
   }, [visitId, onComplete]);
 
   return (
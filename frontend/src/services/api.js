@@ -40,6 +40,18 @@ export const generateSummary = async (visitId) => {
   return response.data;
 };
 
+export const createJob = async (visitId, jobType = 'pipeline') => {
+  const response = await api.post(`/jobs/${visitId}`, null, {
+    params: { job_type: jobType },
+  });
+  return response.data;
+};
+
+export const getJob = async (jobId) => {
+  const response = await api.get(`/jobs/${jobId}`);
+  return response.data;
+};
+
 export const getSummary = async (visitId) => {
   const response = await api.get(`/summarize/${visitId}`);
   return response.data;